@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks
+    ~~~~~~~~~~
+
+    Benchmarks for pixela.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
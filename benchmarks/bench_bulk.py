@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_bulk
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Throughput of create_pixels for several worker counts.
+
+    ::
+
+      $ python -m benchmarks.bench_bulk --pixels 2000 --latency 0.02
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from pixela import Pixela
+from .server import StandInServer
+
+
+def pairs(count):
+    start = datetime(2018, 1, 1)
+    for i in range(count):
+        yield start + timedelta(days=i), i
+
+
+def run(server, pixels, workers):
+    client = Pixela(username='bench', token='token', pool_maxsize=workers)
+    client.API_ENDPOINT = server.endpoint
+
+    start = time.perf_counter()
+    with client:
+        result = client.create_pixels(graph_id='bench', pairs=pairs(pixels), workers=workers)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'workers': workers,
+        'pixels': pixels,
+        'successes': result.successes,
+        'failures': len(result.failures),
+        'seconds': round(elapsed, 4),
+        'pixels_per_second': round(pixels / elapsed, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pixels', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16, 64])
+    args = parser.parse_args(argv)
+
+    server = StandInServer(latency=args.latency).start()
+    try:
+        results = [run(server, args.pixels, workers) for workers in args.workers]
+    finally:
+        server.stop()
+
+    sys.stdout.write(json.dumps({'latency': args.latency, 'results': results}, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+r"""
+    benchmarks.bench_daemon
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Per-hook latency of a one-shot client against the daemon.
+
+    ``oneshot`` starts an interpreter which imports pixela, builds a client
+    and sends one increment, as a git hook wrapping ``Pixela(...)`` does.
+    ``send_command`` starts ``python -m pixela send increment`` against a
+    daemon and ``socket`` only sends the line, the cost left to a hook
+    which writes to the socket with ``nc -U`` or ``socat``. ``interpreter``
+    is the startup of an empty interpreter, the floor of both commands.
+
+    ::
+
+      $ python -m benchmarks.bench_daemon --hooks 20
+      $ openssl req -x509 -newkey rsa:2048 -nodes -subj /CN=127.0.0.1 \\
+          -keyout key.pem -out cert.pem
+      $ python -m benchmarks.bench_daemon --certfile cert.pem --keyfile key.pem
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from pixela import Pixela
+from pixela.coalesce import Coalescer
+from pixela.daemon import (
+    PixelaDaemon,
+    send,
+)
+from .run import percentile
+from .server import StandInServer
+
+ONESHOT = """
+from pixela import Pixela
+client = Pixela(username='bench', token='token')
+client.API_ENDPOINT = {endpoint!r}
+client.session.trust_env = False
+client.session.verify = {verify!r}
+client.increment_pixel(graph_id='bench')
+"""
+
+
+def measure(hooks, func):
+    latencies = []
+    for _ in range(hooks):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1e3, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1e3, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hooks', type=int, default=20)
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args(argv)
+
+    server = StandInServer(certfile=args.certfile, keyfile=args.keyfile).start()
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'pixela.sock')
+    client = Pixela(username='bench', token='token', coalescer=Coalescer())
+    client.API_ENDPOINT = server.endpoint
+    client.session.trust_env = False
+    client.session.verify = args.certfile or True
+    daemon = PixelaDaemon(client, path)
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        oneshot = ONESHOT.format(endpoint=server.endpoint, verify=args.certfile or True)
+        command = [sys.executable, '-m', 'pixela', 'send', '--socket', path, 'increment', 'bench']
+        results = {
+            'interpreter': measure(args.hooks, lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True)),
+            'oneshot': measure(args.hooks, lambda: subprocess.run([sys.executable, '-c', oneshot], check=True)),
+            'send_command': measure(args.hooks, lambda: subprocess.run(command, check=True)),
+            'socket': measure(args.hooks, lambda: send('increment bench', path)),
+        }
+        requests = server.requests
+        daemon.execute('flush')
+    finally:
+        daemon.shutdown()
+        thread.join()
+        daemon.close()
+        shutil.rmtree(tmpdir)
+        server.stop()
+
+    report = {
+        'hooks': args.hooks,
+        'results': results,
+        'daemon_requests': server.requests - requests,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
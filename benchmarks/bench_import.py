@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_import
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Import and construction cost of the client.
+
+    Every run imports pixela in a fresh interpreter with ``-X importtime``
+    and reports the cumulative import time of the ``pixela`` package, the
+    heavy modules it pulled in and the time to construct a client. With
+    ``--max-import-ms`` the script exits with status 1 when the median
+    import time is above the limit, so it can guard a CI job.
+
+    ::
+
+      $ python -m benchmarks.bench_import --runs 20 --max-import-ms 10
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('requests', 'urllib3', 'pytz', 'zoneinfo', 'concurrent.futures')
+
+PROBE = """
+import sys, time
+import pixela
+start = time.perf_counter_ns()
+for _ in range({constructs}):
+    pixela.Pixela(username='bench', token='token')
+elapsed = time.perf_counter_ns() - start
+sys.stdout.write('%d %s' % (elapsed // {constructs}, ','.join(m for m in {modules!r} if m in sys.modules)))
+"""
+
+
+def run_once(constructs):
+    code = PROBE.format(constructs=constructs, modules=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    import_us = None
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == 'pixela':
+            import_us = int(parts[1])
+
+    construct_ns, loaded = proc.stdout.split(' ', 1)
+
+    return import_us, int(construct_ns), [m for m in loaded.split(',') if m]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--constructs', type=int, default=1000)
+    parser.add_argument('--max-import-ms', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    imports = []
+    constructs = []
+    loaded = set()
+    for _ in range(args.runs):
+        import_us, construct_ns, modules = run_once(args.constructs)
+        imports.append(import_us)
+        constructs.append(construct_ns)
+        loaded.update(modules)
+
+    import_ms = statistics.median(imports) / 1000.0
+    result = {
+        'runs': args.runs,
+        'import_ms': {
+            'median': import_ms,
+            'min': min(imports) / 1000.0,
+            'max': max(imports) / 1000.0,
+        },
+        'construct_ns': statistics.median(constructs),
+        'heavy_modules_loaded': sorted(loaded),
+    }
+    sys.stdout.write(json.dumps(result, indent=2) + '\n')
+
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        sys.stderr.write('import pixela took {ms:.1f} ms, limit is {limit:.1f} ms\n'.format(
+            ms=import_ms,
+            limit=args.max_import_ms,
+        ))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
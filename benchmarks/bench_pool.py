@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_pool
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Memory per tenant and throughput across many tenants.
+
+    Compares one ``Pixela`` client per tenant with the users of one
+    ``PixelaPool``. Memory is traced after every client sent a request, so
+    the per-tenant clients include their session. Throughput posts one
+    pixel per tenant through ``--threads`` threads against the stand-in
+    server.
+
+    ::
+
+      $ python -m benchmarks.bench_pool --tenants 10000 --threads 16
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from pixela import Pixela
+from pixela.bulk import run_bounded
+from pixela.pool import PixelaPool
+from .bench_routes import StubSession
+from .server import StandInServer
+
+DATE = datetime(2018, 10, 21)
+
+
+def tenants(count):
+    return [('tenant{i}'.format(i=i), 'token{i}'.format(i=i)) for i in range(count)]
+
+
+def memory(mode, count):
+    stub = StubSession()
+    pool = PixelaPool()
+    pool.session = stub
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clients = []
+    for username, token in tenants(count):
+        if mode == 'pool':
+            client = pool.user(username, token)
+        else:
+            client = Pixela(username=username, token=token)
+            # Build the session the first request would build, then stub
+            # the network call.
+            client.session.get = stub.get
+        client.get_pixel(graph_id='bench', date=DATE)
+        clients.append(client)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    return used // count
+
+
+def throughput(mode, count, threads):
+    server = StandInServer().start()
+    pool = PixelaPool(pool_maxsize=threads)
+    pool.API_ENDPOINT = server.endpoint
+
+    def post(tenant):
+        username, token = tenant
+        if mode == 'pool':
+            return pool.user(username, token).create_pixel(graph_id='bench', quantity=1, date=DATE).ok
+
+        with Pixela(username=username, token=token) as client:
+            client.API_ENDPOINT = server.endpoint
+            return client.create_pixel(graph_id='bench', quantity=1, date=DATE).ok
+
+    start = time.perf_counter()
+    ok = sum(run_bounded(post, tenants(count), threads))
+    elapsed = time.perf_counter() - start
+    pool.close()
+    server.stop()
+
+    return {
+        'calls_per_second': round(count / elapsed, 1),
+        'successes': ok,
+        'connections': server.connections,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tenants', type=int, default=10000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for mode in ('clients', 'pool'):
+        result = {'bytes_per_tenant': memory(mode, args.tenants)}
+        result.update(throughput(mode, args.tenants, args.threads))
+        results[mode] = result
+
+    sys.stdout.write(json.dumps({
+        'tenants': args.tenants,
+        'threads': args.threads,
+        'results': results,
+    }, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_reconcile
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Requests and time of a nightly rewrite of a graph's history with
+    update_pixels against reconcile, when only a few days changed.
+
+    ::
+
+      $ python -m benchmarks.bench_reconcile --days 1095 --changed 5 --latency 0.02
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from pixela import Pixela
+from .server import StandInServer
+
+
+def history(days, changed, seed):
+    start = datetime(2016, 1, 1)
+    current = {start + timedelta(days=i): i % 17 for i in range(days)}
+    desired = dict(current)
+    for date in random.Random(seed).sample(sorted(desired), changed):
+        desired[date] += 1
+
+    return current, desired
+
+
+def measure(server, func):
+    before = server.requests
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': server.requests - before,
+        'seconds': round(elapsed, 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--changed', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args(argv)
+
+    current, desired = history(args.days, args.changed, seed=0)
+    server = StandInServer().start()
+    client = Pixela(username='bench', token='token', pool_maxsize=args.workers)
+    client.API_ENDPOINT = server.endpoint
+    try:
+        with client:
+            for graph_id in ('rewritten', 'reconciled'):
+                client.create_pixels(graph_id, current.items(), workers=args.workers)
+            server.latency = args.latency
+            results = {
+                'update_pixels': measure(
+                    server,
+                    lambda: client.update_pixels('rewritten', desired.items(), workers=args.workers),
+                ),
+                'reconcile': measure(
+                    server,
+                    lambda: client.reconcile('reconciled', desired, workers=args.workers),
+                ),
+            }
+    finally:
+        server.stop()
+
+    report = {
+        'days': args.days,
+        'changed': args.changed,
+        'latency': args.latency,
+        'results': results,
+        'requests_saved': results['update_pixels']['requests'] - results['reconcile']['requests'],
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_results
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Memory held by the results of a bulk job: ``requests.Response`` objects
+    against :class:`pixela.result.Result`.
+
+    The headers and body of a real response of the stand-in server are
+    captured once, then the responses are built the way the ``requests``
+    adapter builds them so that 100k of them take seconds rather than 100k
+    round trips.
+
+    ::
+
+      $ python -m benchmarks.bench_results --results 100000
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import gc
+import io
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from pixela import Pixela
+from pixela.result import Result
+from .server import StandInServer
+
+
+def capture(server):
+    client = Pixela(username='bench', token='token')
+    client.API_ENDPOINT = server.endpoint
+    with client:
+        client.create_pixel('results', 5, datetime(2018, 10, 21))
+        res = client.get_pixel('results', datetime(2018, 10, 21))
+
+    return res.url, dict(res.headers), res.content
+
+
+def build_responses(url, headers, body, count):
+    from requests import Request
+    from requests.adapters import HTTPAdapter
+    from urllib3 import HTTPResponse
+
+    adapter = HTTPAdapter()
+    responses = []
+    for _ in range(count):
+        raw = HTTPResponse(
+            body=io.BytesIO(body),
+            headers=headers,
+            status=200,
+            preload_content=False,
+        )
+        res = adapter.build_response(Request('GET', url).prepare(), raw)
+        # Read like the client does, which releases the connection.
+        res.content
+        responses.append(res)
+
+    return responses
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return held, {
+        'mb': round(size / 1024.0 / 1024.0, 2),
+        'bytes_per_result': int(size / len(held)),
+        'build_seconds': round(elapsed, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--results', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    server = StandInServer().start()
+    try:
+        url, headers, body = capture(server)
+    finally:
+        server.stop()
+
+    responses, response_stats = measure(lambda: build_responses(url, headers, body, args.results))
+
+    def build_results():
+        # A copy of the body, in the client the response is dropped and
+        # its body is only held by the result.
+        return [Result(res.status_code, bytes(bytearray(res.content))) for res in responses]
+
+    def build_decoded():
+        results = build_results()
+        for result in results:
+            result.data
+
+        return results
+
+    results, result_stats = measure(build_results)
+    del results
+    results, decoded_stats = measure(build_decoded)
+
+    report = {
+        'results': args.results,
+        'body_bytes': len(body),
+        'response': response_stats,
+        'result': result_stats,
+        'result_decoded': decoded_stats,
+        'ratio': round(response_stats['mb'] / result_stats['mb'], 1) if result_stats['mb'] else None,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_retry
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Round trips wasted on rejected requests with naive retry, jittered
+    backoff and a client-side rate limiter.
+
+    ::
+
+      $ python -m benchmarks.bench_retry --pixels 500 --max-rate 100
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from pixela import Pixela
+from pixela.retry import (
+    RateLimiter,
+    RetryPolicy,
+)
+from .server import StandInServer
+
+
+def pairs(count):
+    start = datetime(2018, 1, 1)
+    for i in range(count):
+        yield start + timedelta(days=i), i
+
+
+def run(name, args, retry, rate_limiter=None):
+    server = StandInServer(
+        latency=args.latency,
+        reject_rate=args.reject_rate,
+        max_rate=args.max_rate,
+    ).start()
+    client = Pixela(
+        username='bench',
+        token='token',
+        pool_maxsize=args.workers,
+        retry=retry,
+        rate_limiter=rate_limiter,
+    )
+    client.API_ENDPOINT = server.endpoint
+    client.logger.disabled = True
+
+    start = time.perf_counter()
+    try:
+        with client:
+            result = client.create_pixels(graph_id='bench', pairs=pairs(args.pixels), workers=args.workers)
+    finally:
+        server.stop()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'scenario': name,
+        'successes': result.successes,
+        'failures': len(result.failures),
+        'requests': server.requests,
+        'rejected': server.rejected,
+        'retries': retry.retries,
+        'wasted_round_trip_seconds': round(retry.wasted_seconds, 4),
+        'backoff_seconds': round(retry.backoff_seconds, 4),
+        'limiter_wait_seconds': round(rate_limiter.waited_seconds, 4) if rate_limiter else 0,
+        'seconds': round(elapsed, 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pixels', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--reject-rate', type=float, default=0.25)
+    parser.add_argument('--max-rate', type=float, default=100)
+    args = parser.parse_args(argv)
+
+    results = [
+        run('naive', args, RetryPolicy(max_retries=20, backoff=0)),
+        run('backoff', args, RetryPolicy(max_retries=20, backoff=0.05)),
+        run(
+            'rate_limited_backoff',
+            args,
+            RetryPolicy(max_retries=20, backoff=0.05),
+            RateLimiter(rate=args.max_rate * 0.9, burst=args.workers),
+        ),
+    ]
+    sys.stdout.write(json.dumps({'results': results}, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
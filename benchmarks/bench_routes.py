@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_routes
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Client-side cost per call without network I/O.
+
+    The session is replaced by a stub returning a canned response, so the
+    numbers are the time and memory spent building the request in pixela.
+
+    ::
+
+      $ python -m benchmarks.bench_routes --calls 100000
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from requests import Response
+
+from pixela import Pixela
+from pixela.metrics import Metrics
+
+
+class StubSession(object):
+    def __init__(self):
+        self.response = Response()
+        self.response.status_code = 200
+        self.response._content = b'{"message":"Success.","isSuccess":true}'
+
+    def request(self, *args, **kwargs):
+        return self.response
+
+    get = post = put = delete = request
+
+    def close(self):
+        pass
+
+
+def scenarios(client, instrumented):
+    date = datetime(2018, 10, 21)
+
+    return {
+        'create_pixel': lambda: client.create_pixel(graph_id='bench', quantity=5, date=date),
+        'create_pixel_with_metrics': lambda: instrumented.create_pixel(graph_id='bench', quantity=5, date=date),
+        'get_pixel': lambda: client.get_pixel(graph_id='bench', date=date),
+        'increment_pixel': lambda: client.increment_pixel(graph_id='bench'),
+        'graph_url': lambda: client.graph_url(graph_id='bench', date=date, mode='short'),
+    }
+
+
+def measure(func, calls):
+    for _ in range(1000):
+        func()
+
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter_ns() - start
+
+    samples = 1000
+    tracemalloc.start()
+    peak = 0
+    for _ in range(samples):
+        tracemalloc.clear_traces()
+        tracemalloc.reset_peak()
+        func()
+        peak += tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'ns_per_call': elapsed // calls,
+        'peak_bytes_per_call': peak // samples,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    client = Pixela(username='bench', token='token')
+    client.session = StubSession()
+    instrumented = Pixela(username='bench', token='token', hooks=[Metrics()])
+    instrumented.session = StubSession()
+    results = {
+        name: measure(func, args.calls)
+        for name, func in scenarios(client, instrumented).items()
+    }
+    sys.stdout.write(json.dumps({'calls': args.calls, 'results': results}, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+r"""
+    benchmarks.bench_session
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compare a new Session per call with the pooled client session.
+
+    Every new connection against an HTTPS endpoint costs one TLS handshake,
+    so the number of accepted connections is the number of handshakes.
+
+    ::
+
+      $ python -m benchmarks.bench_session --calls 1000
+      $ openssl req -x509 -newkey rsa:2048 -nodes -subj /CN=127.0.0.1 \\
+          -keyout key.pem -out cert.pem
+      $ python -m benchmarks.bench_session --certfile cert.pem --keyfile key.pem
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from requests import Session
+
+from pixela import Pixela
+from .server import StandInServer
+
+
+class PerCallSessionPixela(Pixela):
+    """Emulate the pre-pooling client which opened a Session per call."""
+
+    def send(self, method, url, params=None, token=None):
+        session = Session()
+        session.verify = self.session.verify
+        session.trust_env = self.session.trust_env
+        session.headers.update(self.headers)
+        headers = {'X-USER-TOKEN': token} if token is not None else None
+        endpoint = '{base_url}/{url}'.format(base_url=self.API_ENDPOINT, url=url)
+        data = json.dumps(params) if params else None
+        res = getattr(session, method)(endpoint, data=data, headers=headers)
+        session.close()
+
+        return res
+
+
+def run(client_class, server, calls, certfile=None):
+    client = client_class(username='bench', token='token')
+    client.API_ENDPOINT = server.endpoint
+    if certfile:
+        # REQUESTS_CA_BUNDLE would otherwise take precedence over verify.
+        client.session.trust_env = False
+        client.session.verify = certfile
+
+    before = server.connections
+    date = datetime(2018, 10, 21)
+    start = time.perf_counter()
+    with client:
+        for _ in range(calls):
+            client.create_pixel(graph_id='bench', quantity=1, date=date)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'client': client_class.__name__,
+        'calls': calls,
+        'connections': server.connections - before,
+        'seconds': round(elapsed, 4),
+        'calls_per_second': round(calls / elapsed, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args(argv)
+
+    server = StandInServer(certfile=args.certfile, keyfile=args.keyfile).start()
+    try:
+        results = [
+            run(PerCallSessionPixela, server, args.calls, args.certfile),
+            run(Pixela, server, args.calls, args.certfile),
+        ]
+    finally:
+        server.stop()
+
+    saved = results[0]['connections'] - results[1]['connections']
+    report = {
+        'results': results,
+        'handshakes_saved_per_1k_calls': round(saved * 1000.0 / args.calls, 1),
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
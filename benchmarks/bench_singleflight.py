@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_singleflight
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Requests and time of a burst of identical dashboard reads from many
+    threads, with and without a single-flight layer.
+
+    ::
+
+      $ python -m benchmarks.bench_singleflight --threads 64 --rounds 20 --latency 0.05
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+from pixela import Pixela
+from pixela.singleflight import SingleFlight
+from .server import StandInServer
+
+DATE = datetime(2018, 10, 21)
+
+
+def burst(client, threads, rounds):
+    barrier = threading.Barrier(threads)
+
+    def read():
+        for _ in range(rounds):
+            # Every thread asks at the same moment, like a dashboard
+            # loaded by many users at the top of the hour.
+            barrier.wait()
+            client.get_graphs()
+            client.get_pixel('dashboard', DATE)
+
+    workers = [threading.Thread(target=read) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def measure(server, threads, rounds, latency, single_flight):
+    client = Pixela(username='bench', token='token', pool_maxsize=threads, single_flight=single_flight)
+    client.API_ENDPOINT = server.endpoint
+    with client:
+        client.create_pixel('dashboard', 5, DATE)
+        server.latency = latency
+        before = server.requests
+        start = time.perf_counter()
+        burst(client, threads, rounds)
+        elapsed = time.perf_counter() - start
+        server.latency = 0
+
+    result = {
+        'requests': server.requests - before,
+        'seconds': round(elapsed, 4),
+    }
+    if single_flight is not None:
+        result['collapsed'] = single_flight.collapsed
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    server = StandInServer().start()
+    try:
+        results = {
+            'plain': measure(server, args.threads, args.rounds, args.latency, None),
+            'single_flight': measure(server, args.threads, args.rounds, args.latency, SingleFlight()),
+        }
+    finally:
+        server.stop()
+
+    report = {
+        'threads': args.threads,
+        'rounds': args.rounds,
+        'latency': args.latency,
+        'results': results,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
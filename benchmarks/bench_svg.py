@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_svg
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Graphs per second a proxy serves with ``fetch_graph_svg``, without a
+    cache, with a fresh :class:`pixela.svg.SvgCache` and with one which
+    revalidates every SVG, and the requests which reached the server.
+
+    ::
+
+      $ python -m benchmarks.bench_svg --graphs 50 --fetches 5000 --threads 16 --latency 0.02
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from pixela import Pixela
+from pixela.svg import SvgCache
+from .server import StandInServer
+
+
+def serve(client, graphs, fetches, threads):
+    served = [0]
+    lock = threading.Lock()
+    per_thread = fetches // threads
+
+    def run(offset):
+        size = 0
+        for i in range(per_thread):
+            svg = client.fetch_graph_svg('graph-{i}'.format(i=(offset + i) % graphs), mode='short')
+            # A proxy writes the view to its socket as is.
+            size += svg.nbytes
+        with lock:
+            served[0] += size
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return per_thread * threads, served[0]
+
+
+def measure(server, args, svg_cache):
+    client = Pixela(username='bench', token='token', pool_maxsize=args.threads, svg_cache=svg_cache)
+    client.API_ENDPOINT = server.endpoint
+    with client:
+        for i in range(args.graphs):
+            client.create_pixel('graph-{i}'.format(i=i), i, datetime(2018, 10, 21))
+        if svg_cache is not None:
+            # Warm the cache, a proxy runs for longer than a benchmark.
+            serve(client, args.graphs, args.graphs, 1)
+        server.latency = args.latency
+        before = server.requests
+        start = time.perf_counter()
+        fetches, size = serve(client, args.graphs, args.fetches, args.threads)
+        elapsed = time.perf_counter() - start
+        server.latency = 0
+
+    result = {
+        'fetches': fetches,
+        'requests': server.requests - before,
+        'seconds': round(elapsed, 4),
+        'graphs_per_second': round(fetches / elapsed, 1),
+        'megabytes': round(size / 1024.0 / 1024.0, 2),
+    }
+    if svg_cache is not None:
+        result['hits'] = svg_cache.hits
+        result['revalidated'] = svg_cache.revalidated
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--graphs', type=int, default=50)
+    parser.add_argument('--fetches', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    server = StandInServer().start()
+    try:
+        results = {
+            'plain': measure(server, args, None),
+            'cached': measure(server, args, SvgCache(directory=directory + '/fresh', ttl=300)),
+            'revalidated': measure(server, args, SvgCache(directory=directory + '/revalidated', ttl=0)),
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(directory)
+
+    report = {
+        'graphs': args.graphs,
+        'threads': args.threads,
+        'latency': args.latency,
+        'results': results,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
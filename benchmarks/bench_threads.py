@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_threads
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Throughput of one client shared by 1 to 64 threads against the stand-in
+    server, for each transport.
+
+    The report says whether the interpreter is a free-threaded build and
+    whether the GIL is enabled, as throughput past a few threads depends on
+    it. The stand-in server runs in the same process, so it competes for the
+    GIL too; pass ``--endpoint`` to measure against a server of its own.
+
+    ::
+
+      $ python -m benchmarks.bench_threads --threads 1 2 4 8 16 32 64 --calls 4000 --latency 0.005
+      $ PYTHON_GIL=0 python3.13t -m benchmarks.bench_threads
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import platform
+import sys
+import sysconfig
+import threading
+import time
+
+from pixela import Pixela
+from pixela.retry import RetryPolicy
+from .run import summarize
+from .server import StandInServer
+
+
+def interpreter():
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'free_threaded_build': bool(sysconfig.get_config_var('Py_GIL_DISABLED')),
+        'gil_enabled': is_gil_enabled() if is_gil_enabled is not None else True,
+    }
+
+
+def measure(endpoint, transport, threads, calls):
+    client = Pixela(
+        username='bench',
+        token='token',
+        transport=transport,
+        pool_maxsize=threads,
+        retry=RetryPolicy(max_retries=0),
+    )
+    client.API_ENDPOINT = endpoint
+    client.logger.disabled = True
+    per_thread = calls // threads
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        local = []
+        failed = 0
+        barrier.wait()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            res = client.increment_pixel(graph_id='bench')
+            local.append(time.perf_counter() - start)
+            if not res.ok:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            failures[0] += failed
+
+    with client:
+        # Connect before measuring, the handshake is not what is compared.
+        client.increment_pixel(graph_id='bench')
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for worker_thread in workers:
+            worker_thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker_thread in workers:
+            worker_thread.join()
+        elapsed = time.perf_counter() - start
+
+    result = summarize(latencies, elapsed, per_thread * threads)
+    result.update({'threads': threads, 'failures': failures[0]})
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--calls', type=int, default=4000)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--transport', nargs='+', choices=['requests', 'urllib3'], default=['requests', 'urllib3'])
+    parser.add_argument('--endpoint', help='Pixela endpoint to use instead of an in-process stand-in server.')
+    args = parser.parse_args(argv)
+
+    server = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        server = StandInServer(latency=args.latency).start()
+        endpoint = server.endpoint
+    try:
+        results = {}
+        for transport in args.transport:
+            runs = [measure(endpoint, transport, threads, args.calls) for threads in args.threads]
+            base = runs[0]['calls_per_second']
+            for result in runs:
+                result['speedup'] = round(result['calls_per_second'] / base, 2) if base else None
+            results[transport] = runs
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        'interpreter': interpreter(),
+        'calls': args.calls,
+        'latency': args.latency if server is not None else None,
+        'results': results,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.bench_transport
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Per-call CPU and latency of the transports against the stand-in server.
+
+    CPU is the time of the calling thread only, so the in-process server
+    does not count.
+
+    ::
+
+      $ python -m benchmarks.bench_transport --calls 2000
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from pixela import Pixela
+from .run import percentile
+from .server import StandInServer
+
+TRANSPORTS = ('requests', 'urllib3')
+
+
+def run(transport, server, calls):
+    client = Pixela(username='bench', token='token', transport=transport)
+    client.API_ENDPOINT = server.endpoint
+    date = datetime(2018, 10, 21)
+    with client:
+        for _ in range(100):
+            client.create_pixel(graph_id='bench', quantity=1, date=date)
+
+        latencies = []
+        cpu = time.thread_time()
+        for _ in range(calls):
+            start = time.perf_counter()
+            client.create_pixel(graph_id='bench', quantity=1, date=date)
+            latencies.append(time.perf_counter() - start)
+        cpu = time.thread_time() - cpu
+
+    latencies.sort()
+    return {
+        'cpu_us_per_call': round(cpu / calls * 1e6, 1),
+        'p50_us': round(percentile(latencies, 50) * 1e6, 1),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 1),
+        'calls_per_second': round(calls / sum(latencies), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--transport', nargs='+', choices=TRANSPORTS, default=list(TRANSPORTS))
+    args = parser.parse_args(argv)
+
+    server = StandInServer().start()
+    try:
+        results = {transport: run(transport, server, args.calls) for transport in args.transport}
+    finally:
+        server.stop()
+
+    sys.stdout.write(json.dumps({'calls': args.calls, 'results': results}, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
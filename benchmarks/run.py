@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.run
+    ~~~~~~~~~~~~~~
+
+    Throughput and latency percentiles against the local stand-in server.
+
+    Every scenario runs against a fresh stand-in server and the results are
+    written as JSON so that runs of different releases can be compared.
+
+    ::
+
+      $ python -m benchmarks.run --output results.json
+      $ python -m benchmarks.run --scenario bulk reads --latency 0.01 --reject-rate 0.25
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from requests import HTTPError
+
+from pixela import (
+    __version__,
+    Pixela,
+)
+from pixela.retry import RetryPolicy
+from .server import StandInServer
+
+START = datetime(2018, 1, 1)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+
+    index = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, calls):
+    latencies = sorted(latencies)
+    result = {
+        'calls': calls,
+        'seconds': round(elapsed, 4),
+        'calls_per_second': round(calls / elapsed, 1) if elapsed else None,
+    }
+    for p in (50, 90, 99):
+        value = percentile(latencies, p)
+        result['p{p}_ms'.format(p=p)] = round(value * 1000, 3) if value is not None else None
+
+    return result
+
+
+def timed(func, latencies):
+    start = time.perf_counter()
+    res = func()
+    latencies.append(time.perf_counter() - start)
+
+    return res
+
+
+def single(client, args):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.calls):
+        timed(lambda: client.create_pixel(graph_id='bench', quantity=i, date=START + timedelta(days=i)), latencies)
+
+    return summarize(latencies, time.perf_counter() - start, args.calls)
+
+
+def bulk(client, args):
+    pairs = ((START + timedelta(days=i), i) for i in range(args.calls))
+    start = time.perf_counter()
+    result = client.create_pixels(graph_id='bench', pairs=pairs, workers=args.threads)
+    summary = summarize([], time.perf_counter() - start, args.calls)
+    summary.update({
+        'successes': result.successes,
+        'failures': len(result.failures),
+        'retries': result.retries,
+    })
+
+    return summary
+
+
+def threads(client, args):
+    latencies = []
+    per_thread = args.calls // args.threads
+
+    def worker():
+        local = []
+        for _ in range(per_thread):
+            timed(lambda: client.increment_pixel(graph_id='bench'), local)
+        latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+
+    return summarize(latencies, time.perf_counter() - start, per_thread * args.threads)
+
+
+def reads(client, args):
+    for i in range(min(args.calls, 365)):
+        client.create_pixel(graph_id='bench', quantity=i, date=START + timedelta(days=i))
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.calls):
+        timed(lambda: client.get_pixel(graph_id='bench', date=START + timedelta(days=i % 365)), latencies)
+
+    return summarize(latencies, time.perf_counter() - start, args.calls)
+
+
+def ranges(client, args):
+    seeded = client.create_pixels(graph_id='bench', pairs=((START + timedelta(days=i), i) for i in range(365)))
+
+    def read():
+        # A range read fails as a whole once a request of it ran out of retries.
+        try:
+            return sum(1 for _ in client.iter_pixels('bench', START, START + timedelta(days=364)))
+        except HTTPError:
+            return None
+
+    latencies = []
+    calls = max(1, args.calls // 100)
+    start = time.perf_counter()
+    failures = sum(1 for _ in range(calls) if timed(read, latencies) is None)
+    summary = summarize(latencies, time.perf_counter() - start, calls)
+    summary.update({
+        'failures': failures,
+        'seed_failures': len(seeded.failures),
+    })
+
+    return summary
+
+
+def ranges_fanout(client, args):
+    client.pixels_endpoint = False
+    return ranges(client, args)
+
+
+SCENARIOS = {
+    'single': single,
+    'bulk': bulk,
+    'threads': threads,
+    'reads': reads,
+    'range': ranges,
+    'range_fanout': ranges_fanout,
+}
+
+
+def run(name, args):
+    server = StandInServer(
+        latency=args.latency,
+        reject_rate=args.reject_rate,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    ).start()
+    client = Pixela(
+        username='bench',
+        token='token',
+        pool_maxsize=args.threads,
+        retry=RetryPolicy(max_retries=args.max_retries, backoff=args.backoff),
+    )
+    client.API_ENDPOINT = server.endpoint
+    client.logger.disabled = True
+    try:
+        with client:
+            result = SCENARIOS[name](client, args)
+    finally:
+        server.stop()
+
+    result.update({
+        'scenario': name,
+        'requests': server.requests,
+        'connections': server.connections,
+        'rejected': server.rejected,
+        'errors': server.errors,
+    })
+
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenario', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write JSON to this file instead of stdout.')
+    args = parser.parse_args(argv)
+
+    report = {
+        'pixela': __version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'config': {
+            key: value for key, value in vars(args).items()
+            if key not in ('scenario', 'output')
+        },
+        'results': [run(name, args) for name in args.scenario],
+    }
+    output = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+    benchmarks.server
+    ~~~~~~~~~~~~~~~~~
+
+    Local Pixela stand-in server.
+
+    Implements the Pixela v1 endpoints used by the client with in-memory
+    state; graphs are rendered as SVG with an ``ETag``. Latency, server
+    errors and Pixela's "please retry" rejections can be injected.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import uuid
+from datetime import (
+    datetime,
+    timedelta,
+)
+from hashlib import sha1
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from urllib.parse import parse_qsl
+
+ROUTES = []
+
+
+def route(method, pattern):
+    def decorator(func):
+        ROUTES.append((method, re.compile('^/v1/' + pattern + '$'), func))
+        return func
+
+    return decorator
+
+
+def success(**kwargs):
+    return 200, dict({'message': 'Success.', 'isSuccess': True}, **kwargs)
+
+
+def failure(status, message):
+    return status, {'message': message, 'isSuccess': False}
+
+
+class Reply(object):
+    """Content other than JSON, answered with 304 when ``etag`` matches
+    the ``If-None-Match`` of the request.
+    """
+
+    def __init__(self, body, content_type, etag=None):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+
+
+class State(object):
+    """In-memory users, graphs, pixels and webhooks."""
+
+    def __init__(self, autocreate=True, list_endpoints=True):
+        self.autocreate = autocreate
+        self.list_endpoints = list_endpoints
+        self.lock = threading.Lock()
+        self.users = {}
+        self.graphs = {}
+        self.pixels = {}
+        self.webhooks = {}
+
+    def graph(self, username, graph_id):
+        key = (username, graph_id)
+        graph = self.graphs.get(key)
+        if graph is None and self.autocreate:
+            graph = {'id': graph_id, 'name': graph_id, 'unit': 'commit', 'type': 'int', 'color': 'shibafu'}
+            self.graphs[key] = graph
+            self.pixels[key] = {}
+
+        return graph
+
+    def quantity(self, graph, value):
+        return str(int(value)) if graph['type'] == 'int' else str(float(value))
+
+
+@route('POST', 'users')
+def create_user(state, params):
+    state.users[params['username']] = params['token']
+    return success()
+
+
+@route('PUT', 'users/(?P<username>[^/]+)')
+def update_user(state, params, username):
+    state.users[username] = params['newToken']
+    return success()
+
+
+@route('DELETE', 'users/(?P<username>[^/]+)')
+def delete_user(state, params, username):
+    state.users.pop(username, None)
+    return success()
+
+
+@route('POST', 'users/(?P<username>[^/]+)/graphs')
+def create_graph(state, params, username):
+    key = (username, params['id'])
+    if key in state.graphs:
+        return failure(409, 'This graph ID already exist.')
+
+    state.graphs[key] = {
+        'id': params['id'],
+        'name': params['name'],
+        'unit': params['unit'],
+        'type': params['type'],
+        'color': params['color'],
+        'timezone': params.get('timezone', 'UTC'),
+    }
+    state.pixels[key] = {}
+    return success()
+
+
+@route('GET', 'users/(?P<username>[^/]+)/graphs')
+def get_graphs(state, params, username):
+    graphs = [graph for (user, _), graph in state.graphs.items() if user == username]
+    return 200, {'graphs': graphs}
+
+
+@route('GET', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)')
+def get_graph_svg(state, params, username, graph_id):
+    pixels = state.pixels.get((username, graph_id))
+    if pixels is None:
+        return failure(404, 'Specified graph not found.')
+
+    params = params or {}
+    if 'date' in params:
+        end = datetime.strptime(params['date'], '%Y%m%d')
+    else:
+        end = datetime(*time.gmtime()[:3])
+    days = 90 if params.get('mode') == 'short' else 365
+    rects = []
+    for offset in range(days):
+        date = (end - timedelta(days=days - 1 - offset)).strftime('%Y%m%d')
+        rects.append(
+            '<rect x="{x}" y="{y}" width="10" height="10" data-date="{date}" data-count="{count}"/>'.format(
+                x=offset // 7 * 12,
+                y=offset % 7 * 12,
+                date=date,
+                count=pixels.get(date, '0'),
+            ),
+        )
+    body = '<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="84">{rects}</svg>'.format(
+        width=(days // 7 + 1) * 12,
+        rects=''.join(rects),
+    ).encode('utf-8')
+
+    return 200, Reply(body, 'image/svg+xml', '"' + sha1(body).hexdigest()[:16] + '"')
+
+
+@route('PUT', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)')
+def update_graph(state, params, username, graph_id):
+    graph = state.graph(username, graph_id)
+    if graph is None:
+        return failure(404, 'Specified graph not found.')
+
+    graph.update((k, v) for k, v in params.items() if k in ('name', 'unit', 'color', 'timezone'))
+    return success()
+
+
+@route('DELETE', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)')
+def delete_graph(state, params, username, graph_id):
+    if state.graphs.pop((username, graph_id), None) is None:
+        return failure(404, 'Specified graph not found.')
+
+    state.pixels.pop((username, graph_id), None)
+    return success()
+
+
+@route('POST', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)')
+def create_pixel(state, params, username, graph_id):
+    graph = state.graph(username, graph_id)
+    if graph is None:
+        return failure(404, 'Specified graph not found.')
+
+    state.pixels[(username, graph_id)][params['date']] = state.quantity(graph, params['quantity'])
+    return success()
+
+
+@route('PUT', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)/(?P<op>increment|decrement|add|subtract)')
+def change_pixel(state, params, username, graph_id, op):
+    graph = state.graph(username, graph_id)
+    if graph is None:
+        return failure(404, 'Specified graph not found.')
+
+    delta = float(params['quantity']) if params else 1
+    if op in ('decrement', 'subtract'):
+        delta = -delta
+
+    pixels = state.pixels[(username, graph_id)]
+    today = time.strftime('%Y%m%d', time.gmtime())
+    pixels[today] = state.quantity(graph, float(pixels.get(today, 0)) + delta)
+    return success()
+
+
+@route('GET', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)/(?P<date>[0-9]{8})')
+def get_pixel(state, params, username, graph_id, date):
+    pixels = state.pixels.get((username, graph_id), {})
+    if date not in pixels:
+        return failure(404, 'Specified pixel not found.')
+
+    return 200, {'quantity': pixels[date]}
+
+
+@route('GET', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)/pixels')
+def get_pixels(state, params, username, graph_id):
+    if not state.list_endpoints:
+        return failure(404, 'Not found.')
+
+    pixels = state.pixels.get((username, graph_id))
+    if pixels is None:
+        return failure(404, 'Specified graph not found.')
+
+    params = params or {}
+    today = time.strftime('%Y%m%d', time.gmtime())
+    start = params.get('from', '00000000')
+    end = params.get('to', today)
+    dates = sorted(date for date in pixels if start <= date <= end)
+    if params.get('withBody') == 'true':
+        return 200, {'pixels': [{'date': date, 'quantity': pixels[date]} for date in dates]}
+
+    return 200, {'pixels': dates}
+
+
+@route('GET', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)/stats')
+def get_graph_stats(state, params, username, graph_id):
+    if not state.list_endpoints:
+        return failure(404, 'Not found.')
+
+    pixels = state.pixels.get((username, graph_id))
+    if pixels is None:
+        return failure(404, 'Specified graph not found.')
+
+    quantities = [float(quantity) for quantity in pixels.values()] or [0]
+    today = pixels.get(time.strftime('%Y%m%d', time.gmtime()), 0)
+    return 200, {
+        'totalPixelsCount': len(pixels),
+        'maxQuantity': max(quantities),
+        'minQuantity': min(quantities),
+        'totalQuantity': sum(quantities),
+        'avgQuantity': sum(quantities) / len(quantities),
+        'todaysQuantity': float(today),
+    }
+
+
+@route('PUT', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)/(?P<date>[0-9]{8})')
+def update_pixel(state, params, username, graph_id, date):
+    graph = state.graph(username, graph_id)
+    if graph is None:
+        return failure(404, 'Specified graph not found.')
+
+    state.pixels[(username, graph_id)][date] = state.quantity(graph, params['quantity'])
+    return success()
+
+
+@route('DELETE', 'users/(?P<username>[^/]+)/graphs/(?P<graph_id>[^/]+)/(?P<date>[0-9]{8})')
+def delete_pixel(state, params, username, graph_id, date):
+    if state.pixels.get((username, graph_id), {}).pop(date, None) is None:
+        return failure(404, 'Specified pixel not found.')
+
+    return success()
+
+
+@route('POST', 'users/(?P<username>[^/]+)/webhooks')
+def create_webhook(state, params, username):
+    webhook_hash = uuid.uuid4().hex
+    state.webhooks[webhook_hash] = (username, params['graphID'], params['type'])
+    return success(webhookHash=webhook_hash)
+
+
+@route('GET', 'users/(?P<username>[^/]+)/webhooks')
+def get_webhooks(state, params, username):
+    webhooks = [
+        {'webhookHash': webhook_hash, 'graphID': graph_id, 'type': type}
+        for webhook_hash, (user, graph_id, type) in state.webhooks.items()
+        if user == username
+    ]
+    return 200, {'webhooks': webhooks}
+
+
+@route('POST', 'users/(?P<username>[^/]+)/webhooks/(?P<webhook_hash>[^/]+)')
+def invoke_webhook(state, params, username, webhook_hash):
+    webhook = state.webhooks.get(webhook_hash)
+    if webhook is None:
+        return failure(404, 'Specified webhook not found.')
+
+    return change_pixel(state, None, webhook[0], webhook[1], webhook[2])
+
+
+@route('DELETE', 'users/(?P<username>[^/]+)/webhooks/(?P<webhook_hash>[^/]+)')
+def delete_webhook(state, params, username, webhook_hash):
+    if state.webhooks.pop(webhook_hash, None) is None:
+        return failure(404, 'Specified webhook not found.')
+
+    return success()
+
+
+class PixelaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super(PixelaHandler, self).setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        with self.server.lock:
+            self.server.received += length
+
+        outcome = self.server.outcome()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if outcome == 'rejected':
+            status, content = 503, {
+                'message': 'Please retry this request.',
+                'isSuccess': False,
+                'isRejected': True,
+            }
+        elif outcome == 'error':
+            status, content = failure(500, 'Internal server error.')
+        else:
+            path, _, query = self.path.partition('?')
+            status, content = self.server.dispatch(self.command, path, body, query)
+
+        headers = {}
+        if isinstance(content, Reply):
+            payload, content_type = content.body, content.content_type
+            if content.etag:
+                headers['ETag'] = content.etag
+                if self.headers.get('If-None-Match') == content.etag:
+                    status, payload = 304, b''
+        else:
+            payload, content_type = json.dumps(content).encode('utf-8'), 'application/json'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _reply
+    do_POST = _reply
+    do_PUT = _reply
+    do_DELETE = _reply
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded stand-in of the Pixela v1 API on an ephemeral port.
+
+    :param latency: Seconds every request is delayed.
+    :param reject_rate: Share of requests rejected with ``isRejected``.
+    :param error_rate: Share of requests answered with a 500.
+    :param max_rate: Requests per second above which requests are rejected.
+    :param autocreate: Create unknown graphs on first write.
+    :param list_endpoints: Serve the pixels list and stats endpoints.
+    """
+
+    daemon_threads = True
+
+    # The default backlog of 5 drops the connects of a burst of threads,
+    # which are retried after a second.
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        host='127.0.0.1',
+        port=0,
+        certfile=None,
+        keyfile=None,
+        latency=0,
+        reject_rate=0,
+        error_rate=0,
+        max_rate=None,
+        autocreate=True,
+        list_endpoints=True,
+        seed=None,
+    ):
+        ThreadingHTTPServer.__init__(self, (host, port), PixelaHandler)
+        self.latency = latency
+        self.reject_rate = reject_rate
+        self.error_rate = error_rate
+        self.max_rate = max_rate
+        self.state = State(autocreate=autocreate, list_endpoints=list_endpoints)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.received = 0
+        self._random = random.Random(seed)
+        self._tokens = max_rate or 0
+        self._updated = time.monotonic()
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+            self.scheme = 'https'
+
+    def outcome(self):
+        """Count a request and decide whether it is served.
+
+        Return ``'rejected'``, ``'error'`` or ``None``. Requests are rejected
+        at random with ``reject_rate`` and whenever the rate exceeds
+        ``max_rate`` requests per second.
+        """
+        with self.lock:
+            self.requests += 1
+            draw = self._random.random()
+            rejected = draw < self.reject_rate
+            if self.max_rate:
+                now = time.monotonic()
+                self._tokens = min(self.max_rate, self._tokens + (now - self._updated) * self.max_rate)
+                self._updated = now
+                if self._tokens < 1:
+                    rejected = True
+                else:
+                    self._tokens -= 1
+            if rejected:
+                self.rejected += 1
+                return 'rejected'
+
+            if draw < self.reject_rate + self.error_rate:
+                self.errors += 1
+                return 'error'
+
+        return None
+
+    def dispatch(self, method, path, body, query=''):
+        params = json.loads(body) if body else None
+        if query:
+            params = dict(parse_qsl(query))
+        for route_method, pattern, func in ROUTES:
+            if route_method != method:
+                continue
+
+            match = pattern.match(path)
+            if match:
+                with self.state.lock:
+                    return func(self.state, params, **match.groupdict())
+
+        return failure(404, 'Not found.')
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return '{scheme}://{host}:{port}/v1'.format(scheme=self.scheme, host=host, port=port)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -13,79 +13,376 @@ __version__ = '1.3.0'
 
 import json
 import logging
+import threading
+import time
 import warnings
 from datetime import datetime
+from types import MappingProxyType
 
-from pytz import timezone
-from requests import (
-    HTTPError,
-    Session,
-)
-
+from .bulk import BulkMethodsMixin
 from .client import (
     GraphMethodsMixin,
     PixelMethodsMixin,
     UserMethodsMixin,
     WebhookMethodsMixin,
 )
+from .deadline import (
+    cap,
+    current,
+)
+from .exceptions import (
+    DeadlineExceeded,
+    PixelaConnectionError,
+    RequestTimeout,
+)
+from .hooks import RequestInfo
+from .result import (
+    error_for,
+    Result,
+)
+from .retry import (
+    is_idempotent,
+    RetryPolicy,
+)
+from .routes import (
+    Routes,
+    template,
+)
+from .svg import SvgMethodsMixin
 
 
-class Pixela(
-    GraphMethodsMixin,
-    PixelMethodsMixin,
-    UserMethodsMixin,
-    WebhookMethodsMixin,
-):
+def timezone(name):
+    """Return the tzinfo of ``name``.
+
+    ``zoneinfo`` is used where it is available, ``pytz`` otherwise.
+    """
+    try:
+        from zoneinfo import (
+            ZoneInfo,
+            ZoneInfoNotFoundError,
+        )
+    except ImportError:
+        pass
+    else:
+        try:
+            return ZoneInfo(name)
+        except ZoneInfoNotFoundError:
+            # No system time zone database and no tzdata package.
+            pass
+
+    from pytz import timezone
+
+    return timezone(name)
+
+
+class Connection(object):
+    """Transport, retry policy and hooks which requests are sent through.
+
+    :class:`Pixela` is a connection bound to one user, :class:`pixela.pool.PixelaPool`
+    shares one connection between many users. Every request carries its own
+    token, the transport holds no credentials.
+
+    ``transport`` is ``'requests'`` (the default), ``'urllib3'`` or a
+    transport instance, see :mod:`pixela.transport`.
+
+    ``timeout`` is the seconds, or ``(connect, read)`` seconds, a request
+    waits for a connection and for data; ``None`` waits forever. Use
+    :func:`pixela.deadline.limits` to change it for some calls or to give
+    them a deadline. An expired timeout raises ``RequestTimeout`` once the
+    retries are spent, an expired deadline ``DeadlineExceeded``; both are
+    counted in ``timeouts`` and ``deadlines_exceeded``.
+
+    With ``results`` requests return a compact :class:`pixela.result.Result`
+    rather than the transport's response and connection errors raise
+    ``PixelaConnectionError``.
+
+    A connection can be shared between threads. Its headers are read-only,
+    tokens are passed per request, the transports are thread-safe
+    connection pools which keep no cookies, counters are updated under a
+    lock and nothing is changed at module or class level.
+    """
+
     API_ENDPOINT = 'https://pixe.la/v1'
 
-    headers = {
+    DEFAULT_TIMEOUT = (10.0, 30.0)
+
+    headers = MappingProxyType({
         'User-Agent': 'Pixela v{version} (https://github.com/heavenshell/py-pixela)'.format(version=__version__),
         'Content-Type': 'application/json',
-    }
+    })
 
-    def __init__(self, username, token, tz=None, logger=None):
-        self.username = username
-        self.token = token
-        if tz:
-            warnings.warn('tz will remove 1.3.0', DeprecationWarning)
-        tz = tz or 'UTC'
-        self.tz = timezone(tz)
+    def __init__(
+        self,
+        tz=None,
+        logger=None,
+        pool_connections=10,
+        pool_maxsize=10,
+        rate_limiter=None,
+        retry=None,
+        cache=None,
+        hooks=None,
+        transport=None,
+        webhook_index=None,
+        catalog=None,
+        timeout=DEFAULT_TIMEOUT,
+        single_flight=None,
+        results=False,
+        svg_cache=None,
+    ):
+        # Resolved on first use, see the tz property.
+        self._tz = tz or 'UTC'
+        # A read-only copy, so that a subclass or a later change of the
+        # class attribute cannot change the headers of a running client.
+        self.headers = MappingProxyType(dict(self.headers))
+        self.logger = logger or logging.getLogger('pixela')
+        self.rate_limiter = rate_limiter
+        self.retry = retry or RetryPolicy()
+        self.cache = cache
+        self.webhook_index = webhook_index
+        self.catalog = catalog
+        self.single_flight = single_flight
+        self.svg_cache = svg_cache
+        self.results = results
+        self.hooks = list(hooks or ())
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.timeouts = 0
+        self.deadlines_exceeded = 0
+        self._counters_lock = threading.Lock()
+        self._transport = transport or 'requests'
+        self._transport_lock = threading.Lock()
+
+    def __enter__(self):
+        """Return self so that the session is closed on exit."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the pooled session."""
+        self.close()
+
+    @property
+    def tz(self):
+        tz = self._tz
+        if isinstance(tz, str):
+            tz = self._tz = timezone(tz)
+
+        return tz
+
+    @tz.setter
+    def tz(self, tz):
+        self._tz = tz
 
-        if logger is None:
-            log_format = (
-                '[%(asctime)s %(levelname)s][%(pathname)s:%(lineno)d]: %(message)s'
-            )
-            logging.basicConfig(level=logging.INFO, format=log_format)
-            logger = logging.getLogger('pixela')
+    @property
+    def transport(self):
+        # The transport and its HTTP library are loaded on the first
+        # request, so that importing and constructing the client stay cheap.
+        transport = self._transport
+        if isinstance(transport, str):
+            with self._transport_lock:
+                if isinstance(self._transport, str):
+                    self._transport = self._create_transport(self._transport)
+                transport = self._transport
 
-        self.logger = logger
+        return transport
+
+    @property
+    def session(self):
+        """The ``requests.Session`` of the default transport."""
+        return self.transport.session
+
+    @session.setter
+    def session(self, session):
+        self.transport.session = session
+
+    def _create_transport(self, name):
+        from .transport import (
+            RequestsTransport,
+            Urllib3Transport,
+        )
+
+        factory = {
+            'requests': RequestsTransport,
+            'urllib3': Urllib3Transport,
+        }[name]
+
+        return factory(
+            headers=self.headers,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+        )
+
+    def close(self):
+        if not isinstance(self._transport, str):
+            self._transport.close()
 
     def send(self, method, url, params=None, token=None):
+        res = self.request(method, url, params, token)
+        if self.results:
+            res = Result(res.status_code, res.content)
+            if not res.ok:
+                self.logger.error(error_for(res))
+        elif res.status_code >= 400:
+            from requests import HTTPError
+
+            try:
+                res.raise_for_status()
+            except HTTPError as e:
+                self.logger.error(e)
+
+        return res
+
+    def request(self, method, url, params=None, token=None, headers=None):
+        """Send a request and return the response of the transport as is,
+        whatever ``results`` is, without logging error statuses.
+
+        ``headers`` are sent along with the headers of the client.
+        """
+        transport = self.transport
+        # Pass the token per request; the transport is shared and must not
+        # keep credentials around between calls.
+        if token is not None:
+            headers = dict(headers or {})
+            headers['X-USER-TOKEN'] = token
+
+        endpoint = self.API_ENDPOINT + '/' + url
+        data = json.dumps(params) if params else None
+        timeout, deadline = current()
+        if timeout is None:
+            timeout = self.timeout
+
+        def request():
+            # Capped on every attempt, a retry gets what is left.
+            return transport.request(method, endpoint, headers, data, cap(timeout, deadline))
+
+        try:
+            if self.hooks:
+                res = self._call_with_hooks(request, transport, method, url, data, deadline)
+            else:
+                res = self._call(request, transport, method, url, deadline)
+        except DeadlineExceeded:
+            with self._counters_lock:
+                self.deadlines_exceeded += 1
+            raise
+        except Exception as e:
+            if transport.is_timeout(e):
+                with self._counters_lock:
+                    self.timeouts += 1
+                raise RequestTimeout(
+                    '{method} {url} timed out: {error}'.format(method=method.upper(), url=url, error=e),
+                ) from e
+            if self.results and isinstance(e, transport.retry_on):
+                raise PixelaConnectionError(
+                    '{method} {url} failed: {error}'.format(method=method.upper(), url=url, error=e),
+                ) from e
+            raise
+
+        return res
+
+    def _call(self, request, transport, method, url, deadline=None):
+        return self.retry.call(
+            request,
+            retry_on=transport.retry_on,
+            rate_limiter=self.rate_limiter,
+            deadline=deadline,
+            idempotent=is_idempotent(method, url),
+            is_unsent=transport.is_connect_error,
+        )
+
+    def _call_with_hooks(self, request, transport, method, url, data, deadline=None):
+        hooks = self.hooks
+        info = RequestInfo(method, template(url), url, len(data) if data else 0)
+        for hook in hooks:
+            hook.before_request(info)
+
+        start = time.perf_counter()
         try:
-            session = Session()
-            session.headers = self.headers
-            if token is not None:
-                session.headers.update({'X-USER-TOKEN': token})
-
-            endpoint = '{base_url}/{url}'.format(
-                base_url=self.API_ENDPOINT,
-                url=url,
-            )
-            data = json.dumps(params) if params else None
-            if method == 'get':
-                res = session.get(endpoint, params=data)
-            elif method == 'post':
-                res = session.post(endpoint, data=data)
-            elif method == 'put':
-                res = session.put(endpoint, data=data)
-            elif method == 'delete':
-                res = session.delete(endpoint)
-
-            session.close()
-            return res
-        except HTTPError as e:
-            self.logger.error(e)
+            res = self._call(request, transport, method, url, deadline)
+        except Exception as e:
+            info.retries = self.retry.last_retries
+            elapsed = time.perf_counter() - start
+            for hook in hooks:
+                hook.on_error(info, e, elapsed)
+            raise
+
+        info.retries = self.retry.last_retries
+        elapsed = time.perf_counter() - start
+        for hook in hooks:
+            hook.after_response(info, res, elapsed)
+
+        return res
 
     def to_ymd(self, date):
         assert isinstance(date, datetime)
-        return date.strftime('%Y%m%d')
+        return '%04d%02d%02d' % (date.year, date.month, date.day)
+
+
+class Pixela(
+    BulkMethodsMixin,
+    GraphMethodsMixin,
+    PixelMethodsMixin,
+    SvgMethodsMixin,
+    UserMethodsMixin,
+    WebhookMethodsMixin,
+    Connection,
+):
+
+    def __init__(
+        self,
+        username,
+        token,
+        tz=None,
+        logger=None,
+        pool_connections=10,
+        pool_maxsize=10,
+        rate_limiter=None,
+        retry=None,
+        coalescer=None,
+        cache=None,
+        journal=None,
+        hooks=None,
+        transport=None,
+        webhook_index=None,
+        catalog=None,
+        timeout=Connection.DEFAULT_TIMEOUT,
+        single_flight=None,
+        results=False,
+        svg_cache=None,
+    ):
+        self.username = username
+        self.token = token
+        self.routes = Routes(username)
+        if tz:
+            warnings.warn('tz will remove 1.3.0', DeprecationWarning)
+
+        Connection.__init__(
+            self,
+            tz=tz,
+            logger=logger,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            rate_limiter=rate_limiter,
+            retry=retry,
+            cache=cache,
+            hooks=hooks,
+            transport=transport,
+            webhook_index=webhook_index,
+            catalog=catalog,
+            timeout=timeout,
+            single_flight=single_flight,
+            results=results,
+            svg_cache=svg_cache,
+        )
+        if coalescer is not None:
+            coalescer.bind(self)
+            self.coalescer = coalescer
+        if journal is not None:
+            journal.bind(self)
+            self.journal = journal
+
+    def close(self):
+        if self.coalescer is not None:
+            self.coalescer.close()
+        if self.journal is not None:
+            self.journal.close()
+        Connection.close(self)
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.__main__
+    ~~~~~~~~~~~~~~~
+
+    ``python -m pixela``.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.aio
+    ~~~~~~~~~~
+
+    asyncio Pixela client.
+
+    Every mixin method returns a coroutine which resolves to an
+    ``aiohttp.ClientResponse`` whose body has already been read. Writes
+    let later reads of a ``single_flight`` send a request of their own once
+    they completed, not when the coroutine is created.
+
+    ::
+
+      async with AsyncPixela(username='YOUR_NAME', token='YOUR_TOKEN') as client:
+          res = await client.create_pixel(graph_id='test-graph', quantity=5)
+          ret = await res.json()
+
+    With ``results=True`` they resolve to a :class:`pixela.result.Result`
+    and connection errors raise ``PixelaConnectionError`` instead of being
+    logged and resolving to ``None``.
+
+    Requires ``aiohttp`` (``pip install pixela[async]``).
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import asyncio
+import functools
+import json
+import logging
+
+import aiohttp
+
+from . import Pixela
+from .client import (
+    GraphMethodsMixin,
+    PixelMethodsMixin,
+    UserMethodsMixin,
+    WebhookMethodsMixin,
+)
+from .exceptions import (
+    PixelaConnectionError,
+    RequestTimeout,
+)
+from .result import (
+    error_for,
+    Result,
+)
+from .routes import Routes
+
+
+def _invalidating(method, invalidate):
+    # The mixin methods invalidate when the coroutine is created, before
+    # the write is sent, so a read started meanwhile could still be joined
+    # after the write. Invalidate again once it completed.
+    @functools.wraps(method)
+    async def write(self, graph_id, *args, **kwargs):
+        res = await method(self, graph_id, *args, **kwargs)
+        invalidate(self, graph_id)
+
+        return res
+
+    return write
+
+
+def _forget_graphs(client, graph_id):
+    if client.single_flight is not None:
+        client.single_flight.forget_graphs(client.username)
+
+
+def _forget_graph(client, graph_id):
+    if client.single_flight is not None:
+        client.single_flight.forget_pixels(client.username, graph_id)
+        client.single_flight.forget_graphs(client.username)
+
+
+def _forget_pixels(client, graph_id):
+    if client.single_flight is not None:
+        client.single_flight.forget_pixels(client.username, graph_id)
+
+
+class AsyncPixela(
+    GraphMethodsMixin,
+    PixelMethodsMixin,
+    UserMethodsMixin,
+    WebhookMethodsMixin,
+):
+    API_ENDPOINT = Pixela.API_ENDPOINT
+
+    headers = Pixela.headers
+
+    to_ymd = Pixela.to_ymd
+
+    def __init__(
+        self,
+        username,
+        token,
+        tz=None,
+        logger=None,
+        pool_maxsize=100,
+        concurrency=None,
+        timeout=Pixela.DEFAULT_TIMEOUT,
+        single_flight=None,
+        results=False,
+    ):
+        self.username = username
+        self.token = token
+        self.routes = Routes(username)
+        self._tz = tz or 'UTC'
+        self.logger = logger or logging.getLogger('pixela')
+        self.pool_maxsize = pool_maxsize
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.single_flight = single_flight
+        self.results = results
+        self.timeouts = 0
+        self.session = None
+        self._semaphore = None
+
+    tz = Pixela.tz
+
+    create_graph = _invalidating(GraphMethodsMixin.create_graph, _forget_graphs)
+
+    update_graph = _invalidating(GraphMethodsMixin.update_graph, _forget_graph)
+
+    delete_graph = _invalidating(GraphMethodsMixin.delete_graph, _forget_graph)
+
+    create_pixel = _invalidating(PixelMethodsMixin.create_pixel, _forget_pixels)
+
+    update_pixel = _invalidating(PixelMethodsMixin.update_pixel, _forget_pixels)
+
+    delete_pixel = _invalidating(PixelMethodsMixin.delete_pixel, _forget_pixels)
+
+    increment_pixel = _invalidating(PixelMethodsMixin.increment_pixel, _forget_pixels)
+
+    decrement_pixel = _invalidating(PixelMethodsMixin.decrement_pixel, _forget_pixels)
+
+    add_pixel = _invalidating(PixelMethodsMixin.add_pixel, _forget_pixels)
+
+    subtract_pixel = _invalidating(PixelMethodsMixin.subtract_pixel, _forget_pixels)
+
+    async def __aenter__(self):
+        """Return self so that the session is closed on exit."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the pooled session."""
+        await self.close()
+
+    def _get_session(self):
+        # The session and semaphore are bound to the running loop, so they
+        # are created on first use rather than in __init__.
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize)
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=_client_timeout(self.timeout),
+            )
+            if self.concurrency:
+                self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            self._semaphore = None
+
+    async def send(self, method, url, params=None, token=None):
+        session = self._get_session()
+        headers = {'X-USER-TOKEN': token} if token is not None else None
+        endpoint = self.API_ENDPOINT + '/' + url
+        data = json.dumps(params) if params else None
+        try:
+            if self._semaphore is None:
+                return await self._request(session, method, endpoint, data, headers)
+
+            async with self._semaphore:
+                return await self._request(session, method, endpoint, data, headers)
+        except asyncio.TimeoutError as e:
+            self.timeouts += 1
+            raise RequestTimeout(
+                '{method} {url} timed out: {error}'.format(method=method.upper(), url=url, error=e),
+            ) from e
+        except aiohttp.ClientError as e:
+            if self.results:
+                raise PixelaConnectionError(
+                    '{method} {url} failed: {error}'.format(method=method.upper(), url=url, error=e),
+                ) from e
+            self.logger.error(e)
+
+    async def invoke_webhooks(self, hashes, workers=8):
+        """Invoke every webhook of ``hashes`` with at most ``workers`` in
+        flight and return ``(webhook_hash, response)`` pairs in order.
+        """
+        semaphore = asyncio.Semaphore(workers)
+
+        async def invoke(webhook_hash):
+            async with semaphore:
+                try:
+                    res = await self.invoke_webhook(webhook_hash)
+                except Exception as e:
+                    res = e
+
+            return webhook_hash, res
+
+        return list(await asyncio.gather(*[invoke(webhook_hash) for webhook_hash in hashes]))
+
+    async def webhook_hash(self, graph_id, type):
+        """Return the hash of the ``type`` webhook of a graph or ``None``.
+
+        Every lookup calls ``get_webhook``. Failed reads raise
+        ``aiohttp.ClientResponseError``, or ``APIError`` with
+        ``results=True``.
+        """
+        res = await self.get_webhook()
+        res.raise_for_status()
+        content = res.json() if self.results else await res.json()
+        for webhook in content['webhooks']:
+            if webhook['graphID'] == graph_id and webhook['type'] == type:
+                return webhook['webhookHash']
+
+        return None
+
+    async def _request(self, session, method, endpoint, data, headers):
+        async with session.request(
+            method.upper(),
+            endpoint,
+            data=data,
+            headers=headers,
+        ) as res:
+            body = await res.read()
+            if not self.results:
+                return res
+
+        result = Result(res.status, body)
+        if not result.ok:
+            self.logger.error(error_for(result))
+
+        return result
+
+
+def _client_timeout(timeout):
+    # A read timeout bounds each wait for data as with the other clients,
+    # not the whole request.
+    if timeout is None:
+        return aiohttp.ClientTimeout(total=None)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    else:
+        connect = read = timeout
+
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
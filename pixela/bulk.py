@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.bulk
+    ~~~~~~~~~~~
+
+    Bulk operations run through a bounded thread pool.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+from datetime import (
+    datetime,
+    timedelta,
+)
+from decimal import (
+    Decimal,
+    InvalidOperation,
+)
+from functools import partial
+
+from .deadline import (
+    inherit,
+    limits,
+)
+from .exceptions import DeadlineExceeded
+from .result import Result
+
+# Longest period Pixela returns from the pixels list endpoint.
+PIXELS_PAGE_DAYS = 365
+
+# Statuses of servers which do not implement the pixels list endpoint. A
+# 404 is one as well unless Pixela says the graph does not exist.
+UNSUPPORTED = (404, 405, 501)
+
+
+def run_bounded(func, items, workers):
+    """Yield ``func(item)`` for each item in completion order.
+
+    At most ``2 * workers`` items are taken from ``items`` ahead of the
+    results, so generators of any length are consumed lazily.
+    """
+    from concurrent.futures import (
+        as_completed,
+        FIRST_COMPLETED,
+        ThreadPoolExecutor,
+        wait,
+    )
+
+    limit = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+            pending.add(executor.submit(func, item))
+
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def run_ordered(func, items, workers):
+    """Yield ``func(item)`` for each item in the order of ``items``.
+
+    Like :func:`run_bounded` at most ``2 * workers`` calls are in flight,
+    but a result is only yielded once every earlier result was, so a slow
+    call holds back the ones after it instead of growing the window.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    limit = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for item in items:
+                if len(pending) >= limit:
+                    yield pending.popleft().result()
+
+                pending.append(executor.submit(func, item))
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # The consumer stopped early, do not fetch what it won't read.
+            for future in pending:
+                future.cancel()
+
+
+def days(start, end):
+    """Yield every day from ``start`` to ``end`` inclusive."""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+class BulkResult(object):
+    """Counters of a bulk write.
+
+    ``expired`` is ``True`` when the deadline stopped the write early: the
+    pairs in flight then are failures with ``DeadlineExceeded`` and the
+    pairs after them were not taken from the iterable.
+    """
+
+    __slots__ = ('successes', 'failures', 'retries', 'expired')
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = []
+        self.retries = 0
+        self.expired = False
+
+    def __repr__(self):
+        """Return a summary of the counters."""
+        return '<BulkResult successes={successes} failures={failures} retries={retries}>'.format(
+            successes=self.successes,
+            failures=len(self.failures),
+            retries=self.retries,
+        )
+
+
+class ReconcilePlan(object):
+    """Writes which make a graph match the desired pixels.
+
+    ``creates`` and ``updates`` hold ``(date, quantity)`` pairs and
+    ``deletes`` dates, all in date order. ``result`` is the
+    :class:`BulkResult` of the writes, ``None`` for a dry run.
+    """
+
+    __slots__ = ('graph_id', 'creates', 'updates', 'deletes', 'unchanged', 'result')
+
+    def __init__(self, graph_id):
+        self.graph_id = graph_id
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+        self.result = None
+
+    def __repr__(self):
+        """Return a summary of the counters."""
+        return '<ReconcilePlan creates={creates} updates={updates} deletes={deletes} unchanged={unchanged}>'.format(
+            creates=len(self.creates),
+            updates=len(self.updates),
+            deletes=len(self.deletes),
+            unchanged=self.unchanged,
+        )
+
+    @property
+    def requests(self):
+        return len(self.creates) + len(self.updates) + len(self.deletes)
+
+    def operations(self):
+        """Yield ``(method, date, quantity)`` of every write."""
+        for date, quantity in self.creates:
+            yield 'create', date, quantity
+        for date, quantity in self.updates:
+            yield 'update', date, quantity
+        for date in self.deletes:
+            yield 'delete', date, None
+
+    def to_dict(self):
+        def ymd(date):
+            return date.strftime('%Y%m%d')
+
+        return {
+            'graph_id': self.graph_id,
+            'creates': [[ymd(date), str(quantity)] for date, quantity in self.creates],
+            'updates': [[ymd(date), str(quantity)] for date, quantity in self.updates],
+            'deletes': [ymd(date) for date in self.deletes],
+            'unchanged': self.unchanged,
+        }
+
+
+class BulkMethodsMixin(object):
+
+    __slots__ = ()
+
+    pixels_endpoint = True
+
+    def create_pixels(self, graph_id, pairs, workers=8, deadline=None):
+        """Create a pixel for each ``(date, quantity)`` pair.
+
+        ``pairs`` may be any iterable; it is streamed through ``workers``
+        threads. Set ``pool_maxsize`` of the client to at least ``workers``
+        so that every thread keeps its own connection alive. Rejected
+        requests are retried by the client's retry policy.
+
+        ``deadline`` is the seconds, or a :class:`pixela.deadline.Deadline`,
+        the whole write may take, see :class:`BulkResult`.
+        """
+        return self._write_pixels(self.create_pixel, graph_id, pairs, workers, deadline)
+
+    def update_pixels(self, graph_id, pairs, workers=8, deadline=None):
+        """Update a pixel for each ``(date, quantity)`` pair."""
+        return self._write_pixels(self.update_pixel, graph_id, pairs, workers, deadline)
+
+    def iter_pixels(self, graph_id, start, end, workers=8, deadline=None):
+        """Yield ``(date, quantity)`` of every pixel from ``start`` to ``end``
+        in date order.
+
+        Dates are naive datetimes at midnight and quantities are the strings
+        Pixela returns; days without a pixel are skipped. Pixels are read a
+        year at a time from the pixels list endpoint. Where the server does
+        not implement it, or ``pixels_endpoint`` of the client is ``False``,
+        every day is fetched on its own through ``workers`` threads.
+        Either way at most one page or ``2 * workers`` responses are held.
+        Failed reads, including those of a graph which does not exist, raise
+        ``requests.HTTPError``, or the ``APIError`` of the status with
+        ``results``, and reads after ``deadline`` ``DeadlineExceeded``. They
+        are not logged, missing days and pages are expected here.
+        """
+        timeout, deadline = inherit(deadline)
+        start = datetime(start.year, start.month, start.day)
+        end = datetime(end.year, end.month, end.day)
+        if self.pixels_endpoint:
+            page_start = start
+            while page_start <= end:
+                page_end = min(end, page_start + timedelta(days=PIXELS_PAGE_DAYS - 1))
+                # Not around the yields, the consumer's own requests are
+                # not bound by this deadline.
+                with limits(timeout, deadline):
+                    res = self._read(self.routes.pixels(graph_id) + '?from={start}&to={end}&withBody=true'.format(
+                        start=self.to_ymd(page_start),
+                        end=self.to_ymd(page_end),
+                    ))
+                if res.status_code in UNSUPPORTED and page_start == start and not _graph_not_found(res):
+                    break
+
+                res.raise_for_status()
+                for pixel in sorted(res.json()['pixels'], key=lambda pixel: pixel['date']):
+                    yield datetime.strptime(pixel['date'], '%Y%m%d'), pixel['quantity']
+                page_start = page_end + timedelta(days=1)
+            else:
+                return
+
+        self._check_graph(graph_id)
+
+        def fetch(date):
+            with limits(timeout, deadline):
+                return date, self._read(self.routes.pixel(graph_id, self.to_ymd(date)))
+
+        for date, res in run_ordered(fetch, days(start, end), workers):
+            if res.status_code == 404 and not _graph_not_found(res):
+                continue
+
+            res.raise_for_status()
+            yield date, res.json()['quantity']
+
+    def reconcile(
+        self,
+        graph_id,
+        desired,
+        start=None,
+        end=None,
+        delete=False,
+        dry_run=False,
+        workers=8,
+        deadline=None,
+    ):
+        """Make the pixels of a graph from ``start`` to ``end`` match
+        ``desired`` with as few writes as possible.
+
+        ``desired`` is a mapping or an iterable of ``(date, quantity)``
+        pairs, later pairs of the same day win. The range defaults to the
+        first and last desired day. The current pixels are read with
+        :meth:`iter_pixels`; missing pixels are created, pixels whose
+        quantity differs are updated and, with ``delete``, pixels which are
+        not desired are deleted. Writes go through ``workers`` threads.
+        ``deadline`` bounds the reads and the writes together.
+
+        Return a :class:`ReconcilePlan`; with ``dry_run`` nothing is written.
+        """
+        if hasattr(desired, 'items'):
+            desired = desired.items()
+        wanted = {}
+        for date, quantity in desired:
+            if isinstance(date, str):
+                date = datetime.strptime(date, '%Y%m%d')
+            wanted[datetime(date.year, date.month, date.day)] = quantity
+
+        plan = ReconcilePlan(graph_id)
+        if start is None and wanted:
+            start = min(wanted)
+        if end is None and wanted:
+            end = max(wanted)
+        if start is None or end is None:
+            return plan
+
+        timeout, deadline = inherit(deadline)
+        start = datetime(start.year, start.month, start.day)
+        end = datetime(end.year, end.month, end.day)
+        for date, quantity in self.iter_pixels(graph_id, start, end, workers=workers, deadline=deadline):
+            if date not in wanted:
+                if delete:
+                    plan.deletes.append(date)
+                continue
+
+            target = wanted.pop(date)
+            if _same_quantity(quantity, target):
+                plan.unchanged += 1
+            else:
+                plan.updates.append((date, target))
+        plan.creates = sorted(
+            (date, quantity) for date, quantity in wanted.items() if start <= date <= end
+        )
+        if dry_run:
+            return plan
+
+        def writes():
+            for method, date, quantity in plan.operations():
+                if method == 'create':
+                    write = partial(self.create_pixel, graph_id=graph_id, quantity=quantity, date=date)
+                elif method == 'update':
+                    write = partial(self.update_pixel, graph_id=graph_id, quantity=quantity, date=date)
+                else:
+                    write = partial(self.delete_pixel, graph_id=graph_id, date=date)
+                yield date, quantity, write
+
+        plan.result = self._write_all(writes(), workers, timeout, deadline)
+
+        return plan
+
+    def _read(self, url):
+        # Through request rather than send, which logs every 404.
+        res = self.request('get', url, token=self.token)
+        if self.results:
+            res = Result(res.status_code, res.content)
+
+        return res
+
+    def _write_pixels(self, method, graph_id, pairs, workers, deadline=None):
+        timeout, deadline = inherit(deadline)
+        writes = (
+            (date, quantity, partial(method, graph_id=graph_id, quantity=quantity, date=date))
+            for date, quantity in pairs
+        )
+
+        return self._write_all(writes, workers, timeout, deadline)
+
+    def _write_all(self, writes, workers, timeout, deadline):
+        # writes yields (date, quantity, write) and write() sends one pixel.
+        def send(item):
+            date, quantity, write = item
+            try:
+                with limits(timeout, deadline):
+                    res = write()
+            except Exception as e:
+                res = e
+
+            return date, quantity, res, self.retry.last_retries
+
+        result = BulkResult()
+        for date, quantity, res, retries in run_bounded(send, _until(writes, deadline, result), workers):
+            result.retries += retries
+            if isinstance(res, DeadlineExceeded):
+                result.expired = True
+            # A journaled write returns None and is sent later.
+            if isinstance(res, Exception) or (res is not None and not res.ok):
+                result.failures.append((date, quantity, res))
+            else:
+                result.successes += 1
+
+        return result
+
+
+def _until(items, deadline, result):
+    # Stop taking items once the deadline passed, before the next one is
+    # taken, so that the rest stay in the caller's iterator.
+    items = iter(items)
+    while True:
+        if deadline is not None and deadline.expired:
+            result.expired = True
+            return
+
+        try:
+            item = next(items)
+        except StopIteration:
+            return
+
+        yield item
+
+
+def _graph_not_found(res):
+    # Pixela answers 404 both for a missing graph and a missing pixel.
+    if res.status_code != 404:
+        return False
+
+    try:
+        message = res.json().get('message') or ''
+    except (AttributeError, ValueError):
+        return False
+
+    return 'graph not found' in message.lower()
+
+
+def _same_quantity(current, desired):
+    # '5', 5 and 5.0 are the same quantity.
+    try:
+        return Decimal(str(current)) == Decimal(str(desired))
+    except InvalidOperation:
+        return str(current) == str(desired)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.cache
+    ~~~~~~~~~~~~
+
+    Read-through TTL/LRU cache for get_pixel and get_graphs.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTLS = {
+    'get_pixel': 60,
+    'get_graphs': 300,
+}
+
+
+class PixelaCache(object):
+    """Bounded cache of successful read responses.
+
+    Pixels are keyed on ``(username, graph_id, date, token)`` and the graph
+    list on ``(username, token)``, so that a handle with a wrong token is not
+    served the responses of another caller. Write methods of the client
+    invalidate the affected entries of every token, so reads after writes go
+    to the API.
+
+    :param maxsize: Maximum number of entries, the least recently used entry
+                    is evicted first.
+    :param ttls: Seconds an entry is fresh, per method name.
+    """
+
+    def __init__(self, maxsize=1024, ttls=None):
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # Entry keys by (username, graph_id) for pixels and by (username,)
+        # for the graph list, whatever the token.
+        self._groups = {}
+        # Bumped by every invalidation so that a response loaded while a
+        # write was in flight is not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of cached entries."""
+        return len(self._entries)
+
+    def fetch(self, method, key, loader):
+        """Return the cached response for ``key`` or call ``loader``."""
+        entry_key = (method,) + key
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        res = loader()
+        if res is not None and res.ok:
+            self._put(entry_key, res, now + self.ttls[method], generation)
+
+        return res
+
+    def invalidate_pixel(self, username, graph_id, date):
+        with self._lock:
+            self._generation += 1
+            for entry_key in list(self._groups.get((username, graph_id), ())):
+                if entry_key[3] == date:
+                    self._remove(entry_key)
+
+    def invalidate_graph(self, username, graph_id):
+        with self._lock:
+            self._generation += 1
+            for entry_key in list(self._groups.get((username, graph_id), ())):
+                self._remove(entry_key)
+
+    def invalidate_graphs(self, username):
+        with self._lock:
+            self._generation += 1
+            for entry_key in list(self._groups.get((username,), ())):
+                self._remove(entry_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def _put(self, entry_key, res, expires, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+
+            self._entries[entry_key] = (expires, res)
+            self._entries.move_to_end(entry_key)
+            self._groups.setdefault(self._group(entry_key), set()).add(entry_key)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_key):
+        if self._entries.pop(entry_key, None) is None:
+            return
+
+        group = self._group(entry_key)
+        keys = self._groups.get(group)
+        if keys is not None:
+            keys.discard(entry_key)
+            if not keys:
+                del self._groups[group]
+
+    @staticmethod
+    def _group(entry_key):
+        # ('get_pixel', username, graph_id, date, token) or
+        # ('get_graphs', username, token), the token is last.
+        return entry_key[1:3] if entry_key[0] == 'get_pixel' else entry_key[1:2]
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.catalog
+    ~~~~~~~~~~~~~~
+
+    Graph definitions used to validate requests before they are sent.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import re
+import threading
+import time
+from decimal import Decimal
+
+from .exceptions import ValidationError
+
+INT_PATTERN = re.compile(r'^-?[0-9]+$')
+
+FLOAT_PATTERN = re.compile(r'^-?[0-9]+(\.[0-9]+)?$')
+
+
+class GraphCatalog(object):
+    """Graphs of each user by id, read from ``get_graphs``.
+
+    Pixel writes check that the graph exists and format the quantity for
+    the type of the graph, so that a write Pixela would refuse raises
+    :class:`~pixela.exceptions.ValidationError` without a round trip.
+    ``create_graph``, ``update_graph`` and ``delete_graph`` of the client
+    keep the catalog current. When the graphs can not be read, requests
+    are sent unchecked for ``miss_interval`` seconds, or ``ttl`` seconds
+    when it is ``None``.
+
+    :param ttl: Seconds after which the graphs of a user are read again.
+    :param miss_interval: Minimum seconds between extra reads triggered by
+                          an unknown graph, which may have been created by
+                          another client. ``None`` disables them.
+    """
+
+    def __init__(self, ttl=300, miss_interval=30):
+        self.ttl = ttl
+        self.miss_interval = miss_interval
+        self.loads = 0
+        self.checks = 0
+        self.saved = 0
+        self._users = {}
+        self._failures = {}
+        # Bumped by every change so that graphs loaded while a graph was
+        # created or deleted are not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def load(self, username, graphs, generation):
+        """Replace the graphs of ``username`` with the ``graphs`` of a
+        ``get_graphs`` response sent at ``generation``.
+        """
+        entries = {graph['id']: graph for graph in graphs}
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._users[username] = (time.monotonic(), entries)
+            self.loads += 1
+
+    def graph(self, username, graph_id, loader):
+        """Return the definition of a graph, ``None`` when the graphs can
+        not be read.
+
+        ``loader`` is ``get_graphs`` of the client, which stores its
+        response in the catalog. Unknown graphs raise
+        :class:`~pixela.exceptions.ValidationError`.
+        """
+        with self._lock:
+            self.checks += 1
+            failed = self._failures.get(username)
+        backing_off = failed is not None and time.monotonic() - failed < (self.miss_interval or self.ttl)
+        # While reads fail, stale graphs are better than none.
+        loaded = self._lookup(username, graph_id, None if backing_off else self.ttl)
+        if loaded is None:
+            if backing_off:
+                return None
+
+            self._load(username, loader)
+            loaded = self._lookup(username, graph_id, None)
+            if loaded is None:
+                return None
+        elif loaded[1] is None and self.miss_interval is not None and loaded[0] >= self.miss_interval \
+                and not backing_off:
+            self._load(username, loader)
+            loaded = self._lookup(username, graph_id, None) or loaded
+
+        if loaded[1] is None:
+            with self._lock:
+                self.saved += 1
+            raise ValidationError('graph {graph_id} does not exist'.format(graph_id=graph_id), graph_id)
+
+        return loaded[1]
+
+    def quantity(self, username, graph_id, quantity, loader):
+        """Return ``quantity`` formatted for the type of the graph."""
+        graph = self.graph(username, graph_id, loader)
+        if graph is None:
+            return str(quantity)
+
+        try:
+            return format_quantity(quantity, graph.get('type'))
+        except ValueError as e:
+            with self._lock:
+                self.saved += 1
+            raise ValidationError('{error} for graph {graph_id}'.format(error=e, graph_id=graph_id), graph_id)
+
+    def add(self, username, graph):
+        with self._lock:
+            self._generation += 1
+            entry = self._users.get(username)
+            if entry is not None:
+                entry[1][graph['id']] = graph
+
+    def update(self, username, graph_id, params):
+        with self._lock:
+            self._generation += 1
+            entry = self._users.get(username)
+            if entry is not None and graph_id in entry[1]:
+                entry[1][graph_id] = dict(entry[1][graph_id], **params)
+
+    def remove(self, username, graph_id):
+        with self._lock:
+            self._generation += 1
+            entry = self._users.get(username)
+            if entry is not None:
+                entry[1].pop(graph_id, None)
+
+    def clear(self, username=None):
+        with self._lock:
+            self._generation += 1
+            if username is None:
+                self._users.clear()
+            else:
+                self._users.pop(username, None)
+
+    def _lookup(self, username, graph_id, ttl):
+        # None when the user must be loaded, otherwise the age of the
+        # entries and the graph, which is None when it is unknown.
+        with self._lock:
+            entry = self._users.get(username)
+            if entry is None:
+                return None
+
+            age = time.monotonic() - entry[0]
+            if ttl is not None and age >= ttl:
+                return None
+
+            return age, entry[1].get(graph_id)
+
+    def _load(self, username, loader):
+        # The loader stores the graphs itself. After a failed read requests
+        # go unchecked for a while rather than each paying for another one.
+        try:
+            res = loader()
+            ok = res is not None and res.ok
+        except Exception:
+            ok = False
+
+        with self._lock:
+            if ok:
+                self._failures.pop(username, None)
+            else:
+                self._failures[username] = time.monotonic()
+
+
+def format_quantity(quantity, type):
+    """Return ``quantity`` as Pixela expects it for a graph of ``type``.
+
+    Integral floats of ``int`` graphs lose their fraction and ``float``
+    graphs never get an exponent. Anything else raises ``ValueError``.
+    """
+    if isinstance(quantity, bool):
+        raise ValueError('invalid quantity {quantity!r}'.format(quantity=quantity))
+
+    if isinstance(quantity, str):
+        text = quantity.strip()
+        pattern = INT_PATTERN if type == 'int' else FLOAT_PATTERN
+        if not pattern.match(text):
+            raise ValueError('invalid {type} quantity {quantity!r}'.format(type=type, quantity=quantity))
+
+        return text
+
+    if isinstance(quantity, int):
+        return str(quantity)
+
+    if isinstance(quantity, (float, Decimal)):
+        value = Decimal(repr(quantity)) if isinstance(quantity, float) else quantity
+        if not value.is_finite():
+            raise ValueError('invalid quantity {quantity!r}'.format(quantity=quantity))
+        if type == 'int':
+            if value != value.to_integral_value():
+                raise ValueError('invalid int quantity {quantity!r}'.format(quantity=quantity))
+            return str(int(value))
+
+        return '{value:f}'.format(value=value)
+
+    raise ValueError('invalid quantity {quantity!r}'.format(quantity=quantity))
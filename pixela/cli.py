@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.cli
+    ~~~~~~~~~~
+
+    Command line interface.
+
+    ::
+
+      $ pixela ingest --graph test-graph pixels.ndjson
+      $ cat pixels.csv | pixela ingest --graph test-graph --format csv -
+      $ python -m pixela ingest --graph test-graph --dry-run pixels.ndjson
+      $ pixela reconcile --graph test-graph --delete --dry-run history.csv
+      $ pixela daemon &
+      $ pixela send increment test-graph
+
+    The credentials are read from ``--username`` and ``--token`` or the
+    ``PIXELA_USERNAME`` and ``PIXELA_TOKEN`` environment variables.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import Pixela
+from .coalesce import Coalescer
+
+# The client of a worker process, see init_worker.
+_client = None
+
+
+def read_records(stream, format, graph_id=None):
+    """Yield ``(graph_id, date, quantity)`` of every record of ``stream``.
+
+    Records are NDJSON objects or CSV rows with ``date``, ``quantity`` and
+    an optional ``graph`` which overrides ``graph_id``. Dates are
+    ``yyyyMMdd`` or ``yyyy-MM-dd`` and are yielded as ``yyyyMMdd``.
+    Invalid records are reported on stderr and skipped.
+    """
+    if format == 'csv':
+        rows = csv.DictReader(stream)
+    else:
+        rows = (line for line in stream if line.strip())
+
+    for line, row in enumerate(rows, 1):
+        try:
+            if format != 'csv':
+                row = json.loads(row)
+            date = row['date'].replace('-', '')
+            datetime.strptime(date, '%Y%m%d')
+            quantity = str(row['quantity'])
+            float(quantity)
+            record = (row.get('graph') or graph_id, date, quantity)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            _skip(line, e)
+            continue
+
+        if not record[0]:
+            _skip(line, 'no graph')
+            continue
+
+        yield record
+
+
+def _skip(line, error):
+    sys.stderr.write('skipped record {line}: {error}\n'.format(line=line, error=error))
+
+
+def deduplicate(records):
+    """Return ``{graph_id: {date: quantity}}`` of ``records``, the last
+    record of a graph and date wins.
+
+    Memory grows with the number of distinct graphs and dates, not with
+    the number of records.
+    """
+    graphs = {}
+    count = 0
+    for graph_id, date, quantity in records:
+        graphs.setdefault(graph_id, {})[date] = quantity
+        count += 1
+
+    return graphs, count
+
+
+def batches(records, size):
+    """Yield ``(graph_id, pairs)`` batches of at most ``size`` pixels while
+    ``records`` are read.
+
+    Records of a graph are merged by date, the last one wins, until the
+    graph has ``size`` dates; those are yielded in date order and the graph
+    starts over. What is left is yielded after the last record. Memory
+    grows with the number of distinct graphs, not with the records.
+    """
+    pending = {}
+    for graph_id, date, quantity in records:
+        dates = pending.setdefault(graph_id, {})
+        dates[date] = quantity
+        if len(dates) >= size:
+            del pending[graph_id]
+            yield graph_id, sorted(dates.items())
+
+    for graph_id in sorted(pending):
+        yield graph_id, sorted(pending[graph_id].items())
+
+
+def create_client(config, **kwargs):
+    client = Pixela(
+        username=config['username'],
+        token=config['token'],
+        transport=config['transport'],
+        **kwargs,
+    )
+    if config['endpoint']:
+        client.API_ENDPOINT = config['endpoint']
+
+    return client
+
+
+def init_worker(config):
+    global _client
+
+    _client = create_client(config, pool_maxsize=config['workers'])
+
+
+def ingest_batch(workers, graph_id, pairs):
+    """Write a batch with the client of this process.
+
+    Return ``(graph_id, pixels, successes, retries, failures)`` where
+    failures are ``(date, quantity, error)`` triples.
+    """
+    pairs = [(datetime.strptime(date, '%Y%m%d'), quantity) for date, quantity in pairs]
+    result = _client.update_pixels(graph_id, pairs, workers=workers)
+    failures = [
+        (date.strftime('%Y%m%d'), quantity, str(res) if isinstance(res, Exception) else res.status_code)
+        for date, quantity, res in result.failures
+    ]
+
+    return graph_id, len(pairs), result.successes, result.retries, failures
+
+
+@contextmanager
+def _records(args):
+    format = args.format
+    if format is None:
+        format = 'csv' if args.file.endswith('.csv') else 'ndjson'
+
+    if args.file == '-':
+        yield read_records(sys.stdin, format, args.graph)
+        return
+
+    with open(args.file, newline='') as stream:
+        yield read_records(stream, format, args.graph)
+
+
+def _read(args):
+    with _records(args) as records:
+        return deduplicate(records)
+
+
+def _count(records, counter):
+    for record in records:
+        counter[0] += 1
+        yield record
+
+
+def ingest(args):
+    start = time.perf_counter()
+    counter = [0]
+    if args.dry_run:
+        graphs = {}
+        with _records(args) as records:
+            for graph_id, pairs in batches(_count(records, counter), args.batch_size):
+                graphs[graph_id] = graphs.get(graph_id, 0) + len(pairs)
+        pixels = sum(graphs.values())
+        _report({
+            'records': counter[0],
+            'duplicates': counter[0] - pixels,
+            'requests': pixels,
+            'graphs': graphs,
+        })
+        return 0
+
+    config = _config(args)
+    if config is None:
+        return 2
+
+    config['workers'] = args.workers
+    totals = {'successes': 0, 'retries': 0, 'failures': 0}
+    done = 0
+    with _records(args) as records:
+        for graph_id, count, successes, retries, failures in _run(
+            config,
+            batches(_count(records, counter), args.batch_size),
+            args,
+        ):
+            done += count
+            totals['successes'] += successes
+            totals['retries'] += retries
+            totals['failures'] += len(failures)
+            for date, quantity, error in failures:
+                sys.stderr.write('failed {graph_id} {date} {quantity}: {error}\n'.format(
+                    graph_id=graph_id,
+                    date=date,
+                    quantity=quantity,
+                    error=error,
+                ))
+            if not args.quiet:
+                elapsed = time.perf_counter() - start
+                sys.stderr.write('{done} pixels, {rate:.1f} pixels/s\n'.format(
+                    done=done,
+                    rate=done / elapsed if elapsed else 0,
+                ))
+
+    elapsed = time.perf_counter() - start
+    totals.update({
+        'records': counter[0],
+        'duplicates': counter[0] - done,
+        'requests': done,
+        'seconds': round(elapsed, 3),
+        'pixels_per_second': round(done / elapsed, 1) if elapsed else None,
+    })
+    _report(totals)
+
+    return 1 if totals['failures'] else 0
+
+
+def reconcile(args):
+    config = _config(args)
+    if config is None:
+        return 2
+
+    graphs, _ = _read(args)
+    start = datetime.strptime(args.start, '%Y%m%d') if args.start else None
+    end = datetime.strptime(args.end, '%Y%m%d') if args.end else None
+    client = create_client(config, pool_maxsize=args.workers)
+    report = []
+    failures = 0
+    with client:
+        for graph_id in sorted(graphs):
+            plan = client.reconcile(
+                graph_id,
+                graphs[graph_id],
+                start=start,
+                end=end,
+                delete=args.delete,
+                dry_run=args.dry_run,
+                workers=args.workers,
+            )
+            if args.dry_run:
+                summary = plan.to_dict()
+            else:
+                summary = {
+                    'graph_id': graph_id,
+                    'creates': len(plan.creates),
+                    'updates': len(plan.updates),
+                    'deletes': len(plan.deletes),
+                    'unchanged': plan.unchanged,
+                    'successes': plan.result.successes,
+                    'retries': plan.result.retries,
+                    'failures': len(plan.result.failures),
+                }
+                failures += len(plan.result.failures)
+                for date, quantity, error in plan.result.failures:
+                    sys.stderr.write('failed {graph_id} {date:%Y%m%d} {quantity}: {error}\n'.format(
+                        graph_id=graph_id,
+                        date=date,
+                        quantity=quantity,
+                        error=error if isinstance(error, Exception) else error.status_code,
+                    ))
+            summary['requests'] = plan.requests
+            report.append(summary)
+    _report(report)
+
+    return 1 if failures else 0
+
+
+def daemon(args):
+    from .daemon import PixelaDaemon
+
+    config = _config(args)
+    if config is None:
+        return 2
+
+    client = create_client(config, coalescer=Coalescer(max_pending=args.max_pending, interval=args.interval))
+    # Exit through the finally clauses, so that pending increments are
+    # flushed and the socket is removed.
+    signal.signal(signal.SIGTERM, _terminate)
+    server = PixelaDaemon(client, args.socket)
+    try:
+        server.bind()
+    except (OSError, RuntimeError) as e:
+        client.close()
+        sys.stderr.write('{error}\n'.format(error=e))
+        return 1
+
+    sys.stderr.write('listening on {path}\n'.format(path=server.path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+    return 0
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def send(args):
+    from .daemon import send as send_line
+
+    try:
+        reply = send_line(' '.join(args.line), args.socket, args.timeout)
+    except (OSError, ValueError) as e:
+        sys.stderr.write('{error}\n'.format(error=e))
+        return 1
+
+    if reply.startswith('error') or not reply:
+        sys.stderr.write(reply + '\n')
+        return 1
+    if reply != 'ok':
+        sys.stdout.write(reply + '\n')
+
+    return 0
+
+
+def _config(args):
+    username = args.username or os.environ.get('PIXELA_USERNAME')
+    token = args.token or os.environ.get('PIXELA_TOKEN')
+    if not username or not token:
+        sys.stderr.write('--username and --token or PIXELA_USERNAME and PIXELA_TOKEN are required\n')
+        return None
+
+    return {
+        'username': username,
+        'token': token,
+        'transport': args.transport,
+        'endpoint': args.endpoint,
+    }
+
+
+def _run(config, batches, args):
+    # Batches of one graph go to the same process in the order they were
+    # read, so its writes share the connections of one client and a date
+    # read again after its batch was sent is written last.
+    if args.processes <= 1:
+        init_worker(config)
+        try:
+            for graph_id, pairs in batches:
+                yield ingest_batch(args.workers, graph_id, pairs)
+        finally:
+            _client.close()
+        return
+
+    from concurrent.futures import (
+        as_completed,
+        FIRST_COMPLETED,
+        ProcessPoolExecutor,
+        wait,
+    )
+
+    # Like run_bounded, at most two batches a process are submitted ahead
+    # of the results, so the input is read as it is written.
+    limit = args.processes * 2
+    executors = {}
+    shards = {}
+    pending = set()
+    try:
+        for graph_id, pairs in batches:
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+            shard = shards.setdefault(graph_id, len(shards) % args.processes)
+            if shard not in executors:
+                executors[shard] = ProcessPoolExecutor(max_workers=1, initializer=init_worker, initargs=(config,))
+            pending.add(executors[shard].submit(ingest_batch, args.workers, graph_id, pairs))
+
+        for future in as_completed(pending):
+            yield future.result()
+    finally:
+        for executor in executors.values():
+            executor.shutdown()
+
+
+def _report(stats):
+    sys.stdout.write(json.dumps(stats, indent=2, sort_keys=True) + '\n')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pixela', description='Pixela command line client.')
+    parser.add_argument('--username', help='Defaults to PIXELA_USERNAME.')
+    parser.add_argument('--token', help='Defaults to PIXELA_TOKEN.')
+    parser.add_argument('--endpoint', help='API endpoint, defaults to {endpoint}.'.format(endpoint=Pixela.API_ENDPOINT))
+    parser.add_argument('--transport', choices=('requests', 'urllib3'), default='requests')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser('ingest', help='Write pixels from NDJSON or CSV records.')
+    command.add_argument('file', help='NDJSON or CSV file, - for stdin.')
+    command.add_argument('--graph', help='Graph of records without a graph field.')
+    command.add_argument(
+        '--format',
+        choices=('ndjson', 'csv'),
+        help='Defaults to the file extension, NDJSON for stdin.',
+    )
+    command.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    command.add_argument('--workers', type=int, default=8, help='Threads per process.')
+    command.add_argument('--batch-size', type=int, default=1000)
+    command.add_argument('--dry-run', action='store_true', help='Report the requests without sending them.')
+    command.add_argument('--quiet', action='store_true', help='Do not print progress.')
+    command.set_defaults(func=ingest)
+
+    command = commands.add_parser('reconcile', help='Write only the pixels which differ from NDJSON or CSV records.')
+    command.add_argument('file', help='NDJSON or CSV file, - for stdin.')
+    command.add_argument('--graph', help='Graph of records without a graph field.')
+    command.add_argument(
+        '--format',
+        choices=('ndjson', 'csv'),
+        help='Defaults to the file extension, NDJSON for stdin.',
+    )
+    command.add_argument('--start', help='First day yyyyMMdd, defaults to the first day of the records.')
+    command.add_argument('--end', help='Last day yyyyMMdd, defaults to the last day of the records.')
+    command.add_argument('--delete', action='store_true', help='Delete pixels which are not in the records.')
+    command.add_argument('--workers', type=int, default=8)
+    command.add_argument('--dry-run', action='store_true', help='Print the plan without writing.')
+    command.set_defaults(func=reconcile)
+
+    command = commands.add_parser('daemon', help='Serve commands on a Unix domain socket.')
+    command.add_argument('--socket', help='Defaults to PIXELA_SOCKET or pixela-UID.sock in the temp directory.')
+    command.add_argument('--interval', type=float, default=5.0, help='Seconds between flushes of increments.')
+    command.add_argument('--max-pending', type=int, default=100, help='Pending increments which trigger a flush.')
+    command.set_defaults(func=daemon)
+
+    command = commands.add_parser('send', help='Send one command to the daemon.')
+    command.add_argument('line', nargs='+', help='Command and arguments, e.g. increment test-graph.')
+    command.add_argument('--socket', help='Defaults to PIXELA_SOCKET or pixela-UID.sock in the temp directory.')
+    command.add_argument('--timeout', type=float, default=5.0)
+    command.set_defaults(func=send)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+
+    return args.func(args)
@@ -11,9 +11,28 @@
 """
 from datetime import datetime
 
+from . import routes
+from .bulk import run_ordered
+from .deadline import (
+    inherit,
+    limits,
+)
+
 
 class GraphMethodsMixin(object):
 
+    __slots__ = ()
+
+    cache = None
+
+    catalog = None
+
+    single_flight = None
+
+    svg_cache = None
+
+    webhook_index = None
+
     def create_graph(self, graph_id, name, unit, type, color, timezone=None):
         params = {
             'id': graph_id,
@@ -24,41 +43,69 @@ class GraphMethodsMixin(object):
         }
         if timezone:
             params['timezone'] = timezone
-        return self.send(
+        res = self.send(
             method='post',
-            url='users/{username}/graphs'.format(username=self.username),
+            url=self.routes.graphs,
             params=params,
             token=self.token,
         )
+        if self.single_flight is not None:
+            self.single_flight.forget_graphs(self.username)
+        if self.cache is not None:
+            self.cache.invalidate_graphs(self.username)
+        if self.catalog is not None and res is not None and res.ok:
+            self.catalog.add(self.username, params)
+
+        return res
 
     def get_graphs(self):
+        catalog = self.catalog
+        if catalog is not None:
+            generation = catalog.generation
+
+        def load():
+            return self.send(
+                method='get',
+                url=self.routes.graphs,
+                params=None,
+                token=self.token,
+            )
+
+        load = self._shared(('get_graphs', self.username), load)
+        if self.cache is not None:
+            res = self.cache.fetch('get_graphs', (self.username, self.token), load)
+        else:
+            res = load()
+        if catalog is not None and res is not None and res.ok:
+            catalog.load(self.username, res.json()['graphs'], generation)
+
+        return res
+
+    def get_graph_stats(self, graph_id):
+        """Return the pixel count, total, min, max and average quantity of a
+        graph in one request.
+        """
         return self.send(
             method='get',
-            url='users/{username}/graphs'.format(username=self.username),
+            url=self.routes.stats(graph_id),
             params=None,
             token=self.token,
         )
 
     def graph_url(self, graph_id, date=None, mode=None):
-        url = '{endpoint}/users/{username}/graphs/{graph_id}'.format(
-            endpoint=self.API_ENDPOINT,
-            username=self.username,
-            graph_id=graph_id,
-        )
-        params = {
-            'date': self.to_ymd(date) if date else False,
-            'mode': mode if mode == 'short' else False,
-        }
-        query = ''
-        for p in params:
-            if params[p]:
-                query = query + '&' if query else ''
-                query = query + '{key}={val}'.format(key=p, val=params[p])
+        return self.API_ENDPOINT + '/' + self.routes.graph(graph_id) + self._graph_query(date, mode)
+
+    def _graph_query(self, date=None, mode=None):
+        query = []
+        if date:
+            query.append('date=' + self.to_ymd(date))
+        if mode == 'short':
+            query.append('mode=short')
 
         if query:
-            return url + '?' + query
+            return '?' + '&'.join(query)
 
-        return url
+        return ''
 
     def update_graph(
         self,
@@ -81,59 +128,151 @@ class GraphMethodsMixin(object):
         if timezone:
             params['timezone'] = timezone
 
-        return self.send(
+        self._check_graph(graph_id)
+        res = self.send(
             method='put',
-            url='users/{username}/graphs/{graph_id}'.format(
-                username=self.username,
-                graph_id=graph_id,
-            ),
+            url=self.routes.graph(graph_id),
             params=params,
             token=self.token,
         )
+        self._invalidate_graph(graph_id)
+        if self.catalog is not None and res is not None and res.ok:
+            self.catalog.update(self.username, graph_id, {
+                key: value for key, value in params.items() if key != 'purge_cache_urls'
+            })
+
+        return res
 
     def delete_graph(self, graph_id):
-        return self.send(
+        self._check_graph(graph_id)
+        res = self.send(
             method='delete',
-            url='users/{username}/graphs/{graph_id}'.format(
-                username=self.username,
-                graph_id=graph_id,
-            ),
+            url=self.routes.graph(graph_id),
             params=None,
             token=self.token,
         )
+        self._invalidate_graph(graph_id)
+        if self.webhook_index is not None:
+            # Pixela deletes the webhooks of a graph along with it.
+            self.webhook_index.remove_graph(self.username, graph_id)
+        if self.catalog is not None and res is not None and res.ok:
+            self.catalog.remove(self.username, graph_id)
+
+        return res
+
+    def _invalidate_graph(self, graph_id):
+        if self.single_flight is not None:
+            self.single_flight.forget_pixels(self.username, graph_id)
+            self.single_flight.forget_graphs(self.username)
+        if self.svg_cache is not None:
+            self.svg_cache.expire(self.routes.graph(graph_id))
+        if self.cache is not None:
+            self.cache.invalidate_graph(self.username, graph_id)
+            self.cache.invalidate_graphs(self.username)
+
+    def _check_graph(self, graph_id, quantity=None):
+        # Return the quantity formatted for the graph; with a catalog a
+        # request Pixela would refuse raises ValidationError instead.
+        if self.catalog is None:
+            return None if quantity is None else str(quantity)
+
+        if quantity is None:
+            self.catalog.graph(self.username, graph_id, self.get_graphs)
+            return None
+
+        return self.catalog.quantity(self.username, graph_id, quantity, self.get_graphs)
+
+    def _shared(self, key, load):
+        # Concurrent calls with the same key and token share one load.
+        single_flight = self.single_flight
+        if single_flight is None:
+            return load
+
+        key = key + (self.token,)
+
+        return lambda: single_flight.fetch(key, load)
 
 
 class PixelMethodsMixin(object):
 
+    __slots__ = ()
+
+    cache = None
+
+    catalog = None
+
+    coalescer = None
+
+    journal = None
+
+    single_flight = None
+
+    svg_cache = None
+
     def create_pixel(self, graph_id, quantity, date=None):
         if not date:
             date = datetime.now(self.tz).today()
 
         params = {
             'date': self.to_ymd(date),
-            'quantity': str(quantity),
+            'quantity': self._check_graph(graph_id, quantity),
         }
-        return self.send(
+        if self.journal is not None:
+            return self.journal.append(graph_id, params['date'], params['quantity'])
+
+        res = self.send(
             method='post',
-            url='users/{username}/graphs/{graph_id}'.format(
-                username=self.username,
-                graph_id=graph_id,
-            ),
+            url=self.routes.graph(graph_id),
             params=params,
             token=self.token,
         )
+        self._invalidate_pixel(graph_id, params['date'])
+
+        return res
 
     def get_pixel(self, graph_id, date=None):
         if not date:
             date = datetime.now(self.tz).today()
 
+        ymd = self.to_ymd(date)
+        self._check_graph(graph_id)
+
+        def load():
+            return self.send(
+                method='get',
+                url=self.routes.pixel(graph_id, ymd),
+                params=None,
+                token=self.token,
+            )
+
+        load = self._shared(('get_pixel', self.username, graph_id, ymd), load)
+        if self.cache is not None:
+            return self.cache.fetch('get_pixel', (self.username, graph_id, ymd, self.token), load)
+
+        return load()
+
+    def get_pixels(self, graph_id, start=None, end=None, with_body=True):
+        """Return the pixels of a graph from ``start`` to ``end`` in one request.
+
+        Pixela limits the period to one year and defaults to the last year.
+        With ``with_body`` every pixel carries its date and quantity,
+        otherwise only the dates are returned.
+        """
+        query = []
+        if start:
+            query.append('from=' + self.to_ymd(start))
+        if end:
+            query.append('to=' + self.to_ymd(end))
+        if with_body:
+            query.append('withBody=true')
+
+        url = self.routes.pixels(graph_id)
+        if query:
+            url = url + '?' + '&'.join(query)
+
         return self.send(
             method='get',
-            url='users/{username}/graphs/{graph_id}/{date}'.format(
-                username=self.username,
-                graph_id=graph_id,
-                date=self.to_ymd(date),
-            ),
+            url=url,
             params=None,
             token=self.token,
         )
@@ -142,58 +281,121 @@ class PixelMethodsMixin(object):
         if not date:
             date = datetime.now(self.tz).today()
 
+        ymd = self.to_ymd(date)
         params = {
-            'quantity': str(quantity),
+            'quantity': self._check_graph(graph_id, quantity),
         }
+        if self.journal is not None:
+            return self.journal.append(graph_id, ymd, params['quantity'])
 
-        return self.send(
+        res = self.send(
             method='put',
-            url='users/{username}/graphs/{graph_id}/{date}'.format(
-                username=self.username,
-                graph_id=graph_id,
-                date=self.to_ymd(date),
-            ),
+            url=self.routes.pixel(graph_id, ymd),
             params=params,
             token=self.token,
         )
+        self._invalidate_pixel(graph_id, ymd)
+
+        return res
 
     def delete_pixel(self, graph_id, date):
-        return self.send(
+        ymd = self.to_ymd(date)
+        self._check_graph(graph_id)
+        if self.journal is not None:
+            return self.journal.append(graph_id, ymd, None)
+
+        res = self.send(
             method='delete',
-            url='users/{username}/graphs/{graph_id}/{date}'.format(
-                username=self.username,
-                graph_id=graph_id,
-                date=self.to_ymd(date),
-            ),
+            url=self.routes.pixel(graph_id, ymd),
             params=None,
             token=self.token,
         )
+        self._invalidate_pixel(graph_id, ymd)
+
+        return res
 
     def increment_pixel(self, graph_id):
-        return self.send(
+        self._check_graph(graph_id)
+        if self.coalescer is not None:
+            return self.coalescer.add(graph_id, 1)
+
+        res = self.send(
             method='put',
-            url='users/{username}/graphs/{graph_id}/increment'.format(
-                username=self.username,
-                graph_id=graph_id,
-            ),
+            url=self.routes.increment(graph_id),
             params=None,
             token=self.token,
         )
+        self._invalidate_pixel(graph_id)
+
+        return res
 
     def decrement_pixel(self, graph_id):
-        return self.send(
+        self._check_graph(graph_id)
+        if self.coalescer is not None:
+            return self.coalescer.add(graph_id, -1)
+
+        res = self.send(
             method='put',
-            url='users/{username}/graphs/{graph_id}/decrement'.format(
-                username=self.username,
-                graph_id=graph_id,
-            ),
+            url=self.routes.decrement(graph_id),
             params=None,
             token=self.token,
         )
+        self._invalidate_pixel(graph_id)
+
+        return res
+
+    def add_pixel(self, graph_id, quantity):
+        params = {
+            'quantity': self._check_graph(graph_id, quantity),
+        }
+        res = self.send(
+            method='put',
+            url=self.routes.add(graph_id),
+            params=params,
+            token=self.token,
+        )
+        self._invalidate_pixel(graph_id)
+
+        return res
+
+    def subtract_pixel(self, graph_id, quantity):
+        params = {
+            'quantity': self._check_graph(graph_id, quantity),
+        }
+        res = self.send(
+            method='put',
+            url=self.routes.subtract(graph_id),
+            params=params,
+            token=self.token,
+        )
+        self._invalidate_pixel(graph_id)
+
+        return res
+
+    def _invalidate_pixel(self, graph_id, date=None):
+        # Without a date the whole graph is dropped; the server decides which
+        # day is "today" in the graph's timezone.
+        if self.single_flight is not None:
+            self.single_flight.forget_pixels(self.username, graph_id, date)
+        if self.svg_cache is not None:
+            self.svg_cache.expire(self.routes.graph(graph_id))
+        if self.cache is None:
+            return
+
+        if date is None:
+            self.cache.invalidate_graph(self.username, graph_id)
+        else:
+            self.cache.invalidate_pixel(self.username, graph_id, date)
+
+    _check_graph = GraphMethodsMixin._check_graph
+
+    _shared = GraphMethodsMixin._shared
 
 
 class UserMethodsMixin(object):
 
+    __slots__ = ()
+
     def create_user(self, agree_terms_of_service, not_minor):
         params = {
             'token': self.token,
@@ -202,7 +404,7 @@ class UserMethodsMixin(object):
             'notMinor': 'yes' if not_minor is True else 'no',
         }
 
-        return self.send(method='post', url='users', params=params)
+        return self.send(method='post', url=routes.USERS, params=params)
 
     def update_user(self, new_token):
         params = {
@@ -210,7 +412,7 @@ class UserMethodsMixin(object):
         }
         return self.send(
             method='put',
-            url='users/{username}'.format(username=self.username),
+            url=self.routes.user,
             params=params,
             token=self.token,
         )
@@ -218,54 +420,104 @@ class UserMethodsMixin(object):
     def delete_user(self):
         return self.send(
             method='delete',
-            url='users/{username}'.format(username=self.username),
+            url=self.routes.user,
             token=self.token,
         )
 
 
 class WebhookMethodsMixin(object):
 
+    __slots__ = ()
+
+    webhook_index = None
+
     def create_webhook(self, graph_id, type):
         params = {
             'graphID': graph_id,
             'type': type,
         }
-        return self.send(
+        res = self.send(
             method='post',
-            url='users/{username}/webhooks'.format(
-                username=self.username,
-            ),
+            url=self.routes.webhooks,
             params=params,
             token=self.token,
         )
+        if self.webhook_index is not None and res is not None and res.ok:
+            self.webhook_index.add(self.username, graph_id, type, res.json()['webhookHash'])
+
+        return res
 
     def get_webhook(self):
-        return self.send(
+        index = self.webhook_index
+        if index is not None:
+            generation = index.generation
+
+        res = self.send(
             method='get',
-            url='users/{username}/webhooks'.format(
-                username=self.username,
-            ),
+            url=self.routes.webhooks,
             params=None,
             token=self.token,
         )
+        if index is not None and res is not None and res.ok:
+            index.load(self.username, res.json()['webhooks'], generation)
+
+        return res
+
+    def webhook_hash(self, graph_id, type):
+        """Return the hash of the ``type`` webhook of a graph or ``None``.
+
+        With a ``webhook_index`` only the first lookup of a user calls
+        ``get_webhook``, otherwise every lookup does. Failed reads raise
+        ``requests.HTTPError``.
+        """
+        index = self.webhook_index
+        if index is not None and index.loaded(self.username):
+            return index.get(self.username, graph_id, type)
+
+        res = self.get_webhook()
+        res.raise_for_status()
+        for webhook in res.json()['webhooks']:
+            if webhook['graphID'] == graph_id and webhook['type'] == type:
+                return webhook['webhookHash']
+
+        return None
 
     def invoke_webhook(self, webhook_hash):
         return self.send(
             method='post',
-            url='users/{username}/webhooks/{webhook_hash}'.format(
-                username=self.username,
-                webhook_hash=webhook_hash,
-            ),
+            url=self.routes.webhook(webhook_hash),
             params=None,
         )
 
+    def invoke_webhooks(self, hashes, workers=8, deadline=None):
+        """Invoke every webhook of ``hashes`` through ``workers`` threads.
+
+        Return ``(webhook_hash, response)`` pairs in the order of ``hashes``;
+        a request which raised has the exception in place of the response,
+        ``DeadlineExceeded`` for those not sent before ``deadline``.
+        A hash given twice is invoked twice.
+        """
+        timeout, deadline = inherit(deadline)
+
+        def invoke(webhook_hash):
+            try:
+                with limits(timeout, deadline):
+                    res = self.invoke_webhook(webhook_hash)
+            except Exception as e:
+                res = e
+
+            return webhook_hash, res
+
+        return list(run_ordered(invoke, hashes, workers))
+
     def delete_webhook(self, webhook_hash):
-        return self.send(
+        res = self.send(
             method='delete',
-            url='users/{username}/webhooks/{webhook_hash}'.format(
-                username=self.username,
-                webhook_hash=webhook_hash,
-            ),
+            url=self.routes.webhook(webhook_hash),
             params=None,
             token=self.token,
         )
+        if self.webhook_index is not None:
+            self.webhook_index.remove(self.username, webhook_hash)
+
+        return res
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.coalesce
+    ~~~~~~~~~~~~~~~
+
+    Coalesce increment_pixel / decrement_pixel into one write per flush.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import atexit
+import threading
+from datetime import datetime
+
+from .exceptions import ValidationError
+from .retry import is_retryable
+
+
+class Coalescer(object):
+    """Collect increments and decrements per graph and day in memory.
+
+    Buffered counters are flushed when ``max_pending`` events are pending,
+    every ``interval`` seconds and at interpreter exit. Today's net change
+    is sent with ``add_pixel`` / ``subtract_pixel``; a day that has already
+    passed is written with ``update_pixel`` after reading its quantity.
+
+    Days are counted in ``tz``, the client's (UTC) by default, while an
+    increment sent as is counts on today in the graph's timezone. Events
+    buffered before midnight in ``tz`` and flushed after it are written to
+    their day in ``tz`` with ``update_pixel``; for a graph in another
+    timezone that may not be the day the graph shows them on. Pass the
+    timezone of the graphs as ``tz``.
+
+    Writes which fail for a while are buffered again and sent with the next
+    flush. Writes Pixela refuses for good (4xx other than 429) and those
+    the client's catalog refuses are moved to ``failed`` as
+    ``(graph_id, ymd, delta, status_code, message)`` and not retried. So
+    are ``add_pixel`` / ``subtract_pixel`` writes which may have been
+    applied, a 5xx other than a rejection or an error after the request
+    was sent; their message starts with ``outcome unknown``.
+
+    :param max_pending: Pending events which trigger a flush.
+    :param interval: Seconds between background flushes.
+    :param tz: Timezone name or tzinfo the days are counted in.
+    """
+
+    def __init__(self, max_pending=100, interval=5.0, tz=None):
+        self.max_pending = max_pending
+        self.interval = interval
+        self.tz = tz
+        self.client = None
+        self.events = 0
+        self.flushes = 0
+        self.requests = 0
+        self.failed = []
+        self._counters = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+
+    def bind(self, client):
+        if isinstance(self.tz, str):
+            from . import timezone
+
+            self.tz = timezone(self.tz)
+        self.client = client
+        self._thread = threading.Thread(target=self._run, name='pixela-coalescer')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, graph_id, delta):
+        date = datetime.now(self.tz or self.client.tz)
+        key = (graph_id, self.client.to_ymd(date))
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                self._counters[key] = [date, delta]
+            else:
+                counter[1] += delta
+            self.events += 1
+            self._pending += 1
+            if self._pending >= self.max_pending:
+                self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return {key: counter[1] for key, counter in self._counters.items()}
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                counters, self._counters = self._counters, {}
+                self._pending = 0
+
+            if not counters:
+                return
+
+            today = self.client.to_ymd(datetime.now(self.tz or self.client.tz))
+            for (graph_id, ymd), (date, delta) in counters.items():
+                if delta == 0:
+                    continue
+
+                # Today's change is relative, resending one which was
+                # applied counts it twice; a past day is written as is.
+                is_today = ymd == today
+                try:
+                    res = self._write(graph_id, date, delta, is_today)
+                except ValidationError as e:
+                    self.client.logger.error(e)
+                    self._fail(graph_id, ymd, delta, None, str(e))
+                    continue
+                except Exception as e:
+                    self.client.logger.error(e)
+                    if is_today and not self._is_unsent(e):
+                        self._fail(graph_id, ymd, delta, None, 'outcome unknown: {error}'.format(error=e))
+                    else:
+                        self._restore(graph_id, ymd, date, delta)
+                    continue
+
+                if res.ok:
+                    continue
+                if is_retryable(res, idempotent=not is_today):
+                    self._restore(graph_id, ymd, date, delta)
+                elif res.status_code >= 500:
+                    self._fail(graph_id, ymd, delta, res.status_code, 'outcome unknown: ' + res.text)
+                else:
+                    self._fail(graph_id, ymd, delta, res.status_code, res.text)
+
+            self.flushes += 1
+
+    def close(self):
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _write(self, graph_id, date, delta, is_today):
+        # Return the response of the write, or of the read which failed.
+        if is_today:
+            self.requests += 1
+            if delta > 0:
+                return self.client.add_pixel(graph_id=graph_id, quantity=delta)
+
+            return self.client.subtract_pixel(graph_id=graph_id, quantity=-delta)
+
+        self.requests += 1
+        res = self.client.get_pixel(graph_id=graph_id, date=date)
+        if res.status_code == 404:
+            current = 0
+        elif res.ok:
+            quantity = res.json()['quantity']
+            current = float(quantity) if '.' in str(quantity) else int(quantity)
+        else:
+            return res
+
+        self.requests += 1
+        return self.client.update_pixel(graph_id=graph_id, quantity=current + delta, date=date)
+
+    def _is_unsent(self, error):
+        # Timeouts and connection errors of the client wrap the transport's.
+        transport = self.client.transport
+        return transport.is_connect_error(error) or (
+            error.__cause__ is not None and transport.is_connect_error(error.__cause__)
+        )
+
+    def _fail(self, graph_id, ymd, delta, status_code, message):
+        with self._lock:
+            self.failed.append((graph_id, ymd, delta, status_code, message))
+
+    def _restore(self, graph_id, ymd, date, delta):
+        with self._lock:
+            counter = self._counters.get((graph_id, ymd))
+            if counter is None:
+                self._counters[(graph_id, ymd)] = [date, delta]
+            else:
+                counter[1] += delta
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._closed.is_set():
+                break
+            self.flush()
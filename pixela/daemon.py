@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.daemon
+    ~~~~~~~~~~~~~
+
+    Long-running client behind a Unix domain socket.
+
+    Short-lived callers such as git hooks and cron jobs send one line per
+    command to the daemon instead of starting a client of their own, so
+    they skip the imports, the client construction and the TLS handshake.
+    The daemon keeps a warm client with pooled connections, and increments
+    and decrements go through its :class:`~pixela.coalesce.Coalescer`.
+
+    A command is one line of whitespace separated words and is answered
+    with one line, ``ok``, ``error <message>`` or JSON for ``stats``::
+
+      increment <graph_id>
+      decrement <graph_id>
+      add <graph_id> <quantity>
+      subtract <graph_id> <quantity>
+      update <graph_id> <quantity> [yyyyMMdd]
+      flush
+      stats
+      ping
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from datetime import datetime
+
+
+def default_socket_path():
+    """Return ``PIXELA_SOCKET`` or a per-user socket in the temp directory."""
+    path = os.environ.get('PIXELA_SOCKET')
+    if path:
+        return path
+
+    return os.path.join(tempfile.gettempdir(), 'pixela-{uid}.sock'.format(uid=os.getuid()))
+
+
+def send(line, path=None, timeout=5.0):
+    """Send one command to the daemon listening on ``path`` and return its
+    reply.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path or default_socket_path())
+        sock.sendall(line.strip().encode('utf-8') + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+
+    return b''.join(chunks).decode('utf-8').strip()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            reply = self.server.daemon.execute(line.decode('utf-8', 'replace'))
+            self.wfile.write(reply.encode('utf-8') + b'\n')
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class PixelaDaemon(object):
+    """Serve the commands of :mod:`pixela.daemon` with ``client``.
+
+    ::
+
+      client = Pixela(username='YOUR_NAME', token='YOUR_TOKEN', coalescer=Coalescer())
+      with PixelaDaemon(client) as daemon:
+          daemon.serve_forever()
+
+    The socket is created with mode ``0600`` as every caller writes with
+    the token of the daemon. Closing the daemon removes the socket and
+    closes the client, which flushes pending increments.
+
+    :param client: :class:`~pixela.Pixela` to send with.
+    :param path: Socket path, defaults to :func:`default_socket_path`.
+    """
+
+    def __init__(self, client, path=None):
+        self.client = client
+        self.path = path or default_socket_path()
+        self.commands = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = None
+        # Command name to (method, minimum and maximum number of arguments).
+        self._commands = {
+            'increment': (self._increment, 1, 1),
+            'decrement': (self._decrement, 1, 1),
+            'add': (self._add, 2, 2),
+            'subtract': (self._subtract, 2, 2),
+            'update': (self._update, 2, 3),
+            'flush': (self._flush, 0, 0),
+            'stats': (self._stats, 0, 0),
+            'ping': (self._ping, 0, 0),
+        }
+
+    def __enter__(self):
+        """Bind the socket."""
+        self.bind()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Remove the socket and close the client."""
+        self.close()
+
+    def bind(self):
+        if os.path.exists(self.path):
+            try:
+                send('ping', self.path, timeout=1.0)
+            except (ConnectionError, socket.timeout):
+                # Left behind by a daemon which did not exit cleanly.
+                os.unlink(self.path)
+            else:
+                raise RuntimeError('A daemon is already listening on {path}'.format(path=self.path))
+
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.path, _Handler)
+        finally:
+            os.umask(umask)
+        self._server.daemon = self
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """Stop :meth:`serve_forever` from another thread."""
+        if self._server is not None:
+            self._server.shutdown()
+
+    def close(self):
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+        self.client.close()
+
+    def execute(self, line):
+        """Run one command line and return the reply."""
+        words = line.split()
+        with self._lock:
+            self.commands += 1
+        if not words:
+            return self._error('empty command')
+
+        name, args = words[0], words[1:]
+        if name not in self._commands:
+            return self._error('unknown command {name}'.format(name=name))
+
+        command, minimum, maximum = self._commands[name]
+        if not minimum <= len(args) <= maximum:
+            return self._error('wrong number of arguments for {name}'.format(name=name))
+
+        try:
+            return command(*args)
+        except Exception as e:
+            self.client.logger.error(e)
+            return self._error(e)
+
+    def _error(self, message):
+        with self._lock:
+            self.errors += 1
+
+        return 'error {message}'.format(message=message)
+
+    def _reply(self, res):
+        if res is None or res.ok:
+            return 'ok'
+
+        return self._error('{status} {text}'.format(status=res.status_code, text=res.text.strip()))
+
+    def _increment(self, graph_id):
+        return self._reply(self.client.increment_pixel(graph_id=graph_id))
+
+    def _decrement(self, graph_id):
+        return self._reply(self.client.decrement_pixel(graph_id=graph_id))
+
+    def _add(self, graph_id, quantity):
+        return self._change(graph_id, _number(quantity))
+
+    def _subtract(self, graph_id, quantity):
+        return self._change(graph_id, -_number(quantity))
+
+    def _change(self, graph_id, delta):
+        if self.client.coalescer is not None:
+            self.client.coalescer.add(graph_id, delta)
+            return 'ok'
+
+        if delta < 0:
+            return self._reply(self.client.subtract_pixel(graph_id=graph_id, quantity=-delta))
+
+        return self._reply(self.client.add_pixel(graph_id=graph_id, quantity=delta))
+
+    def _update(self, graph_id, quantity, date=None):
+        _number(quantity)
+        date = datetime.strptime(date, '%Y%m%d') if date else None
+
+        return self._reply(self.client.update_pixel(graph_id=graph_id, quantity=quantity, date=date))
+
+    def _flush(self):
+        if self.client.coalescer is not None:
+            self.client.coalescer.flush()
+
+        return 'ok'
+
+    def _stats(self):
+        stats = {'commands': self.commands, 'errors': self.errors}
+        coalescer = self.client.coalescer
+        if coalescer is not None:
+            stats.update({
+                'events': coalescer.events,
+                'flushes': coalescer.flushes,
+                'requests': coalescer.requests,
+                'pending': sum(1 for delta in coalescer.pending().values() if delta),
+            })
+
+        return json.dumps(stats, sort_keys=True)
+
+    def _ping(self):
+        return 'ok'
+
+
+def _number(quantity):
+    return float(quantity) if '.' in quantity else int(quantity)
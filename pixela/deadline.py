@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.deadline
+    ~~~~~~~~~~~~~~~
+
+    Timeouts and deadlines of the requests sent by the current thread.
+
+    ::
+
+      from pixela.deadline import limits
+
+      with limits(timeout=(3.05, 10), deadline=30):
+          client.increment_pixel(graph_id='test-graph')
+          client.get_pixel(graph_id='test-graph')
+
+    Inside the block every request waits at most 3.05 seconds for a
+    connection and 10 seconds for data, and nothing is sent, retried or
+    waited for once 30 seconds have passed; ``DeadlineExceeded`` is raised
+    instead. Blocks nest, an inner deadline never extends an outer one.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from .exceptions import DeadlineExceeded
+
+_local = threading.local()
+
+_NO_LIMITS = (None, None)
+
+
+class Deadline(object):
+    """Point in time by which a piece of work has to be done.
+
+    :param seconds: Budget from now.
+    """
+
+    __slots__ = ('expires',)
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def __repr__(self):
+        """Return the seconds left."""
+        return '<Deadline remaining={remaining:.3f}>'.format(remaining=self.remaining())
+
+    @classmethod
+    def coerce(cls, deadline):
+        """Return ``deadline`` as a :class:`Deadline`; numbers are seconds."""
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+
+        return cls(deadline)
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        """Raise ``DeadlineExceeded`` if no time is left."""
+        if self.expired:
+            raise DeadlineExceeded('Deadline exceeded')
+
+
+@contextmanager
+def limits(timeout=None, deadline=None):
+    """Apply ``timeout`` and ``deadline`` to the requests of this thread.
+
+    ``timeout`` is seconds or a ``(connect, read)`` pair and replaces the
+    client's timeout. ``deadline`` is seconds from now or a
+    :class:`Deadline` shared with other threads. Yield the deadline in
+    effect.
+    """
+    previous = current()
+    deadline = earliest(previous[1], Deadline.coerce(deadline))
+    _local.limits = (previous[0] if timeout is None else timeout, deadline)
+    try:
+        yield deadline
+    finally:
+        _local.limits = previous
+
+
+def current():
+    """Return ``(timeout, deadline)`` of the innermost :func:`limits` block."""
+    return getattr(_local, 'limits', _NO_LIMITS)
+
+
+def inherit(deadline=None):
+    """Return ``(timeout, deadline)`` of this thread with ``deadline``
+    applied, for ``limits(*inherit(deadline))`` in worker threads.
+    """
+    timeout, outer = current()
+
+    return timeout, earliest(outer, Deadline.coerce(deadline))
+
+
+def earliest(first, second):
+    if first is None:
+        return second
+    if second is None or first.expires < second.expires:
+        return first
+
+    return second
+
+
+def cap(timeout, deadline):
+    """Return ``timeout`` shortened to the time left before ``deadline``.
+
+    Raise ``DeadlineExceeded`` if none is left. A read timeout bounds each
+    wait for data rather than the whole response, so a response which
+    keeps trickling in can still end after the deadline.
+    """
+    if deadline is None:
+        return timeout
+
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded('Deadline exceeded')
+
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+
+    return min(timeout, remaining)
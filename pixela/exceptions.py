@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.exceptions
+    ~~~~~~~~~~~~~~~~~
+
+    Exceptions raised by the client.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+
+
+class PixelaError(Exception):
+    """Base class of the errors raised by the client."""
+
+
+class ValidationError(PixelaError, ValueError):
+    """A request Pixela would refuse, caught before it was sent.
+
+    :param graph_id: Graph the request was for.
+    """
+
+    def __init__(self, message, graph_id=None):
+        super(ValidationError, self).__init__(message)
+        self.graph_id = graph_id
+
+
+class RequestTimeout(PixelaError, TimeoutError):
+    """No connection or no data within the timeout, after every retry."""
+
+
+class DeadlineExceeded(PixelaError, TimeoutError):
+    """The deadline passed before the work was done.
+
+    Raised instead of sending, retrying or waiting for a request.
+    """
+
+
+class PixelaConnectionError(PixelaError, ConnectionError):
+    """The request could not be sent or answered, after every retry."""
+
+
+class APIError(PixelaError):
+    """Pixela answered with an error status.
+
+    :param result: The :class:`pixela.result.Result` of the request.
+    """
+
+    def __init__(self, message, result=None):
+        super(APIError, self).__init__(message)
+        self.result = result
+
+    @property
+    def status_code(self):
+        return None if self.result is None else self.result.status_code
+
+
+class AuthenticationError(APIError):
+    """The user does not exist or the token is wrong."""
+
+
+class NotFoundError(APIError):
+    """The graph, pixel or webhook does not exist."""
+
+
+class RejectedError(APIError):
+    """Pixela asked to retry the request later, after every retry."""
+
+
+class ServerError(APIError):
+    """Pixela failed to handle the request."""
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.hooks
+    ~~~~~~~~~~~~
+
+    Instrumentation hooks called by Pixela.send.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+
+
+class RequestInfo(object):
+    """A request as seen by hooks.
+
+    ``route`` is the endpoint template such as
+    ``users/{username}/graphs/{graph_id}``, so that hooks can aggregate
+    without creating a series per URL.
+    """
+
+    __slots__ = ('method', 'route', 'url', 'bytes_sent', 'retries')
+
+    def __init__(self, method, route, url, bytes_sent):
+        self.method = method
+        self.route = route
+        self.url = url
+        self.bytes_sent = bytes_sent
+        self.retries = 0
+
+
+class Hook(object):
+    """Base class of hooks, every method is optional.
+
+    Hooks are called once per ``send`` call; retries of the call are
+    reported in ``request.retries``.
+    """
+
+    def before_request(self, request):
+        pass
+
+    def after_response(self, request, response, elapsed):
+        pass
+
+    def on_error(self, request, error, elapsed):
+        pass
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.journal
+    ~~~~~~~~~~~~~~
+
+    Durable local write-ahead journal for pixel writes.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import atexit
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pixels (
+    username TEXT NOT NULL,
+    graph_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    quantity TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (username, graph_id, date)
+);
+CREATE TABLE IF NOT EXISTS failed (
+    username TEXT NOT NULL,
+    graph_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    quantity TEXT NOT NULL,
+    status INTEGER,
+    message TEXT
+);
+"""
+
+# Quantity of a journaled delete; Pixela has no empty quantities.
+DELETED = ''
+
+
+class Journal(object):
+    """Journal pixel writes to SQLite and drain them in the background.
+
+    ``create_pixel``, ``update_pixel`` and ``delete_pixel`` of a client with
+    a journal append to the journal and return ``None`` at once. Writes to
+    the same graph and date are merged, the last one wins, so a delete
+    drops a pending write of the pixel instead of being undone by it. A
+    flusher thread sends up to ``batch_size`` pixels every ``interval``
+    seconds and deletes them once Pixela accepted them, so pending writes
+    survive a crash and are sent when the journal is opened again. Writes Pixela refuses for good (4xx
+    other than 429) are moved to the ``failed`` table.
+
+    :param path: SQLite database file.
+    :param batch_size: Pixels sent per batch.
+    :param interval: Seconds between batches while the journal is idle or
+                     the API is unavailable.
+    :param synchronous: SQLite ``synchronous`` setting. ``'FULL'`` syncs
+                        every write to disk before it returns;
+                        ``'NORMAL'`` is faster but the last writes may be
+                        lost on power loss or an OS crash, not on a crash
+                        of the process.
+    """
+
+    def __init__(self, path, batch_size=100, interval=1.0, synchronous='FULL'):
+        if synchronous not in ('FULL', 'NORMAL'):
+            raise ValueError('synchronous must be FULL or NORMAL, not {value!r}'.format(value=synchronous))
+
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.client = None
+        self.sent = 0
+        self.failed = 0
+        self.available = True
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=' + synchronous)
+        self._conn.executescript(SCHEMA)
+        self._seq = self._conn.execute('SELECT IFNULL(MAX(seq), 0) FROM pixels').fetchone()[0]
+
+    def bind(self, client):
+        self.client = client
+        self._thread = threading.Thread(target=self._run, name='pixela-journal')
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, graph_id, date, quantity):
+        """Journal a write of ``quantity``, or a delete when it is ``None``."""
+        quantity = DELETED if quantity is None else str(quantity)
+        with self._lock:
+            self._seq += 1
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pixels VALUES (?, ?, ?, ?, ?)',
+                (self.client.username, graph_id, date, quantity, self._seq),
+            )
+        self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM pixels').fetchone()[0]
+
+    def flush(self):
+        """Send journaled pixels until the journal is empty or a batch fails.
+
+        Return the number of pixels sent.
+        """
+        sent = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    rows = self._conn.execute(
+                        'SELECT graph_id, date, quantity, seq FROM pixels '
+                        'WHERE username = ? ORDER BY seq LIMIT ?',
+                        (self.client.username, self.batch_size),
+                    ).fetchall()
+
+                if not rows:
+                    self.available = True
+                    return sent
+
+                for graph_id, date, quantity, seq in rows:
+                    if not self._send(graph_id, date, quantity, seq):
+                        self.available = False
+                        return sent
+                    sent += 1
+
+    def close(self):
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+    def _send(self, graph_id, date, quantity, seq):
+        client = self.client
+        try:
+            if quantity == DELETED:
+                # Not send, a pixel which is already gone is no error.
+                res = client.request('delete', client.routes.pixel(graph_id, date), token=client.token)
+            else:
+                res = client.send(
+                    method='put',
+                    url=client.routes.pixel(graph_id, date),
+                    params={'quantity': quantity},
+                    token=client.token,
+                )
+        except Exception as e:
+            client.logger.error(e)
+            return False
+
+        client._invalidate_pixel(graph_id, date)
+        if res.ok or (quantity == DELETED and res.status_code == 404):
+            self._delete(graph_id, date, seq)
+            self.sent += 1
+            return True
+
+        if 400 <= res.status_code < 500 and res.status_code != 429:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT INTO failed VALUES (?, ?, ?, ?, ?, ?)',
+                    (client.username, graph_id, date, quantity, res.status_code, res.text),
+                )
+            self._delete(graph_id, date, seq)
+            self.failed += 1
+            return True
+
+        return False
+
+    def _delete(self, graph_id, date, seq):
+        # A newer write to the same pixel has a higher seq and stays.
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM pixels WHERE username = ? AND graph_id = ? AND date = ? AND seq = ?',
+                (self.client.username, graph_id, date, seq),
+            )
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._closed.is_set():
+                break
+            self.flush()
+            if not self.available:
+                # Back off instead of retrying on every append.
+                self._closed.wait(self.interval)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.metrics
+    ~~~~~~~~~~~~~~
+
+    Per-endpoint request metrics.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+from bisect import bisect_left
+
+from .hooks import Hook
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointStats(object):
+    __slots__ = (
+        'in_flight',
+        'statuses',
+        'errors',
+        'buckets',
+        'duration_sum',
+        'count',
+        'bytes_sent',
+        'bytes_received',
+        'retries',
+    )
+
+    def __init__(self, size):
+        self.in_flight = 0
+        self.statuses = {}
+        self.errors = {}
+        # One slot per bucket plus +Inf, cumulated on export.
+        self.buckets = [0] * (size + 1)
+        self.duration_sum = 0.0
+        self.count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+
+
+class Metrics(Hook):
+    """Collect latency histograms, status codes, bytes, retries and in-flight
+    requests per method and endpoint template.
+
+    ::
+
+      metrics = Metrics()
+      client = Pixela(username='YOUR_NAME', token='YOUR_TOKEN', hooks=[metrics])
+      metrics.snapshot()
+      metrics.prometheus()
+
+    :param buckets: Upper bounds of the latency histogram in seconds.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.bucket_bounds = tuple(buckets)
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, request):
+        key = (request.method, request.route)
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints.setdefault(key, EndpointStats(len(self.bucket_bounds)))
+
+        return stats
+
+    def before_request(self, request):
+        with self._lock:
+            self._stats(request).in_flight += 1
+
+    def after_response(self, request, response, elapsed):
+        received = len(response.content or b'')
+        with self._lock:
+            stats = self._stats(request)
+            stats.in_flight -= 1
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            self._observe(stats, request, elapsed)
+            stats.bytes_received += received
+
+    def on_error(self, request, error, elapsed):
+        name = type(error).__name__
+        with self._lock:
+            stats = self._stats(request)
+            stats.in_flight -= 1
+            stats.errors[name] = stats.errors.get(name, 0) + 1
+            self._observe(stats, request, elapsed)
+
+    def _observe(self, stats, request, elapsed):
+        stats.buckets[bisect_left(self.bucket_bounds, elapsed)] += 1
+        stats.duration_sum += elapsed
+        stats.count += 1
+        stats.bytes_sent += request.bytes_sent
+        stats.retries += request.retries
+
+    def snapshot(self):
+        """Return the metrics as a plain dict keyed by ``'METHOD route'``."""
+        with self._lock:
+            endpoints = [(key, self._copy(stats)) for key, stats in self._endpoints.items()]
+
+        snapshot = {}
+        for (method, route), stats in endpoints:
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(self.bucket_bounds + (float('inf'),), stats['buckets']):
+                cumulative += count
+                histogram[bound] = cumulative
+            stats['buckets'] = histogram
+            snapshot['{method} {route}'.format(method=method.upper(), route=route)] = stats
+
+        return snapshot
+
+    def prometheus(self, prefix='pixela'):
+        """Return the metrics in the Prometheus text exposition format."""
+        families = {
+            'requests_total': ('counter', 'Completed requests by status code.', []),
+            'errors_total': ('counter', 'Requests which raised an exception.', []),
+            'request_duration_seconds': ('histogram', 'Request latency including retries.', []),
+            'bytes_sent_total': ('counter', 'Request body bytes sent.', []),
+            'bytes_received_total': ('counter', 'Response body bytes received.', []),
+            'retries_total': ('counter', 'Retried attempts.', []),
+            'requests_in_flight': ('gauge', 'Requests in flight.', []),
+        }
+        for key, stats in sorted(self.snapshot().items()):
+            method, route = key.split(' ', 1)
+            labels = 'method="{method}",route="{route}"'.format(method=method, route=_escape(route))
+            for status, count in sorted(stats['statuses'].items()):
+                families['requests_total'][2].append(
+                    ('', '{labels},status="{status}"'.format(labels=labels, status=status), count),
+                )
+            for error, count in sorted(stats['errors'].items()):
+                families['errors_total'][2].append(
+                    ('', '{labels},error="{error}"'.format(labels=labels, error=_escape(error)), count),
+                )
+            samples = families['request_duration_seconds'][2]
+            for bound, count in stats['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                samples.append(('_bucket', '{labels},le="{le}"'.format(labels=labels, le=le), count))
+            samples.append(('_sum', labels, stats['duration_sum']))
+            samples.append(('_count', labels, stats['count']))
+            families['bytes_sent_total'][2].append(('', labels, stats['bytes_sent']))
+            families['bytes_received_total'][2].append(('', labels, stats['bytes_received']))
+            families['retries_total'][2].append(('', labels, stats['retries']))
+            families['requests_in_flight'][2].append(('', labels, stats['in_flight']))
+
+        lines = []
+        for name, (kind, help, samples) in families.items():
+            metric = '{prefix}_{name}'.format(prefix=prefix, name=name)
+            lines.append('# HELP {metric} {help}'.format(metric=metric, help=help))
+            lines.append('# TYPE {metric} {kind}'.format(metric=metric, kind=kind))
+            for suffix, labels, value in samples:
+                lines.append('{metric}{suffix}{{{labels}}} {value}'.format(
+                    metric=metric,
+                    suffix=suffix,
+                    labels=labels,
+                    value=value,
+                ))
+
+        return '\n'.join(lines) + '\n'
+
+    def _copy(self, stats):
+        return {
+            'in_flight': stats.in_flight,
+            'statuses': dict(stats.statuses),
+            'errors': dict(stats.errors),
+            'buckets': list(stats.buckets),
+            'duration_sum': stats.duration_sum,
+            'count': stats.count,
+            'bytes_sent': stats.bytes_sent,
+            'bytes_received': stats.bytes_received,
+            'retries': stats.retries,
+        }
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
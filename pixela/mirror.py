@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.mirror
+    ~~~~~~~~~~~~~
+
+    Local columnar copy of a graph.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Magic, format version, reserved, ordinal of the first day, ordinal of the
+# last synced day (0 before the first sync) and the number of days. The
+# quantities follow as little-endian float64, NaN for days without a pixel.
+HEADER = struct.Struct('<4sHHqqq')
+
+MAGIC = b'PXMR'
+
+VERSION = 1
+
+NAN = float('nan')
+
+
+class GraphMirror(object):
+    """Keep the pixels of a graph in a local array.
+
+    One float per day from the first mirrored day on holds the quantity,
+    so a date is its own index and range queries, sums and rolling windows
+    are slices of the array. NumPy arrays are used where NumPy is installed,
+    ``array.array`` otherwise. With ``path`` the mirror is saved after every
+    sync to a file NumPy maps into memory on the next start.
+
+    ::
+
+      mirror = GraphMirror(client, 'test-graph', path='test-graph.mirror')
+      mirror.sync()
+      mirror.sum(datetime(2018, 1, 1), datetime(2018, 12, 31))
+      mirror.rolling_sum(7)
+
+    Pixela has no change feed, so ``sync`` reads from the last synced day up
+    to today. Pass ``start`` to read an older period again, for example
+    after pixels were backfilled.
+
+    :param client: Client used for ``iter_pixels``.
+    :param graph_id: Graph to mirror.
+    :param path: File to persist the mirror to.
+    :param start: First day read by the first sync, one year ago by default.
+    :param workers: Threads of ``iter_pixels`` on servers without the pixels
+                    list endpoint.
+    :param use_numpy: Use NumPy arrays, by default when NumPy is installed.
+    """
+
+    def __init__(self, client, graph_id, path=None, start=None, workers=8, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ImportError('use_numpy requires numpy')
+
+        self.client = client
+        self.graph_id = graph_id
+        self.path = path
+        self.start = start
+        self.workers = workers
+        self.use_numpy = use_numpy
+        self.origin = None
+        self.synced = None
+        self._values = self._empty(0)
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def sync(self, start=None):
+        """Read the pixels changed since the last sync and return their number.
+
+        Days in the period without a pixel are cleared, so deleted pixels do
+        not linger. A failed read leaves the mirror as it was.
+        """
+        now = datetime.now(self.client.tz)
+        end = datetime(now.year, now.month, now.day)
+        if start is None:
+            if self.synced is not None:
+                start = self.synced
+            else:
+                start = self.start or end - timedelta(days=365)
+        start = datetime(start.year, start.month, start.day)
+
+        pixels = [
+            (date.toordinal(), float(quantity))
+            for date, quantity in self.client.iter_pixels(self.graph_id, start, end, workers=self.workers)
+        ]
+        with self._lock:
+            first, last = start.toordinal(), end.toordinal()
+            self._reserve(first, last)
+            values = self._values
+            values[first - self.origin:last - self.origin + 1] = self._empty(last - first + 1)
+            for day, quantity in pixels:
+                values[day - self.origin] = quantity
+            if self.synced is None or last > self.synced.toordinal():
+                self.synced = end
+            if self.path is not None:
+                self._save(self.path)
+
+        return len(pixels)
+
+    def get(self, date):
+        """Return the quantity of ``date`` or ``None`` without a pixel."""
+        if self.origin is None:
+            return None
+
+        i = date.toordinal() - self.origin
+        if not 0 <= i < len(self._values):
+            return None
+
+        value = self._values[i]
+        return None if value != value else float(value)
+
+    def values(self, start=None, end=None):
+        """Return the quantities from ``start`` to ``end``, one per day.
+
+        Days without a pixel are NaN. The result is a NumPy array or an
+        ``array.array``.
+        """
+        lo, hi = self._bounds(start, end)
+        return self._values[lo:hi]
+
+    def items(self, start=None, end=None):
+        """Yield ``(date, quantity)`` of every pixel from ``start`` to ``end``."""
+        lo, hi = self._bounds(start, end)
+        for i in range(lo, hi):
+            value = self._values[i]
+            if value == value:
+                yield datetime.fromordinal(self.origin + i), float(value)
+
+    def count(self, start=None, end=None):
+        """Return the number of pixels from ``start`` to ``end``."""
+        values = self.values(start, end)
+        if self.use_numpy:
+            return int(numpy.count_nonzero(~numpy.isnan(values)))
+
+        return sum(1 for value in values if value == value)
+
+    def sum(self, start=None, end=None):
+        """Return the total quantity from ``start`` to ``end``."""
+        values = self.values(start, end)
+        if self.use_numpy:
+            return float(numpy.nansum(values))
+
+        return sum(value for value in values if value == value)
+
+    def rolling_sum(self, window, start=None, end=None):
+        """Return the total of each ``window`` days ending from ``start +
+        window - 1`` to ``end``, counting days without a pixel as 0.
+        """
+        values = self.values(start, end)
+        if self.use_numpy:
+            totals = numpy.cumsum(numpy.nan_to_num(values))
+            if len(totals) < window:
+                return totals[:0]
+
+            return totals[window - 1:] - numpy.concatenate(([0.0], totals[:-window]))
+
+        values = [value if value == value else 0.0 for value in values]
+        sums = array('d')
+        total = 0.0
+        for i, value in enumerate(values):
+            total += value
+            if i >= window:
+                total -= values[i - window]
+            if i >= window - 1:
+                sums.append(total)
+
+        return sums
+
+    def _bounds(self, start, end):
+        if self.origin is None:
+            return 0, 0
+
+        size = len(self._values)
+        lo = 0 if start is None else min(max(start.toordinal() - self.origin, 0), size)
+        hi = size if end is None else min(max(end.toordinal() - self.origin + 1, lo), size)
+
+        return lo, hi
+
+    def _empty(self, size):
+        if self.use_numpy:
+            return numpy.full(size, NAN)
+
+        return array('d', [NAN]) * size
+
+    def _reserve(self, first, last):
+        # Grow the array so that it covers the days from first to last.
+        if self.origin is None:
+            self.origin = first
+            self._values = self._empty(last - first + 1)
+            return
+
+        before = max(self.origin - first, 0)
+        after = max(last - (self.origin + len(self._values) - 1), 0)
+        if not before and not after:
+            return
+
+        if self.use_numpy:
+            self._values = numpy.concatenate((self._empty(before), self._values, self._empty(after)))
+        else:
+            self._values = self._empty(before) + self._values + self._empty(after)
+        self.origin -= before
+
+    def _load(self, path):
+        with open(path, 'rb') as f:
+            magic, version, _, origin, synced, size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError('{path} is not a graph mirror'.format(path=path))
+
+            if self.use_numpy and size:
+                # Copy on write, days are paged in as they are read.
+                values = numpy.memmap(f, dtype='<f8', mode='c', offset=HEADER.size, shape=(size,))
+            elif self.use_numpy:
+                values = self._empty(0)
+            else:
+                values = array('d')
+                values.frombytes(f.read(size * values.itemsize))
+                if sys.byteorder == 'big':
+                    values.byteswap()
+
+        self.origin = origin if size else None
+        self.synced = datetime.fromordinal(synced) if synced else None
+        self._values = values
+
+    def _save(self, path):
+        values = self._values
+        if self.use_numpy:
+            data = numpy.asarray(values, dtype='<f8').tobytes()
+        else:
+            if sys.byteorder == 'big':
+                values = array('d', values)
+                values.byteswap()
+            data = values.tobytes()
+
+        synced = self.synced.toordinal() if self.synced is not None else 0
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, self.origin or 0, synced, len(self._values)))
+            f.write(data)
+        os.replace(tmp, path)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.pool
+    ~~~~~~~~~~~
+
+    One connection shared by many users.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+from . import (
+    Connection,
+    Pixela,
+)
+from .bulk import BulkMethodsMixin
+from .client import (
+    GraphMethodsMixin,
+    PixelMethodsMixin,
+    UserMethodsMixin,
+    WebhookMethodsMixin,
+)
+from .routes import Routes
+from .svg import SvgMethodsMixin
+
+
+class PixelaPool(Connection):
+    """Connection pool, retry policy, rate limiter, cache and hooks shared
+    by the clients of many users.
+
+    ``user`` returns a lightweight client of one user. Its token is sent
+    with each of its requests, nothing per user is kept in the pool, so
+    the clients can be created, used from any thread and dropped freely.
+
+    ::
+
+      with PixelaPool(pool_maxsize=32) as pool:
+          for username, token in tenants:
+              pool.user(username, token).increment_pixel(graph_id='test-graph')
+
+    Takes the arguments of :class:`pixela.Pixela` other than ``username``,
+    ``token``, ``coalescer`` and ``journal``.
+    """
+
+    def user(self, username, token):
+        """Return a client of ``username`` sending through this pool."""
+        return PixelaUser(self, username, token)
+
+
+class PixelaUser(
+    BulkMethodsMixin,
+    GraphMethodsMixin,
+    PixelMethodsMixin,
+    SvgMethodsMixin,
+    UserMethodsMixin,
+    WebhookMethodsMixin,
+):
+    """Client of one user of a :class:`PixelaPool`.
+
+    Has the methods of :class:`pixela.Pixela` and no state other than the
+    user's credentials and routes.
+    """
+
+    __slots__ = ('pool', 'username', 'token', 'routes')
+
+    to_ymd = Pixela.to_ymd
+
+    def __init__(self, pool, username, token):
+        self.pool = pool
+        self.username = username
+        self.token = token
+        self.routes = Routes(username)
+
+    def __repr__(self):
+        """Return the username of the client."""
+        return '<PixelaUser {username}>'.format(username=self.username)
+
+    @property
+    def API_ENDPOINT(self):
+        return self.pool.API_ENDPOINT
+
+    @property
+    def tz(self):
+        return self.pool.tz
+
+    @property
+    def logger(self):
+        return self.pool.logger
+
+    @property
+    def retry(self):
+        return self.pool.retry
+
+    @property
+    def cache(self):
+        return self.pool.cache
+
+    @property
+    def catalog(self):
+        return self.pool.catalog
+
+    @property
+    def single_flight(self):
+        return self.pool.single_flight
+
+    @property
+    def svg_cache(self):
+        return self.pool.svg_cache
+
+    @property
+    def webhook_index(self):
+        return self.pool.webhook_index
+
+    def send(self, method, url, params=None, token=None):
+        return self.pool.send(method, url, params, token)
+
+    def request(self, method, url, params=None, token=None, headers=None):
+        return self.pool.request(method, url, params, token, headers)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.result
+    ~~~~~~~~~~~~~
+
+    Compact results returned instead of the transport's responses.
+
+    ::
+
+      client = Pixela(username='YOUR_NAME', token='YOUR_TOKEN', results=True)
+      result = client.get_pixel(graph_id='test-graph')
+      result.raise_for_status()
+      result.data['quantity']
+
+    A result keeps the status code and the body bytes; headers, the
+    request, cookies and the connection of the response are dropped.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+
+from .exceptions import (
+    APIError,
+    AuthenticationError,
+    NotFoundError,
+    RejectedError,
+    ServerError,
+)
+
+_EMPTY = {}
+
+
+class Result(object):
+    """Status code and body of a request.
+
+    The body is decoded on the first use of ``data`` and kept; ``json()``
+    decodes a copy on every call like the responses of the transports.
+    """
+
+    __slots__ = ('status_code', 'content', '_data')
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self._data = None
+
+    def __repr__(self):
+        """Return the status code of the result."""
+        return '<Result [{status}]>'.format(status=self.status_code)
+
+    def __bool__(self):
+        """Return ``ok`` like ``requests.Response``."""
+        return self.ok
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def data(self):
+        data = self._data
+        if data is None:
+            data = self._data = self.json() if self.content else _EMPTY
+
+        return data
+
+    @property
+    def is_success(self):
+        """``isSuccess`` of the body, ``None`` for bodies without it."""
+        data = self.data
+        return data.get('isSuccess') if isinstance(data, dict) else None
+
+    @property
+    def message(self):
+        data = self.data
+        return data.get('message') if isinstance(data, dict) else None
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise the :class:`pixela.exceptions.APIError` of an error status."""
+        if self.status_code < 400:
+            return
+
+        raise error_for(self)
+
+
+def error_for(result):
+    """Return the :class:`pixela.exceptions.APIError` of a failed result."""
+    try:
+        data = result.data
+    except ValueError:
+        data = _EMPTY
+    if not isinstance(data, dict):
+        data = _EMPTY
+
+    status = result.status_code
+    if status in (401, 403):
+        error = AuthenticationError
+    elif status == 404:
+        error = NotFoundError
+    elif status == 429 or data.get('isRejected') is True:
+        error = RejectedError
+    elif status >= 500:
+        error = ServerError
+    else:
+        error = APIError
+
+    return error(
+        '{status}: {message}'.format(status=status, message=data.get('message') or result.text.strip()),
+        result,
+    )
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.retry
+    ~~~~~~~~~~~~
+
+    Rate limiting and retry with backoff.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+import time
+
+from .exceptions import DeadlineExceeded
+from .routes import (
+    PIXEL,
+    template,
+)
+
+
+def is_idempotent(method, url):
+    """Return True if sending the request twice has the effect of once.
+
+    Reads, deletes and updates of a pixel of a given date are. Increments,
+    webhook invocations and creations are not.
+    """
+    if method in ('get', 'delete'):
+        return True
+
+    return method == 'put' and template(url) == PIXEL
+
+
+def is_retryable(res, idempotent=True):
+    """Return True if Pixela asked to retry the request.
+
+    Pixela rejects a share of requests from non-supporter accounts with
+    ``isRejected: true``; 429 responses are retried as well. Neither was
+    applied. A 5xx may come after the request took effect, so it is only
+    retried when the request is ``idempotent``.
+    """
+    if res.status_code < 400:
+        return False
+
+    if res.status_code == 429 or (idempotent and res.status_code >= 500):
+        return True
+
+    try:
+        return res.json().get('isRejected') is True
+    except ValueError:
+        return False
+
+
+class RateLimiter(object):
+    """Token bucket shared by every thread of a client.
+
+    :param rate: Tokens added per second.
+    :param burst: Bucket size, defaults to ``rate``.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token even when the bucket is empty so that
+            # waiting threads are served in order.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.acquired += 1
+            self.waited_seconds += wait
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+
+class RetryPolicy(object):
+    """Retry retryable responses with jittered exponential backoff.
+
+    :param max_retries: Retries after the first attempt, 0 disables retry.
+    :param backoff: Base delay in seconds.
+    :param max_backoff: Upper bound of a single delay.
+    """
+
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=10.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self.giveups = 0
+        self.backoff_seconds = 0.0
+        self.wasted_seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def last_retries(self):
+        """Retries spent by the last call on the current thread."""
+        return getattr(self._local, 'retries', 0)
+
+    def is_retryable(self, res, idempotent=True):
+        return is_retryable(res, idempotent)
+
+    def delay(self, attempt, res=None):
+        if res is not None:
+            retry_after = res.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+
+        # Full jitter keeps concurrent workers from retrying in lockstep.
+        from random import uniform
+
+        return uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def call(self, func, retry_on=(), rate_limiter=None, deadline=None, idempotent=True, is_unsent=None):
+        """Call ``func`` until it returns a final response.
+
+        Exceptions listed in ``retry_on`` are retried as well and re-raised
+        once the retries are exhausted. Every attempt takes a token from
+        ``rate_limiter`` first. A retry whose backoff would end after
+        ``deadline`` is given up with ``DeadlineExceeded``.
+
+        When the request is not ``idempotent`` only the attempts which
+        provably had no effect are retried: rejections, 429 and the
+        exceptions for which ``is_unsent(error)`` is True.
+        """
+        attempt = 0
+        self._local.retries = 0
+        while True:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+
+            start = time.monotonic()
+            try:
+                res = func()
+                error = None
+                retry = self.is_retryable(res, idempotent)
+            except retry_on as e:
+                # A read timeout or a dropped connection may come after
+                # the server applied the request.
+                if not idempotent and (is_unsent is None or not is_unsent(e)):
+                    raise
+                res = None
+                error = e
+                retry = True
+
+            if not retry:
+                return res
+
+            elapsed = time.monotonic() - start
+            if attempt >= self.max_retries:
+                with self._lock:
+                    self.giveups += 1
+                    self.wasted_seconds += elapsed
+                if error is not None:
+                    raise error
+                return res
+
+            delay = self.delay(attempt, res)
+            if deadline is not None and deadline.remaining() <= delay:
+                with self._lock:
+                    self.giveups += 1
+                    self.wasted_seconds += elapsed
+                raise DeadlineExceeded(
+                    'Deadline exceeded after {attempts} attempts'.format(attempts=attempt + 1),
+                ) from error
+
+            with self._lock:
+                self.retries += 1
+                self.wasted_seconds += elapsed
+                self.backoff_seconds += delay
+
+            attempt += 1
+            self._local.retries = attempt
+            time.sleep(delay)
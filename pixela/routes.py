@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.routes
+    ~~~~~~~~~~~~~
+
+    Route table of the Pixela v1 API.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+USERS = 'users'
+USER = 'users/{username}'
+GRAPHS = 'users/{username}/graphs'
+GRAPH = 'users/{username}/graphs/{graph_id}'
+PIXEL = 'users/{username}/graphs/{graph_id}/{date}'
+PIXELS = 'users/{username}/graphs/{graph_id}/pixels'
+STATS = 'users/{username}/graphs/{graph_id}/stats'
+INCREMENT = 'users/{username}/graphs/{graph_id}/increment'
+DECREMENT = 'users/{username}/graphs/{graph_id}/decrement'
+ADD = 'users/{username}/graphs/{graph_id}/add'
+SUBTRACT = 'users/{username}/graphs/{graph_id}/subtract'
+WEBHOOKS = 'users/{username}/webhooks'
+WEBHOOK = 'users/{username}/webhooks/{webhook_hash}'
+
+_OPERATIONS = {
+    'increment': INCREMENT,
+    'decrement': DECREMENT,
+    'add': ADD,
+    'subtract': SUBTRACT,
+    'pixels': PIXELS,
+    'stats': STATS,
+}
+
+
+class Routes(object):
+    """Relative URLs of one user.
+
+    The per-user prefixes are built once so that a call only appends its
+    own path segments.
+    """
+
+    __slots__ = ('user', 'graphs', 'webhooks')
+
+    def __init__(self, username):
+        self.user = 'users/' + username
+        self.graphs = self.user + '/graphs'
+        self.webhooks = self.user + '/webhooks'
+
+    def graph(self, graph_id):
+        return self.graphs + '/' + graph_id
+
+    def pixel(self, graph_id, date):
+        return self.graphs + '/' + graph_id + '/' + date
+
+    def pixels(self, graph_id):
+        return self.graphs + '/' + graph_id + '/pixels'
+
+    def stats(self, graph_id):
+        return self.graphs + '/' + graph_id + '/stats'
+
+    def increment(self, graph_id):
+        return self.graphs + '/' + graph_id + '/increment'
+
+    def decrement(self, graph_id):
+        return self.graphs + '/' + graph_id + '/decrement'
+
+    def add(self, graph_id):
+        return self.graphs + '/' + graph_id + '/add'
+
+    def subtract(self, graph_id):
+        return self.graphs + '/' + graph_id + '/subtract'
+
+    def webhook(self, webhook_hash):
+        return self.webhooks + '/' + webhook_hash
+
+
+def template(url):
+    """Return the route template of a relative URL.
+
+    ``users/heavenshell/graphs/py-pixela/20181021`` becomes
+    ``users/{username}/graphs/{graph_id}/{date}``.
+    """
+    parts = url.split('?', 1)[0].split('/')
+    count = len(parts)
+    if count == 1:
+        return USERS
+    if count == 2:
+        return USER
+    if count == 3:
+        return GRAPHS if parts[2] == 'graphs' else WEBHOOKS
+    if count == 4:
+        return GRAPH if parts[2] == 'graphs' else WEBHOOK
+
+    return _OPERATIONS.get(parts[4], PIXEL)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.singleflight
+    ~~~~~~~~~~~~~~~~~~~
+
+    Concurrent identical reads share one request.
+
+    ::
+
+      from pixela.singleflight import SingleFlight
+
+      client = Pixela(username='YOUR_NAME', token='YOUR_TOKEN', single_flight=SingleFlight())
+
+    ``get_pixel`` and ``get_graphs`` calls made while the same read is in
+    flight wait for it and receive its response, or its exception, instead
+    of sending their own. Use :class:`AsyncSingleFlight` with
+    :class:`pixela.aio.AsyncPixela`.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import asyncio
+import threading
+
+from .deadline import current
+from .exceptions import DeadlineExceeded
+
+
+class _Flights(object):
+    # Keys are ('get_pixel', username, graph_id, date, token) and
+    # ('get_graphs', username, token).
+
+    def __init__(self):
+        self.flights = 0
+        self.collapsed = 0
+        self._calls = {}
+
+    def __len__(self):
+        """Return the number of reads in flight."""
+        return len(self._calls)
+
+    def forget_pixels(self, username, graph_id, date=None):
+        """Let the next reads of a graph's pixels send a request of their
+        own, after a write to them. Callers already waiting still share the
+        read in flight.
+        """
+        self._forget(lambda key: key[0] == 'get_pixel' and key[1:3] == (username, graph_id) and (
+            date is None or key[3] == date
+        ))
+
+    def forget_graphs(self, username):
+        self._forget(lambda key: key[:2] == ('get_graphs', username))
+
+    def _forget(self, predicate):
+        for key in [key for key in self._calls if predicate(key)]:
+            del self._calls[key]
+
+
+class _Call(object):
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(_Flights):
+    """Share reads between the threads of a client.
+
+    ``flights`` counts the requests sent and ``collapsed`` the calls which
+    received the response of another call's request. A waiting call gives
+    up with ``DeadlineExceeded`` at the deadline of its
+    :func:`pixela.deadline.limits` block.
+    """
+
+    def __init__(self):
+        super(SingleFlight, self).__init__()
+        self._lock = threading.Lock()
+
+    def fetch(self, key, loader):
+        """Return ``loader()``, or the result of the call in flight for ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.flights += 1
+                leader = True
+            else:
+                self.collapsed += 1
+                leader = False
+
+        if not leader:
+            return self._wait(call)
+
+        try:
+            call.result = loader()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def forget_pixels(self, username, graph_id, date=None):
+        with self._lock:
+            super(SingleFlight, self).forget_pixels(username, graph_id, date)
+
+    def forget_graphs(self, username):
+        with self._lock:
+            super(SingleFlight, self).forget_graphs(username)
+
+    def _wait(self, call):
+        deadline = current()[1]
+        if deadline is None:
+            call.event.wait()
+        elif not call.event.wait(max(deadline.remaining(), 0)):
+            raise DeadlineExceeded('Deadline exceeded waiting for a shared read')
+
+        if call.error is not None:
+            raise call.error
+
+        return call.result
+
+
+class AsyncSingleFlight(_Flights):
+    """Share reads between the tasks of an asyncio client.
+
+    ``fetch`` returns a coroutine. The request runs in a task of its own,
+    so cancelling the call which started it does not cancel the others.
+    Used from one event loop.
+    """
+
+    async def fetch(self, key, loader):
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(loader())
+            task.add_done_callback(lambda task: self._done(key, task))
+            self.flights += 1
+        else:
+            self.collapsed += 1
+
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieved here so that a read whose callers were all cancelled
+        # does not log "exception was never retrieved".
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.svg
+    ~~~~~~~~~~
+
+    SVG graphs served from a memory and disk cache.
+
+    ::
+
+      from pixela.svg import SvgCache
+
+      client = Pixela(
+          username='YOUR_NAME',
+          token='YOUR_TOKEN',
+          svg_cache=SvgCache(directory='/var/cache/pixela', ttl=300),
+      )
+      svg = client.fetch_graph_svg(graph_id='test-graph', mode='short')
+
+    ``fetch_graph_svg`` returns a read-only ``memoryview`` which can be
+    written to a socket or a file as is. With a ``directory`` it is a view
+    of a memory-mapped cache file, so serving a cached graph copies nothing.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .result import (
+    error_for,
+    Result,
+)
+
+SUFFIX = '.svg'
+
+
+class SvgMethodsMixin(object):
+
+    __slots__ = ()
+
+    svg_cache = None
+
+    def fetch_graph_svg(self, graph_id, date=None, mode=None):
+        """Return the SVG of a graph as a read-only ``memoryview``.
+
+        ``date`` and ``mode`` are those of :meth:`graph_url`. With an
+        ``svg_cache`` a fresh SVG is served without a request and a stale
+        one is revalidated with ``If-None-Match`` and ``If-Modified-Since``.
+        Error statuses raise :class:`pixela.exceptions.APIError`.
+        """
+        path = self.routes.graph(graph_id)
+        query = self._graph_query(date, mode)
+
+        def load(etag=None, last_modified=None):
+            headers = {}
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+            return self.request('get', path + query, headers=headers or None)
+
+        if self.svg_cache is not None:
+            return self.svg_cache.fetch(path, query, load)
+
+        res = load()
+        if not res.ok:
+            raise error_for(Result(res.status_code, res.content))
+
+        return memoryview(res.content)
+
+
+class _Entry(object):
+    # ``data`` is a memoryview of the SVG bytes or of the mapped file at
+    # ``filename``.
+
+    __slots__ = ('data', 'etag', 'last_modified', 'fetched', 'filename')
+
+    def __init__(self, data, etag, last_modified, fetched, filename=None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = fetched
+        self.filename = filename
+
+
+class SvgCache(object):
+    """Rendered SVGs kept in memory and, with ``directory``, on disk.
+
+    Graphs are keyed on their path and normalized query. Concurrent
+    fetches of a graph which is not fresh share one request. When a
+    refresh fails with a connection error, a timeout, a 429 or a 5xx the
+    stale SVG is served. Pixel and graph writes made through the client
+    expire the SVGs of the graph.
+
+    :param directory: Directory of the cache files, created if missing;
+                      ``None`` keeps SVGs in memory only.
+    :param ttl: Seconds an SVG is served without asking Pixela.
+    :param max_bytes: Bytes of SVGs held in memory or mapped, the least
+                      recently used is dropped first.
+    :param max_disk_bytes: Bytes of cache files, the least recently
+                           refreshed is deleted first.
+    """
+
+    def __init__(self, directory=None, ttl=300, max_bytes=32 * 1024 * 1024, max_disk_bytes=256 * 1024 * 1024):
+        from .singleflight import SingleFlight
+
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.refreshed = 0
+        self.stale = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.size = 0
+        self.disk_size = 0
+        self._entries = OrderedDict()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_size = sum(size for _, size, _ in self._files())
+
+    def __len__(self):
+        """Return the number of SVGs held in memory or mapped."""
+        return len(self._entries)
+
+    def fetch(self, path, query, loader):
+        """Return a view of the SVG of ``path`` and ``query``.
+
+        ``loader(etag=None, last_modified=None)`` sends the request and
+        returns the response of the transport.
+        """
+        key = path + query
+        entry = self._get(key, path)
+        if entry is not None and time.time() - entry.fetched < self.ttl:
+            self._count('hits')
+            return entry.data[:]
+
+        # A slice per caller, so that releasing it leaves the others alone.
+        return self._flights.fetch(key, lambda: self._refresh(key, path, entry, loader))[:]
+
+    def expire(self, path):
+        """Make the SVGs of the graph at ``path`` stale, so that the next
+        fetch revalidates them.
+        """
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key == path or key.startswith(path + '?'):
+                    entry.fetched = 0
+
+        if self.directory is None:
+            return
+
+        import glob
+
+        # Only the files of the graph, other processes may have written some.
+        pattern = os.path.join(glob.escape(self.directory), _digest(path) + '-*' + SUFFIX)
+        for filename in glob.glob(pattern):
+            try:
+                os.utime(filename, (0, 0))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+        if self.directory is None:
+            return
+
+        with self._disk_lock:
+            for filename, size, _ in self._files():
+                try:
+                    os.unlink(filename)
+                except OSError:
+                    continue
+                self.disk_size -= size
+
+    def _refresh(self, key, path, entry, loader):
+        try:
+            if entry is None:
+                res = loader()
+            else:
+                res = loader(entry.etag, entry.last_modified)
+        except Exception:
+            # Timeouts and connection errors: a stale graph beats no graph.
+            if entry is None:
+                raise
+            self._count('stale')
+            return entry.data
+
+        if entry is not None:
+            if res.status_code == 304:
+                self._touch(entry)
+                self._count('revalidated')
+                return entry.data
+            if res.status_code == 429 or res.status_code >= 500:
+                self._count('stale')
+                return entry.data
+
+        if not res.ok:
+            self._remove(key, path)
+            raise error_for(Result(res.status_code, res.content))
+
+        self._count('misses' if entry is None else 'refreshed')
+        headers = res.headers
+        entry = self._store(key, path, res.content, headers.get('ETag'), headers.get('Last-Modified'))
+
+        return entry.data
+
+    def _get(self, key, path):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(key, path)
+        if entry is not None:
+            self._count('disk_hits')
+            self._put(key, entry)
+
+        return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.data)
+            self._entries[key] = entry
+            self.size += len(entry.data)
+            # A mapping is unmapped once the views served from it are gone.
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.data)
+                self.evictions += 1
+
+    def _remove(self, key, path):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= len(entry.data)
+
+        if self.directory is None:
+            return
+
+        filename = self._filename(key, path)
+        with self._disk_lock:
+            try:
+                size = os.stat(filename).st_size
+                os.unlink(filename)
+            except OSError:
+                return
+            self.disk_size -= size
+
+    def _store(self, key, path, body, etag, last_modified):
+        now = time.time()
+        if self.directory is not None:
+            try:
+                entry = self._write(key, path, body, etag, last_modified, now)
+            except OSError:
+                # A full or read-only disk does not fail the fetch.
+                pass
+            else:
+                self._put(key, entry)
+                return entry
+
+        entry = _Entry(memoryview(body), etag, last_modified, now)
+        self._put(key, entry)
+
+        return entry
+
+    def _write(self, key, path, body, etag, last_modified, now):
+        import mmap
+        import tempfile
+
+        header = json.dumps({'key': key, 'etag': etag, 'last_modified': last_modified}).encode('utf-8') + b'\n'
+        filename = self._filename(key, path)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w+b') as f:
+                f.write(header)
+                f.write(body)
+                f.flush()
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with self._disk_lock:
+                try:
+                    replaced = os.stat(filename).st_size
+                except OSError:
+                    replaced = 0
+                # Readers see the old file or the new one, never a part.
+                os.replace(tmp, filename)
+                self.disk_size += len(header) + len(body) - replaced
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        if self.disk_size > self.max_disk_bytes:
+            self._evict_disk(filename)
+
+        return _Entry(memoryview(mapped)[len(header):], etag, last_modified, now, filename)
+
+    def _load(self, key, path):
+        if self.directory is None:
+            return None
+
+        import mmap
+
+        filename = self._filename(key, path)
+        try:
+            with open(filename, 'rb') as f:
+                fetched = os.fstat(f.fileno()).st_mtime
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        end = mapped.find(b'\n')
+        try:
+            header = json.loads(mapped[:end].decode('utf-8')) if end > 0 else None
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('key') != key:
+            return None
+
+        return _Entry(memoryview(mapped)[end + 1:], header.get('etag'), header.get('last_modified'), fetched, filename)
+
+    def _touch(self, entry):
+        entry.fetched = time.time()
+        if entry.filename is not None:
+            try:
+                os.utime(entry.filename)
+            except OSError:
+                pass
+
+    def _evict_disk(self, keep):
+        with self._disk_lock:
+            files = sorted(self._files(), key=lambda file: file[2])
+            total = sum(size for _, size, _ in files)
+            for filename, size, _ in files:
+                if total <= self.max_disk_bytes:
+                    break
+                if filename == keep:
+                    continue
+                try:
+                    os.unlink(filename)
+                except OSError:
+                    continue
+                total -= size
+                self.disk_evictions += 1
+            self.disk_size = total
+
+    def _files(self):
+        # (filename, size, mtime) of the cache files.
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+
+        return files
+
+    def _filename(self, key, path):
+        # Prefixed with the digest of the graph so that expire finds all
+        # the SVGs of a graph.
+        return os.path.join(self.directory, _digest(path) + '-' + _digest(key) + SUFFIX)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _digest(value):
+    from hashlib import sha1
+
+    return sha1(value.encode('utf-8')).hexdigest()[:20]
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.transport
+    ~~~~~~~~~~~~~~~~
+
+    HTTP transports requests are sent through.
+
+    A transport has a ``request(method, url, headers, body, timeout)``
+    method which returns a response with ``status_code``, ``headers``,
+    ``content``, ``ok``, ``text``, ``json()`` and ``raise_for_status()``, a
+    ``retry_on`` tuple of exceptions worth a retry, ``is_timeout(error)``
+    which tells expired timeouts from other errors,
+    ``is_connect_error(error)`` which tells the errors raised before the
+    request was sent and ``close()``.
+    ``timeout`` is seconds, a ``(connect, read)`` pair or ``None`` to wait
+    forever.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+
+
+class Response(object):
+    """Response of the transports other than :class:`RequestsTransport`."""
+
+    __slots__ = ('status_code', 'headers', 'content', 'url')
+
+    def __init__(self, status_code, headers, content, url=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    def __repr__(self):
+        """Return the status code of the response."""
+        return '<Response [{status}]>'.format(status=self.status_code)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code < 400:
+            return
+
+        from requests import HTTPError
+
+        kind = 'Client' if self.status_code < 500 else 'Server'
+        raise HTTPError(
+            '{status} {kind} Error for url: {url}'.format(status=self.status_code, kind=kind, url=self.url),
+            response=self,
+        )
+
+
+class RequestsTransport(object):
+    """Send through a pooled ``requests.Session``, the default transport."""
+
+    def __init__(self, headers=None, pool_connections=10, pool_maxsize=10):
+        from http.cookiejar import DefaultCookiePolicy
+        from requests import (
+            ConnectionError,
+            ConnectTimeout,
+            Session,
+            Timeout,
+        )
+        from requests.adapters import HTTPAdapter
+        from urllib3.exceptions import NewConnectionError
+
+        self.retry_on = (ConnectionError, Timeout)
+        self._timeout_error = Timeout
+        self._connection_error = ConnectionError
+        self._connect_timeout = ConnectTimeout
+        self._refused_error = NewConnectionError
+        self.session = Session()
+        self.session.headers.update(headers or {})
+        # Pixela sets no cookies; one kept by the shared session would be
+        # sent with the requests of every thread and every user of a pool.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, headers=None, body=None, timeout=None):
+        # Session.get/post/put/delete rather than Session.request, so that
+        # they can be patched in tests.
+        return getattr(self.session, method)(url, data=body, headers=headers, timeout=timeout)
+
+    def is_timeout(self, error):
+        return isinstance(error, self._timeout_error)
+
+    def is_connect_error(self, error):
+        if isinstance(error, self._connect_timeout):
+            return True
+        if not isinstance(error, self._connection_error) or not error.args:
+            return False
+
+        # requests wraps the MaxRetryError of urllib3, whose reason is the
+        # error of the connection.
+        return isinstance(getattr(error.args[0], 'reason', None), self._refused_error)
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(object):
+    """Send through a ``urllib3.PoolManager`` with keep-alive connections.
+
+    Skips the per-call work of ``requests`` (hooks, cookies, environment
+    lookups, adapters), which is noticeable at high request rates.
+
+    :param timeout: Seconds to wait for a connection and a response when
+                    a request has no timeout of its own.
+    """
+
+    def __init__(self, headers=None, pool_connections=10, pool_maxsize=10, timeout=None):
+        import urllib3
+        from urllib3.exceptions import (
+            ConnectTimeoutError,
+            NewConnectionError,
+            ProtocolError,
+            TimeoutError,
+        )
+
+        self.retry_on = (NewConnectionError, ProtocolError, TimeoutError)
+        self._timeout_error = TimeoutError
+        self._refused_error = NewConnectionError
+        self._connect_timeout = ConnectTimeoutError
+        self._timeout = urllib3.Timeout
+        self.headers = dict(headers or {})
+        self.manager = urllib3.PoolManager(
+            num_pools=pool_connections,
+            maxsize=pool_maxsize,
+            block=False,
+            retries=False,
+            timeout=timeout,
+        )
+
+    def request(self, method, url, headers=None, body=None, timeout=None):
+        if headers:
+            headers = dict(self.headers, **headers)
+        else:
+            headers = self.headers
+
+        kwargs = {}
+        if isinstance(timeout, tuple):
+            kwargs['timeout'] = self._timeout(connect=timeout[0], read=timeout[1])
+        elif timeout is not None:
+            kwargs['timeout'] = timeout
+
+        res = self.manager.request(method.upper(), url, body=body, headers=headers, **kwargs)
+        return Response(res.status, res.headers, res.data, url)
+
+    def is_timeout(self, error):
+        # NewConnectionError subclasses ConnectTimeoutError for backwards
+        # compatibility, a refused connection is not a timeout.
+        return isinstance(error, self._timeout_error) and not isinstance(error, self._refused_error)
+
+    def is_connect_error(self, error):
+        # NewConnectionError is a ConnectTimeoutError as well.
+        return isinstance(error, self._connect_timeout)
+
+    def close(self):
+        self.manager.clear()
+
+
+class FakeTransport(object):
+    """In-memory transport for tests.
+
+    Every request is recorded in ``calls`` as ``(method, url, headers,
+    body)`` and its timeout in ``timeouts``. It is answered by
+    ``handler(method, url, headers, body)``, which returns a response or a
+    ``(status_code, content)`` pair whose content is sent as JSON, or
+    raises. Without a handler every request succeeds.
+
+    ::
+
+      transport = FakeTransport(lambda method, url, headers, body: (200, {'quantity': '5'}))
+      client = Pixela(username='YOUR_NAME', token='YOUR_TOKEN', transport=transport)
+    """
+
+    retry_on = ()
+
+    def __init__(self, handler=None):
+        self.handler = handler or _success
+        self.calls = []
+        self.timeouts = []
+
+    def request(self, method, url, headers=None, body=None, timeout=None):
+        self.calls.append((method, url, headers, body))
+        self.timeouts.append(timeout)
+        res = self.handler(method, url, headers, body)
+        if isinstance(res, tuple):
+            status_code, content = res
+            res = Response(
+                status_code,
+                {'Content-Type': 'application/json'},
+                json.dumps(content).encode('utf-8'),
+                url,
+            )
+
+        return res
+
+    def is_timeout(self, error):
+        return isinstance(error, TimeoutError)
+
+    def is_connect_error(self, error):
+        return isinstance(error, ConnectionRefusedError)
+
+    def close(self):
+        pass
+
+
+def _success(method, url, headers, body):
+    return 200, {'message': 'Success.', 'isSuccess': True}
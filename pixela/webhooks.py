@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.webhooks
+    ~~~~~~~~~~~~~~~
+
+    Index of webhook hashes by graph and type.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+
+
+class WebhookIndex(object):
+    """Webhook hashes per user, keyed on ``(graph_id, type)``.
+
+    A user's webhooks are loaded by the first ``get_webhook`` of the client,
+    which ``webhook_hash`` calls when the user is not loaded yet, and kept
+    current by ``create_webhook``, ``delete_webhook`` and ``delete_graph``.
+    ``hits`` counts lookups answered without a request and ``loads`` the
+    ``get_webhook`` responses stored.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.loads = 0
+        self._users = {}
+        # Bumped by every change so that a list loaded while a webhook was
+        # created or deleted is not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def loaded(self, username):
+        return username in self._users
+
+    def get(self, username, graph_id, type):
+        """Return the hash of the webhook or ``None``; the user must be
+        loaded.
+        """
+        with self._lock:
+            self.hits += 1
+            return self._users[username].get((graph_id, type))
+
+    def load(self, username, webhooks, generation):
+        """Replace the hashes of ``username`` with the ``webhooks`` of a
+        ``get_webhook`` response sent at ``generation``.
+        """
+        hashes = {(webhook['graphID'], webhook['type']): webhook['webhookHash'] for webhook in webhooks}
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._users[username] = hashes
+            self.loads += 1
+
+    def add(self, username, graph_id, type, webhook_hash):
+        with self._lock:
+            self._generation += 1
+            hashes = self._users.get(username)
+            if hashes is not None:
+                hashes[(graph_id, type)] = webhook_hash
+
+    def remove(self, username, webhook_hash):
+        with self._lock:
+            self._generation += 1
+            hashes = self._users.get(username, {})
+            for key, value in list(hashes.items()):
+                if value == webhook_hash:
+                    del hashes[key]
+
+    def remove_graph(self, username, graph_id):
+        with self._lock:
+            self._generation += 1
+            hashes = self._users.get(username, {})
+            for key in list(hashes):
+                if key[0] == graph_id:
+                    del hashes[key]
+
+    def clear(self, username=None):
+        with self._lock:
+            self._generation += 1
+            if username is None:
+                self._users.clear()
+            else:
+                self._users.pop(username, None)
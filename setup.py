@@ -40,9 +40,16 @@ setup(
     long_description=description,
     license='BSD',
     platforms='any',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     package_dir={'': '.'},
     install_requires=['mock', 'requests', 'pytz'],
+    entry_points={
+        'console_scripts': ['pixela = pixela.cli:main'],
+    },
+    extras_require={
+        'async': ['aiohttp'],
+        'numpy': ['numpy'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Environment :: Web Environment',
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.helpers
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Responses, polling and a recording server shared by the tests.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+
+from requests import Response
+
+
+def mock_response(status_code, content):
+    res = Response()
+    res.status_code = status_code
+    res._content = json.dumps(content).encode('utf-8')
+
+    return res
+
+
+def success():
+    return mock_response(
+        status_code=200,
+        content={'message': 'Success.', 'isSuccess': True},
+    )
+
+
+def rejected():
+    return mock_response(
+        status_code=503,
+        content={
+            'message': 'Please retry this request.',
+            'isSuccess': False,
+            'isRejected': True,
+        },
+    )
+
+
+def wait_for(predicate, timeout=5):
+    """Poll ``predicate`` until it is true, fail after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        time.sleep(0.001)
+
+    return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super(_Handler, self).setup()
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.sockets.add(self.connection)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.sockets.discard(self.connection)
+        super(_Handler, self).finish()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else None
+        headers = dict(self.headers.items())
+        with server.lock:
+            server.requests.append((self.command, self.path, headers, body))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if server.delay:
+                time.sleep(server.delay)
+            if server.hold is not None and self.command == 'GET':
+                server.hold.wait(5)
+            reply = server.handler(self.command, self.path, headers, body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+        status, content = reply[:2]
+        payload = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (reply[2] if len(reply) > 2 else {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _reply
+    do_POST = _reply
+    do_PUT = _reply
+    do_DELETE = _reply
+
+
+def _succeed(method, path, headers, body):
+    return 200, {'message': 'Success.', 'isSuccess': True}
+
+
+class RecordingServer(ThreadingHTTPServer):
+    """Threaded server on a local port which records its requests.
+
+    Every request is recorded in ``requests`` as ``(method, path, headers,
+    body)`` and answered by ``handler(method, path, headers, body)``, which
+    returns ``(status, content)`` or ``(status, content, headers)`` like the
+    handler of :class:`pixela.transport.FakeTransport`. Replies are delayed
+    by ``delay`` seconds and, while ``hold`` is an unset
+    ``threading.Event``, GETs wait for it.
+
+    :param handler: Answers the requests, a success by default.
+    :param port: Port to listen on, ``0`` for an ephemeral one.
+    :param delay: Seconds every reply is delayed.
+    """
+
+    daemon_threads = True
+
+    # Room for the connects of a burst of threads, a full backlog resets them.
+    request_queue_size = 64
+
+    def __init__(self, handler=None, port=0, delay=0):
+        ThreadingHTTPServer.__init__(self, ('127.0.0.1', port), _Handler)
+        self.handler = handler or _succeed
+        self.delay = delay
+        self.hold = None
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sockets = set()
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:{port}/v1'.format(port=self.server_address[1])
+
+    def handle_error(self, request, client_address):
+        # Clients which timed out have closed the connection.
+        pass
+
+    def start(self):
+        # A short poll interval, so that stop does not wait half a second.
+        thread = threading.Thread(target=self.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        # Kept-alive connections would be served on.
+        with self.lock:
+            for sock in self.sockets:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
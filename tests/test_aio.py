@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_aio
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.aio.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime
+from unittest import (
+    skipIf,
+    TestCase,
+)
+
+from pixela.exceptions import (
+    PixelaConnectionError,
+    RequestTimeout,
+)
+from pixela.result import Result
+from pixela.singleflight import AsyncSingleFlight
+from .helpers import RecordingServer
+
+try:
+    from pixela.aio import AsyncPixela
+except ImportError:  # pragma: no cover
+    AsyncPixela = None
+
+
+def handle(method, path, headers, body):
+    if method == 'GET' and path.endswith('/webhooks'):
+        return 200, {'webhooks': [{'webhookHash': 'xxx', 'graphID': 'py-pixela', 'type': 'increment'}]}
+
+    return 200, {'message': 'Success.', 'isSuccess': True}
+
+
+@skipIf(AsyncPixela is None, 'aiohttp is not installed')
+class AsyncPixelaTestCase(TestCase):
+    def start_server(self, delay=0):
+        server = RecordingServer(handle, delay=delay).start()
+        self.addCleanup(server.stop)
+
+        return server
+
+    def create_client(self, server, **kwargs):
+        client = AsyncPixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            **kwargs,
+        )
+        client.API_ENDPOINT = server.endpoint
+
+        return client
+
+    def test_create_pixel(self):
+        server = self.start_server()
+
+        async def run():
+            async with self.create_client(server) as client:
+                date = datetime.strptime('2018-10-21', '%Y-%m-%d')
+                res = await client.create_pixel(graph_id='py-pixela', quantity=5, date=date)
+                ret = await res.json()
+
+            return ret
+
+        ret = asyncio.run(run())
+        self.assertEqual(ret['isSuccess'], True)
+        self.assertEqual([(r[0], r[1], r[2]['X-USER-TOKEN'], json.loads(r[3])) for r in server.requests], [(
+            'POST',
+            '/v1/users/heavenshell/graphs/py-pixela',
+            'ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            {'date': '20181021', 'quantity': '5'},
+        )])
+
+    def test_mixin_methods(self):
+        server = self.start_server()
+
+        async def run():
+            async with self.create_client(server) as client:
+                date = datetime.strptime('2018-10-21', '%Y-%m-%d')
+                await client.get_graphs()
+                await client.get_pixel(graph_id='py-pixela', date=date)
+                await client.update_pixel(graph_id='py-pixela', quantity=3, date=date)
+                await client.increment_pixel(graph_id='py-pixela')
+                await client.delete_pixel(graph_id='py-pixela', date=date)
+                await client.invoke_webhook(webhook_hash='xxx')
+                webhook_hash = await client.webhook_hash(graph_id='py-pixela', type='increment')
+                missing = await client.webhook_hash(graph_id='py-pixela', type='decrement')
+
+            return webhook_hash, missing
+
+        webhook_hash, missing = asyncio.run(run())
+        self.assertEqual((webhook_hash, missing), ('xxx', None))
+        self.assertEqual([(r[0], r[1]) for r in server.requests], [
+            ('GET', '/v1/users/heavenshell/graphs'),
+            ('GET', '/v1/users/heavenshell/graphs/py-pixela/20181021'),
+            ('PUT', '/v1/users/heavenshell/graphs/py-pixela/20181021'),
+            ('PUT', '/v1/users/heavenshell/graphs/py-pixela/increment'),
+            ('DELETE', '/v1/users/heavenshell/graphs/py-pixela/20181021'),
+            ('POST', '/v1/users/heavenshell/webhooks/xxx'),
+            ('GET', '/v1/users/heavenshell/webhooks'),
+            ('GET', '/v1/users/heavenshell/webhooks'),
+        ])
+        self.assertNotIn('X-USER-TOKEN', server.requests[5][2])
+
+    def test_concurrency_limit(self):
+        server = self.start_server(delay=0.01)
+
+        async def run():
+            async with self.create_client(server, concurrency=20) as client:
+                responses = await asyncio.gather(*[
+                    client.increment_pixel(graph_id='py-pixela')
+                    for _ in range(200)
+                ])
+
+            return responses
+
+        responses = asyncio.run(run())
+        self.assertEqual(len(server.requests), 200)
+        self.assertTrue(all(res.status == 200 for res in responses))
+        self.assertLessEqual(server.max_in_flight, 20)
+        self.assertGreater(server.max_in_flight, 1)
+
+    def test_connection_error(self):
+        async def run():
+            client = AsyncPixela(username='heavenshell', token='xxx')
+            client.API_ENDPOINT = 'http://127.0.0.1:1/v1'
+            async with client:
+                return await client.get_graphs()
+
+        with self.assertLogs('pixela', level='ERROR'):
+            self.assertIsNone(asyncio.run(run()))
+
+    def test_timeout(self):
+        server = self.start_server(delay=0.5)
+
+        async def run():
+            async with self.create_client(server, timeout=(1, 0.05)) as client:
+                try:
+                    await client.increment_pixel(graph_id='py-pixela')
+                except RequestTimeout as e:
+                    return client, e
+
+        client, error = asyncio.run(run())
+        self.assertIsInstance(error, TimeoutError)
+        self.assertEqual(client.timeouts, 1)
+
+    def test_single_flight(self):
+        server = self.start_server(delay=0.05)
+
+        async def run():
+            single_flight = AsyncSingleFlight()
+            async with self.create_client(server, single_flight=single_flight) as client:
+                date = datetime.strptime('2018-10-21', '%Y-%m-%d')
+                responses = await asyncio.gather(*[
+                    client.get_pixel(graph_id='py-pixela', date=date)
+                    for _ in range(20)
+                ])
+
+            return single_flight, responses
+
+        single_flight, responses = asyncio.run(run())
+        self.assertEqual(len(server.requests), 1)
+        self.assertTrue(all(res.status == 200 for res in responses))
+        self.assertEqual((single_flight.flights, single_flight.collapsed), (1, 19))
+
+    def test_read_after_write(self):
+        server = self.start_server()
+
+        async def run():
+            server.hold = threading.Event()
+            single_flight = AsyncSingleFlight()
+            async with self.create_client(server, single_flight=single_flight) as client:
+                date = datetime.strptime('2018-10-21', '%Y-%m-%d')
+                write = asyncio.ensure_future(client.update_pixel(graph_id='py-pixela', quantity=3, date=date))
+                # Started while the write is in flight, it may not see it.
+                before = asyncio.ensure_future(client.get_pixel(graph_id='py-pixela', date=date))
+                await write
+                after = asyncio.ensure_future(client.get_pixel(graph_id='py-pixela', date=date))
+                await asyncio.sleep(0.05)
+                server.hold.set()
+                await asyncio.gather(before, after)
+
+            return single_flight
+
+        single_flight = asyncio.run(run())
+        self.assertEqual([r[0] for r in server.requests], ['PUT', 'GET', 'GET'])
+        self.assertEqual((single_flight.flights, single_flight.collapsed), (2, 0))
+
+    def test_results(self):
+        server = self.start_server()
+
+        async def run():
+            async with self.create_client(server, results=True) as client:
+                res = await client.increment_pixel(graph_id='py-pixela')
+                self.assertEqual(await client.webhook_hash(graph_id='py-pixela', type='increment'), 'xxx')
+
+            client = AsyncPixela(username='heavenshell', token='xxx', results=True)
+            client.API_ENDPOINT = 'http://127.0.0.1:1/v1'
+            async with client:
+                try:
+                    await client.get_graphs()
+                except PixelaConnectionError as e:
+                    return res, e
+
+        res, error = asyncio.run(run())
+        self.assertIsInstance(res, Result)
+        self.assertEqual(res.is_success, True)
+        self.assertIsInstance(error, ConnectionError)
+
+    def test_invoke_webhooks(self):
+        server = self.start_server(delay=0.01)
+
+        async def run():
+            async with self.create_client(server) as client:
+                results = await client.invoke_webhooks(['xxx', 'yyy'] * 10, workers=5)
+
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual([webhook_hash for webhook_hash, _ in results], ['xxx', 'yyy'] * 10)
+        self.assertTrue(all(res.status == 200 for _, res in results))
+        self.assertEqual(len(server.requests), 20)
+        self.assertLessEqual(server.max_in_flight, 5)
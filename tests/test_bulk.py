@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_bulk
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.bulk.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import threading
+import time
+from datetime import (
+    datetime,
+    timedelta,
+)
+from unittest import TestCase
+
+from mock import mock
+from requests import (
+    HTTPError,
+    Session,
+)
+
+from pixela import Pixela
+from pixela.bulk import (
+    run_bounded,
+    run_ordered,
+)
+from pixela.retry import RetryPolicy
+from pixela.transport import FakeTransport
+from .helpers import mock_response
+
+
+def days(count):
+    start = datetime(2018, 1, 1)
+    for i in range(count):
+        yield start + timedelta(days=i), i
+
+
+class RunBoundedTestCase(TestCase):
+    def test_consumes_lazily(self):
+        consumed = []
+        release = threading.Event()
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        def func(i):
+            release.wait()
+            return i
+
+        results = run_bounded(func, items(), workers=2)
+        timer = threading.Timer(0.05, release.set)
+        timer.start()
+        first = next(results)
+        self.assertLessEqual(len(consumed), 6)
+        self.assertEqual(sorted([first] + list(results)), list(range(100)))
+
+
+class RunOrderedTestCase(TestCase):
+    def test_keeps_order(self):
+        def func(i):
+            # Later items finish first.
+            time.sleep((10 - i) * 0.001)
+            return i
+
+        self.assertEqual(list(run_ordered(func, range(10), workers=4)), list(range(10)))
+
+    def test_consumes_lazily(self):
+        consumed = []
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = run_ordered(lambda i: i, items(), workers=2)
+        self.assertEqual(next(results), 0)
+        self.assertLessEqual(len(consumed), 5)
+        results.close()
+
+
+class BulkMethodsMixinTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            retry=RetryPolicy(backoff=0),
+        )
+
+    @mock.patch.object(
+        Session,
+        'post',
+        return_value=mock_response(
+            status_code=200,
+            content={'message': 'Success.', 'isSuccess': True},
+        ),
+    )
+    def test_create_pixels(self, m):
+        result = self.client.create_pixels(graph_id='py-pixela', pairs=days(50), workers=4)
+        self.assertEqual(result.successes, 50)
+        self.assertEqual(result.failures, [])
+        self.assertEqual(result.retries, 0)
+        self.assertEqual(m.call_count, 50)
+
+        dates = sorted(json.loads(c[1]['data'])['date'] for c in m.call_args_list)
+        self.assertEqual(dates[0], '20180101')
+        self.assertEqual(dates[-1], '20180219')
+
+    def test_create_pixels_retry(self):
+        rejected = mock_response(
+            status_code=503,
+            content={'message': 'Please retry this request.', 'isSuccess': False, 'isRejected': True},
+        )
+        success = mock_response(
+            status_code=200,
+            content={'message': 'Success.', 'isSuccess': True},
+        )
+        with mock.patch.object(Session, 'post', side_effect=[rejected, success]):
+            result = self.client.create_pixels(graph_id='py-pixela', pairs=days(1), workers=1)
+
+        self.assertEqual(result.successes, 1)
+        self.assertEqual(result.retries, 1)
+
+    def test_update_pixels_failure(self):
+        failure = mock_response(
+            status_code=400,
+            content={'message': 'Specified quantity is invalid.', 'isSuccess': False},
+        )
+        with mock.patch.object(Session, 'put', return_value=failure) as m:
+            result = self.client.update_pixels(graph_id='py-pixela', pairs=days(3), workers=2)
+
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(result.successes, 0)
+        self.assertEqual(result.retries, 0)
+        self.assertEqual(len(result.failures), 3)
+        self.assertIs(result.failures[0][2], failure)
+
+
+class IterPixelsTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            retry=RetryPolicy(backoff=0),
+        )
+
+    def test_pixels_endpoint(self):
+        res = mock_response(
+            status_code=200,
+            content={'pixels': [
+                {'date': '20180103', 'quantity': '3'},
+                {'date': '20180101', 'quantity': '1'},
+            ]},
+        )
+        with mock.patch.object(Session, 'get', return_value=res) as m:
+            pixels = list(self.client.iter_pixels('py-pixela', datetime(2018, 1, 1), datetime(2018, 1, 5)))
+
+        self.assertEqual(pixels, [(datetime(2018, 1, 1), '1'), (datetime(2018, 1, 3), '3')])
+        self.assertEqual(
+            m.call_args[0][0],
+            'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/pixels?from=20180101&to=20180105&withBody=true',
+        )
+
+    def test_pixels_endpoint_pages(self):
+        res = mock_response(status_code=200, content={'pixels': []})
+        with mock.patch.object(Session, 'get', return_value=res) as m:
+            list(self.client.iter_pixels('py-pixela', datetime(2018, 1, 1), datetime(2019, 12, 31)))
+
+        urls = [c[0][0].split('?')[1] for c in m.call_args_list]
+        self.assertEqual(urls, [
+            'from=20180101&to=20181231&withBody=true',
+            'from=20190101&to=20191231&withBody=true',
+        ])
+
+    def test_fallback(self):
+        def get(url, **kwargs):
+            if url.endswith('/pixels?from=20180101&to=20180110&withBody=true'):
+                return mock_response(status_code=404, content={'message': 'Not found.', 'isSuccess': False})
+            if url.endswith(('20180102', '20180105')):
+                return mock_response(status_code=200, content={'quantity': url[-1]})
+
+            return mock_response(status_code=404, content={'message': 'Specified pixel not found.', 'isSuccess': False})
+
+        with mock.patch.object(Session, 'get', side_effect=get) as m, \
+                mock.patch.object(self.client.logger, 'error') as log:
+            pixels = list(self.client.iter_pixels('py-pixela', datetime(2018, 1, 1), datetime(2018, 1, 10), workers=3))
+
+        self.assertEqual(pixels, [(datetime(2018, 1, 2), '2'), (datetime(2018, 1, 5), '5')])
+        self.assertEqual(m.call_count, 11)
+        # The missing endpoint and days are expected, not errors.
+        self.assertEqual(log.call_count, 0)
+
+    def test_missing_graph(self):
+        missing = mock_response(status_code=404, content={'message': 'Specified graph not found.', 'isSuccess': False})
+        with mock.patch.object(Session, 'get', return_value=missing) as m:
+            with self.assertRaises(HTTPError):
+                list(self.client.iter_pixels('missing', datetime(2018, 1, 1), datetime(2018, 12, 31)))
+        self.assertEqual(m.call_count, 1)
+
+        self.client.pixels_endpoint = False
+        self.addCleanup(setattr, self.client, 'pixels_endpoint', True)
+        with mock.patch.object(Session, 'get', return_value=missing) as m:
+            with self.assertRaises(HTTPError):
+                list(self.client.iter_pixels('missing', datetime(2018, 1, 1), datetime(2018, 12, 31), workers=2))
+        self.assertLess(m.call_count, 10)
+
+    def test_failure_raises(self):
+        res = mock_response(status_code=400, content={'message': 'Invalid.', 'isSuccess': False})
+        with mock.patch.object(Session, 'get', return_value=res):
+            with self.assertRaises(HTTPError):
+                list(self.client.iter_pixels('py-pixela', datetime(2018, 1, 1), datetime(2018, 1, 10)))
+
+
+class Graph(object):
+    """Pixels of one graph behind a FakeTransport."""
+
+    def __init__(self, pixels):
+        self.pixels = dict(pixels)
+        self.writes = []
+
+    def __call__(self, method, url, headers, body):
+        """Answer a pixel request."""
+        path, _, query = url.partition('?')
+        if method == 'get':
+            params = dict(pair.split('=') for pair in query.split('&'))
+            return 200, {'pixels': [
+                {'date': date, 'quantity': quantity}
+                for date, quantity in sorted(self.pixels.items())
+                if params['from'] <= date <= params['to']
+            ]}
+
+        self.writes.append((method, path.rsplit('/', 1)[1]))
+        if method == 'post':
+            params = json.loads(body)
+            self.pixels[params['date']] = params['quantity']
+        elif method == 'put':
+            self.pixels[path.rsplit('/', 1)[1]] = json.loads(body)['quantity']
+        else:
+            del self.pixels[path.rsplit('/', 1)[1]]
+
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+
+class ReconcileTestCase(TestCase):
+    def create_client(self, pixels):
+        self.graph = Graph(pixels)
+        return Pixela(username='heavenshell', token='token', transport=FakeTransport(self.graph))
+
+    def test_plan(self):
+        client = self.create_client({'20180101': '1', '20180102': '2', '20180103': '3', '20180110': '9'})
+        desired = {
+            datetime(2018, 1, 1): 1,
+            datetime(2018, 1, 2): 2.0,
+            '20180103': 4,
+            datetime(2018, 1, 4, 12, 30): '5',
+        }
+        plan = client.reconcile('py-pixela', desired, delete=True, dry_run=True)
+        self.assertEqual(plan.creates, [(datetime(2018, 1, 4), '5')])
+        self.assertEqual(plan.updates, [(datetime(2018, 1, 3), 4)])
+        # 20180110 is out of the desired range.
+        self.assertEqual(plan.deletes, [])
+        self.assertEqual(plan.unchanged, 2)
+        self.assertEqual(plan.requests, 2)
+        self.assertIsNone(plan.result)
+        self.assertEqual(plan.to_dict(), {
+            'graph_id': 'py-pixela',
+            'creates': [['20180104', '5']],
+            'updates': [['20180103', '4']],
+            'deletes': [],
+            'unchanged': 2,
+        })
+        self.assertEqual(self.graph.writes, [])
+
+    def test_reconcile(self):
+        current = {'2018{day:04d}'.format(day=day): str(day) for day in range(101, 131)}
+        client = self.create_client(current)
+        desired = [(datetime(2018, 1, day), day + 100) for day in range(1, 31)]
+        desired[4] = (datetime(2018, 1, 5), 0)
+        desired.append((datetime(2018, 1, 5), 1))
+        del desired[9]
+        plan = client.reconcile(
+            'py-pixela',
+            iter(desired),
+            start=datetime(2018, 1, 1),
+            end=datetime(2018, 2, 1),
+            delete=True,
+            workers=4,
+        )
+        self.assertEqual(sorted(self.graph.writes), [('delete', '20180110'), ('put', '20180105')])
+        self.assertEqual(plan.result.successes, 2)
+        self.assertEqual(plan.result.failures, [])
+        self.assertEqual(plan.unchanged, 28)
+        self.assertEqual(self.graph.pixels['20180105'], '1')
+
+        plan = client.reconcile('py-pixela', {'20180201': 3, '20180301': 4}, end=datetime(2018, 2, 28))
+        self.assertEqual(self.graph.writes[-1], ('post', 'py-pixela'))
+        self.assertEqual(plan.creates, [(datetime(2018, 2, 1), 3)])
+
+    def test_nothing_desired(self):
+        client = self.create_client({'20180101': '1'})
+        plan = client.reconcile('py-pixela', {}, delete=True)
+        self.assertEqual(plan.requests, 0)
+        plan = client.reconcile('py-pixela', {}, start=datetime(2018, 1, 1), end=datetime(2018, 1, 1), delete=True)
+        self.assertEqual(plan.deletes, [datetime(2018, 1, 1)])
+        self.assertEqual(self.graph.pixels, {})
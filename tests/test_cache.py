@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_cache
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.cache.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+from datetime import datetime
+from unittest import TestCase
+
+from mock import mock
+from requests import Session
+
+from pixela import Pixela
+from pixela.cache import PixelaCache
+from .helpers import (
+    mock_response,
+    success,
+)
+
+
+def pixel():
+    return mock_response(status_code=200, content={'quantity': '5'})
+
+
+class PixelaCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = PixelaCache(maxsize=2)
+        self.client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            cache=self.cache,
+        )
+        self.date = datetime(2018, 10, 21)
+
+    def test_get_pixel_hit(self):
+        with mock.patch.object(Session, 'get', return_value=pixel()) as m:
+            first = self.client.get_pixel(graph_id='py-pixela', date=self.date)
+            second = self.client.get_pixel(graph_id='py-pixela', date=self.date)
+
+        self.assertIs(first, second)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_error_is_not_cached(self):
+        failure = mock_response(status_code=404, content={'isSuccess': False})
+        with mock.patch.object(Session, 'get', return_value=failure) as m:
+            with self.assertLogs('pixela', level='ERROR'):
+                self.client.get_pixel(graph_id='py-pixela', date=self.date)
+                self.client.get_pixel(graph_id='py-pixela', date=self.date)
+
+        self.assertEqual(m.call_count, 2)
+
+    def test_ttl(self):
+        self.cache.ttls['get_graphs'] = 0
+        with mock.patch.object(Session, 'get', return_value=success()) as m:
+            self.client.get_graphs()
+            self.client.get_graphs()
+
+        self.assertEqual(m.call_count, 2)
+
+    def test_lru_eviction(self):
+        with mock.patch.object(Session, 'get', return_value=pixel()) as m:
+            self.client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+            self.client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 22))
+            self.client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+            self.client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 23))
+            self.assertEqual(self.cache.evictions, 1)
+            self.client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_pixel_write_invalidates(self):
+        writes = [
+            ('post', lambda: self.client.create_pixel(graph_id='py-pixela', quantity=1, date=self.date)),
+            ('put', lambda: self.client.update_pixel(graph_id='py-pixela', quantity=1, date=self.date)),
+            ('delete', lambda: self.client.delete_pixel(graph_id='py-pixela', date=self.date)),
+            ('put', lambda: self.client.increment_pixel(graph_id='py-pixela')),
+            ('put', lambda: self.client.decrement_pixel(graph_id='py-pixela')),
+        ]
+        for method, write in writes:
+            self.cache.clear()
+            with mock.patch.object(Session, 'get', return_value=pixel()) as m:
+                self.client.get_pixel(graph_id='py-pixela', date=self.date)
+                with mock.patch.object(Session, method, return_value=success()):
+                    write()
+                self.client.get_pixel(graph_id='py-pixela', date=self.date)
+
+            self.assertEqual(m.call_count, 2, method)
+
+    def test_graph_write_invalidates(self):
+        writes = [
+            ('put', lambda: self.client.update_graph(graph_id='py-pixela', name='n', unit='u', color='momiji')),
+            ('delete', lambda: self.client.delete_graph(graph_id='py-pixela')),
+        ]
+        for method, write in writes:
+            self.cache.clear()
+            with mock.patch.object(Session, 'get', return_value=pixel()) as m:
+                self.client.get_pixel(graph_id='py-pixela', date=self.date)
+                self.client.get_graphs()
+                with mock.patch.object(Session, method, return_value=success()):
+                    write()
+                self.client.get_pixel(graph_id='py-pixela', date=self.date)
+                self.client.get_graphs()
+
+            self.assertEqual(m.call_count, 4, method)
+
+    def test_other_graph_is_kept(self):
+        with mock.patch.object(Session, 'get', return_value=pixel()) as m:
+            self.client.get_pixel(graph_id='other', date=self.date)
+            with mock.patch.object(Session, 'delete', return_value=success()):
+                self.client.delete_pixel(graph_id='py-pixela', date=self.date)
+            self.client.get_pixel(graph_id='other', date=self.date)
+
+        self.assertEqual(m.call_count, 1)
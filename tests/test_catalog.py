@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_catalog
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.catalog.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import TestCase
+
+from pixela import Pixela
+from pixela.catalog import (
+    format_quantity,
+    GraphCatalog,
+)
+from pixela.exceptions import (
+    PixelaError,
+    ValidationError,
+)
+from pixela.retry import RetryPolicy
+from pixela.transport import FakeTransport
+
+GRAPHS = [
+    {'id': 'commits', 'name': 'commits', 'unit': 'commit', 'type': 'int', 'color': 'shibafu'},
+    {'id': 'weight', 'name': 'weight', 'unit': 'kg', 'type': 'float', 'color': 'sora'},
+]
+
+
+class FormatQuantityTestCase(TestCase):
+    def test_int(self):
+        self.assertEqual(format_quantity(5, 'int'), '5')
+        self.assertEqual(format_quantity(-5, 'int'), '-5')
+        self.assertEqual(format_quantity(5.0, 'int'), '5')
+        self.assertEqual(format_quantity(Decimal('5.00'), 'int'), '5')
+        self.assertEqual(format_quantity(' 7 ', 'int'), '7')
+        for quantity in (5.5, '5.5', '5e3', 'five', True, None, float('nan')):
+            with self.assertRaises(ValueError):
+                format_quantity(quantity, 'int')
+
+    def test_float(self):
+        self.assertEqual(format_quantity(5, 'float'), '5')
+        self.assertEqual(format_quantity(72.5, 'float'), '72.5')
+        self.assertEqual(format_quantity(1e-7, 'float'), '0.0000001')
+        self.assertEqual(format_quantity(1e20, 'float'), '100000000000000000000')
+        self.assertEqual(format_quantity('-0.25', 'float'), '-0.25')
+        for quantity in ('.5', '1e3', float('inf'), [1]):
+            with self.assertRaises(ValueError):
+                format_quantity(quantity, 'float')
+
+
+class GraphCatalogTestCase(TestCase):
+    def setUp(self):
+        self.graphs = list(GRAPHS)
+        self.fail_reads = False
+
+    def handle(self, method, url, headers, body):
+        if method == 'get' and url.endswith('/graphs'):
+            if self.fail_reads:
+                return 500, {'message': 'Internal Server Error.', 'isSuccess': False}
+            return 200, {'graphs': list(self.graphs)}
+
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+    def create_client(self, catalog):
+        self.transport = FakeTransport(self.handle)
+        client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            catalog=catalog,
+            retry=RetryPolicy(max_retries=0),
+        )
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+
+        return client
+
+    def sent(self):
+        return [(method, url.rsplit('/v1/', 1)[1], body) for method, url, _, body in self.transport.calls]
+
+    def test_quantities_are_formatted(self):
+        catalog = GraphCatalog()
+        client = self.create_client(catalog)
+        date = datetime(2018, 10, 21)
+        client.create_pixel('commits', 5.0, date)
+        client.update_pixel('weight', 1e-7, date)
+        client.add_pixel('commits', 2)
+        self.assertEqual(self.sent(), [
+            ('get', 'users/heavenshell/graphs', None),
+            ('post', 'users/heavenshell/graphs/commits', json.dumps({'date': '20181021', 'quantity': '5'})),
+            ('put', 'users/heavenshell/graphs/weight/20181021', json.dumps({'quantity': '0.0000001'})),
+            ('put', 'users/heavenshell/graphs/commits/add', json.dumps({'quantity': '2'})),
+        ])
+        self.assertEqual((catalog.loads, catalog.checks, catalog.saved), (1, 3, 0))
+
+    def test_doomed_requests_are_not_sent(self):
+        catalog = GraphCatalog()
+        client = self.create_client(catalog)
+        with self.assertRaises(ValidationError) as e:
+            client.create_pixel('commits', 1.5)
+        self.assertEqual(e.exception.graph_id, 'commits')
+        self.assertIsInstance(e.exception, PixelaError)
+        with self.assertRaises(ValidationError):
+            client.increment_pixel('missing')
+        with self.assertRaises(ValidationError):
+            client.get_pixel('missing', datetime(2018, 10, 21))
+        with self.assertRaises(ValidationError):
+            client.delete_graph('missing')
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertEqual(catalog.saved, 4)
+
+    def test_bulk_failures_do_not_send(self):
+        catalog = GraphCatalog()
+        client = self.create_client(catalog)
+        pairs = [(datetime(2018, 10, day), day + 0.5) for day in range(1, 11)]
+        result = client.create_pixels('commits', pairs, workers=2)
+        self.assertEqual(result.successes, 0)
+        self.assertEqual(len(result.failures), 10)
+        self.assertTrue(all(isinstance(res, ValidationError) for _, _, res in result.failures))
+        self.assertEqual(len(self.transport.calls), 1)
+
+    def test_graph_writes_keep_catalog_current(self):
+        catalog = GraphCatalog()
+        client = self.create_client(catalog)
+        client.get_graphs()
+        client.create_graph('steps', 'steps', 'step', 'int', 'ajisai')
+        client.increment_pixel('steps')
+        client.update_graph('steps', 'walk', 'step', 'momiji')
+        client.delete_graph('commits')
+        with self.assertRaises(ValidationError):
+            client.increment_pixel('commits')
+        self.assertEqual(catalog.loads, 1)
+        self.assertEqual([method for method, _, _ in self.sent()], ['get', 'post', 'put', 'put', 'delete'])
+
+    def test_unknown_graph_reloads(self):
+        catalog = GraphCatalog(miss_interval=0)
+        client = self.create_client(catalog)
+        client.increment_pixel('commits')
+        self.graphs.append({'id': 'steps', 'type': 'int'})
+        client.increment_pixel('steps')
+        self.assertEqual(catalog.loads, 2)
+
+        catalog.miss_interval = None
+        with self.assertRaises(ValidationError):
+            client.increment_pixel('other')
+        self.assertEqual(catalog.loads, 2)
+
+    def test_ttl(self):
+        catalog = GraphCatalog(ttl=0)
+        client = self.create_client(catalog)
+        client.increment_pixel('commits')
+        client.increment_pixel('commits')
+        self.assertEqual(catalog.loads, 2)
+
+    def test_failed_reads_send_unchecked(self):
+        catalog = GraphCatalog(miss_interval=60)
+        client = self.create_client(catalog)
+        self.fail_reads = True
+        client.create_pixel('commits', 1.5)
+        client.create_pixel('commits', 2.5)
+        self.assertEqual([method for method, _, _ in self.sent()], ['get', 'post', 'post'])
+        self.assertEqual(catalog.loads, 0)
+
+    def test_stale_load_is_dropped(self):
+        catalog = GraphCatalog()
+        generation = catalog.generation
+        catalog.remove('heavenshell', 'commits')
+        catalog.load('heavenshell', GRAPHS, generation)
+        self.assertEqual(catalog.loads, 0)
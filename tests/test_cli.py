@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_cli
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.cli.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import mock
+
+from pixela import cli
+from .helpers import RecordingServer
+
+NDJSON = '\n'.join([
+    '{"date": "2018-10-21", "quantity": 1}',
+    '{"date": "20181021", "quantity": 3}',
+    'not json',
+    '{"date": "20181022", "quantity": "2", "graph": "other"}',
+    '{"date": "2018-13-01", "quantity": 1}',
+    '',
+    '{"date": "20181023", "quantity": 4}',
+]) + '\n'
+
+CSV = 'date,quantity,graph\n2018-10-21,1,\n2018-10-21,5,\n20181022,x,\n20181023,2,other\n'
+
+
+def handle(method, path, headers, body):
+    if method == 'GET':
+        # Pixels list: the existing pixels are 20181021 = 1 of every graph.
+        return 200, {'pixels': [{'date': '20181021', 'quantity': '1'}]}
+
+    return 200, {'message': 'Success.', 'isSuccess': True}
+
+
+class CliTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RecordingServer(handle).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.requests = []
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def pixels(self):
+        """Return ``(graph_id, date, quantity, token)`` of the writes."""
+        pixels = []
+        for method, path, headers, body in self.server.requests:
+            if method == 'POST':
+                graph_id, date = path.rsplit('/', 1)[1], json.loads(body)['date']
+            elif method == 'PUT':
+                _, graph_id, date = path.rsplit('/', 2)
+            else:
+                continue
+            pixels.append((graph_id, date, json.loads(body)['quantity'], headers['X-USER-TOKEN']))
+
+        return pixels
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+
+        return path
+
+    def run_cli(self, *argv):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with mock.patch('sys.stdout', stdout), mock.patch('sys.stderr', stderr):
+            code = cli.main([
+                '--username', 'heavenshell',
+                '--token', 'token',
+                '--endpoint', self.server.endpoint,
+            ] + list(argv))
+
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_read_records(self):
+        with mock.patch('sys.stderr', io.StringIO()) as stderr:
+            records = list(cli.read_records(io.StringIO(NDJSON), 'ndjson', 'py-pixela'))
+        self.assertEqual(records, [
+            ('py-pixela', '20181021', '1'),
+            ('py-pixela', '20181021', '3'),
+            ('other', '20181022', '2'),
+            ('py-pixela', '20181023', '4'),
+        ])
+        self.assertEqual(stderr.getvalue().count('skipped record'), 2)
+
+        with mock.patch('sys.stderr', io.StringIO()) as stderr:
+            records = list(cli.read_records(io.StringIO(CSV), 'csv'))
+        self.assertEqual(records, [('other', '20181023', '2')])
+        self.assertIn('skipped record 1: no graph', stderr.getvalue())
+
+    def test_deduplicate(self):
+        graphs, count = cli.deduplicate([('g', '20181021', '1'), ('g', '20181021', '3'), ('h', '20181021', '2')])
+        self.assertEqual(graphs, {'g': {'20181021': '3'}, 'h': {'20181021': '2'}})
+        self.assertEqual(count, 3)
+
+    def test_batches(self):
+        consumed = []
+
+        def records():
+            for day in range(1, 31):
+                consumed.append(day)
+                yield 'a', '201810{day:02d}'.format(day=day), str(day)
+                yield 'b', '20181001', str(day)
+
+        results = cli.batches(records(), 10)
+        self.assertEqual(next(results), ('a', [('201810{day:02d}'.format(day=day), str(day)) for day in range(1, 11)]))
+        self.assertEqual(len(consumed), 10)
+        self.assertEqual(list(results), [
+            ('a', [('201810{day:02d}'.format(day=day), str(day)) for day in range(11, 21)]),
+            ('a', [('201810{day:02d}'.format(day=day), str(day)) for day in range(21, 31)]),
+            ('b', [('20181001', '30')]),
+        ])
+
+    def test_dry_run(self):
+        path = self.write('pixels.ndjson', NDJSON)
+        code, stdout, _ = self.run_cli('ingest', '--graph', 'py-pixela', '--dry-run', path)
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(stdout), {
+            'records': 4,
+            'duplicates': 1,
+            'requests': 3,
+            'graphs': {'other': 1, 'py-pixela': 2},
+        })
+        self.assertEqual(self.pixels(), [])
+
+    def test_ingest(self):
+        path = self.write('pixels.csv', CSV)
+        code, stdout, stderr = self.run_cli('ingest', '--graph', 'py-pixela', '--processes', '1', path)
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(self.pixels()), [
+            ('other', '20181023', '2', 'token'),
+            ('py-pixela', '20181021', '5', 'token'),
+        ])
+        stats = json.loads(stdout)
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['successes'], 2)
+        self.assertEqual(stats['failures'], 0)
+        self.assertIn('2 pixels, ', stderr)
+
+    def test_ingest_processes(self):
+        lines = [
+            json.dumps({'date': '201810{day:02d}'.format(day=day), 'quantity': day, 'graph': graph})
+            for graph in ('a', 'b', 'c')
+            for day in range(1, 31)
+        ]
+        path = self.write('pixels.ndjson', '\n'.join(lines))
+        code, stdout, _ = self.run_cli('ingest', '--processes', '2', '--batch-size', '7', '--quiet', path)
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(stdout)['successes'], 90)
+        self.assertEqual(len(self.pixels()), 90)
+        self.assertEqual(len(set(self.pixels())), 90)
+
+    def test_ingest_streams(self):
+        consumed = []
+
+        def batches():
+            for i in range(50):
+                consumed.append(i)
+                yield 'graph-{i}'.format(i=i % 3), [('201810{day:02d}'.format(day=i % 28 + 1), str(i))]
+
+        args = cli.build_parser().parse_args(['ingest', '--processes', '2', '--workers', '1', '-'])
+        config = {
+            'username': 'heavenshell',
+            'token': 'token',
+            'transport': 'requests',
+            'endpoint': self.server.endpoint,
+            'workers': 1,
+        }
+        results = cli._run(config, batches(), args)
+        next(results)
+        self.assertLessEqual(len(consumed), 5)
+        self.assertEqual(len(list(results)), 49)
+        self.assertEqual(len(self.pixels()), 50)
+
+        # A date read again after its batch was sent is written last.
+        lines = [json.dumps({'date': '20181021', 'quantity': i, 'graph': 'a'}) for i in range(5)]
+        path = self.write('pixels.ndjson', '\n'.join(lines))
+        self.server.requests = []
+        code, stdout, _ = self.run_cli('ingest', '--processes', '2', '--batch-size', '1', '--quiet', path)
+        self.assertEqual(code, 0)
+        self.assertEqual([pixel[2] for pixel in self.pixels()], ['0', '1', '2', '3', '4'])
+        self.assertEqual(json.loads(stdout)['duplicates'], 0)
+
+    def test_reconcile(self):
+        path = self.write('pixels.ndjson', NDJSON)
+        code, stdout, _ = self.run_cli('reconcile', '--graph', 'py-pixela', '--dry-run', path)
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(stdout), [
+            {
+                'graph_id': 'other',
+                'creates': [['20181022', '2']],
+                'updates': [],
+                'deletes': [],
+                'unchanged': 0,
+                'requests': 1,
+            },
+            {
+                'graph_id': 'py-pixela',
+                'creates': [['20181023', '4']],
+                'updates': [['20181021', '3']],
+                'deletes': [],
+                'unchanged': 0,
+                'requests': 2,
+            },
+        ])
+        self.assertEqual(self.pixels(), [])
+
+        code, stdout, _ = self.run_cli('reconcile', '--graph', 'py-pixela', path)
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(self.pixels()), [
+            ('other', '20181022', '2', 'token'),
+            ('py-pixela', '20181021', '3', 'token'),
+            ('py-pixela', '20181023', '4', 'token'),
+        ])
+        self.assertEqual([summary['successes'] for summary in json.loads(stdout)], [1, 2])
+
+    def test_credentials_are_required(self):
+        path = self.write('pixels.ndjson', NDJSON)
+        stderr = io.StringIO()
+        with mock.patch.dict(os.environ, {'PIXELA_USERNAME': '', 'PIXELA_TOKEN': ''}), \
+                mock.patch('sys.stderr', stderr):
+            code = cli.main(['ingest', '--graph', 'py-pixela', path])
+        self.assertEqual(code, 2)
+        self.assertIn('PIXELA_TOKEN', stderr.getvalue())
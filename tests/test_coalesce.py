@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_coalesce
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.coalesce.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import threading
+from datetime import (
+    datetime,
+    timezone,
+)
+from unittest import TestCase
+
+from mock import mock
+from requests import (
+    ConnectTimeout,
+    ReadTimeout,
+    Session,
+)
+
+from pixela import Pixela
+from pixela.coalesce import Coalescer
+from pixela.exceptions import ValidationError
+from pixela.retry import RetryPolicy
+from .helpers import (
+    mock_response,
+    rejected,
+    success,
+)
+
+
+class CoalescerTestCase(TestCase):
+    def create_client(self, **kwargs):
+        self.coalescer = Coalescer(**kwargs)
+        client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            retry=RetryPolicy(max_retries=0),
+            coalescer=self.coalescer,
+        )
+        self.addCleanup(self.coalescer.close)
+
+        return client
+
+    def test_increment_is_buffered(self):
+        client = self.create_client(interval=60)
+        with mock.patch.object(Session, 'put', return_value=success()) as m:
+            for _ in range(10):
+                self.assertIsNone(client.increment_pixel(graph_id='py-pixela'))
+            client.decrement_pixel(graph_id='py-pixela')
+            client.increment_pixel(graph_id='other')
+            self.assertEqual(m.call_count, 0)
+
+            client.coalescer.flush()
+
+        self.assertEqual(m.call_count, 2)
+        calls = sorted((c[0][0], json.loads(c[1]['data'])) for c in m.call_args_list)
+        self.assertEqual(calls, [
+            ('https://pixe.la/v1/users/heavenshell/graphs/other/add', {'quantity': '1'}),
+            ('https://pixe.la/v1/users/heavenshell/graphs/py-pixela/add', {'quantity': '9'}),
+        ])
+        self.assertEqual(self.coalescer.events, 12)
+        self.assertEqual(self.coalescer.pending(), {})
+
+    def test_subtract(self):
+        client = self.create_client(interval=60)
+        with mock.patch.object(Session, 'put', return_value=success()) as m:
+            client.decrement_pixel(graph_id='py-pixela')
+            client.decrement_pixel(graph_id='py-pixela')
+            client.coalescer.flush()
+
+        self.assertEqual(m.call_args[0][0], 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/subtract')
+        self.assertEqual(json.loads(m.call_args[1]['data']), {'quantity': '2'})
+
+    def test_past_day(self):
+        client = self.create_client(interval=60)
+        yesterday = datetime(2018, 10, 21)
+        with mock.patch('pixela.coalesce.datetime') as dt:
+            dt.now.return_value = yesterday
+            client.increment_pixel(graph_id='py-pixela')
+            client.increment_pixel(graph_id='py-pixela')
+
+        with mock.patch.object(
+            Session,
+            'get',
+            return_value=mock_response(status_code=200, content={'quantity': '5'}),
+        ), mock.patch.object(Session, 'put', return_value=success()) as m:
+            client.coalescer.flush()
+
+        self.assertEqual(m.call_args[0][0], 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/20181021')
+        self.assertEqual(json.loads(m.call_args[1]['data']), {'quantity': '7'})
+
+    def test_failure_is_kept(self):
+        client = self.create_client(interval=60)
+        with mock.patch.object(Session, 'put', return_value=rejected()):
+            client.increment_pixel(graph_id='py-pixela')
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+
+        self.assertEqual(list(self.coalescer.pending().values()), [1])
+        self.assertEqual(self.coalescer.failed, [])
+
+        # Never sent, so never applied.
+        with mock.patch.object(Session, 'put', side_effect=ConnectTimeout('connect timed out')):
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+
+        self.assertEqual(list(self.coalescer.pending().values()), [1])
+        self.assertEqual(self.coalescer.failed, [])
+
+    def test_unknown_outcome_is_not_resent(self):
+        client = self.create_client(interval=60)
+        failure = mock_response(status_code=500, content={'isSuccess': False})
+        with mock.patch.object(Session, 'put', return_value=failure) as m:
+            for _ in range(3):
+                client.increment_pixel(graph_id='py-pixela')
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+            client.coalescer.flush()
+
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(self.coalescer.pending(), {})
+        (graph_id, _, delta, status_code, message), = self.coalescer.failed
+        self.assertEqual((graph_id, delta, status_code), ('py-pixela', 3, 500))
+        self.assertTrue(message.startswith('outcome unknown'))
+
+        with mock.patch.object(Session, 'put', side_effect=ReadTimeout('read timed out')) as m:
+            client.increment_pixel(graph_id='py-pixela')
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+            client.coalescer.flush()
+
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(self.coalescer.pending(), {})
+        self.assertIsNone(self.coalescer.failed[-1][3])
+        self.assertTrue(self.coalescer.failed[-1][4].startswith('outcome unknown'))
+
+    def test_past_day_failure_is_kept(self):
+        client = self.create_client(interval=60)
+        with mock.patch('pixela.coalesce.datetime') as dt:
+            dt.now.return_value = datetime(2018, 10, 21)
+            client.increment_pixel(graph_id='py-pixela')
+
+        failure = mock_response(status_code=500, content={'isSuccess': False})
+        with mock.patch.object(
+            Session,
+            'get',
+            return_value=mock_response(status_code=200, content={'quantity': '5'}),
+        ), mock.patch.object(Session, 'put', return_value=failure):
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+
+        self.assertEqual(list(self.coalescer.pending().values()), [1])
+        self.assertEqual(self.coalescer.failed, [])
+
+    def test_permanent_failure_is_dropped(self):
+        client = self.create_client(interval=60)
+        failure = mock_response(status_code=404, content={'message': 'Specified graph not found.', 'isSuccess': False})
+        with mock.patch.object(Session, 'put', return_value=failure) as m:
+            client.increment_pixel(graph_id='missing')
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+            client.coalescer.flush()
+
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(self.coalescer.pending(), {})
+        (graph_id, _, delta, status_code, message), = self.coalescer.failed
+        self.assertEqual((graph_id, delta, status_code), ('missing', 1, 404))
+        self.assertIn('Specified graph not found.', message)
+
+        with mock.patch.object(client, 'add_pixel', side_effect=ValidationError('Unknown graph.', 'other')):
+            client.increment_pixel(graph_id='other')
+            with self.assertLogs('pixela', level='ERROR'):
+                client.coalescer.flush()
+
+        self.assertEqual(self.coalescer.pending(), {})
+        self.assertEqual(self.coalescer.failed[-1][0], 'other')
+
+    def test_tz(self):
+        client = self.create_client(interval=60, tz='Asia/Tokyo')
+        utc = datetime(2018, 10, 21, 20, 0, tzinfo=timezone.utc)
+        with mock.patch('pixela.coalesce.datetime') as dt:
+            dt.now.side_effect = lambda tz: utc.astimezone(tz)
+            client.increment_pixel(graph_id='py-pixela')
+
+        self.assertEqual(list(self.coalescer.pending()), [('py-pixela', '20181022')])
+
+    def test_max_pending(self):
+        client = self.create_client(max_pending=5, interval=60)
+        flushed = threading.Event()
+        with mock.patch.object(Session, 'put', side_effect=lambda *a, **kw: flushed.set() or success()) as m:
+            for _ in range(5):
+                client.increment_pixel(graph_id='py-pixela')
+            self.assertTrue(flushed.wait(5))
+
+        self.assertEqual(m.call_count, 1)
+
+    def test_close_flushes(self):
+        client = self.create_client(interval=60)
+        with mock.patch.object(Session, 'put', return_value=success()) as m:
+            client.increment_pixel(graph_id='py-pixela')
+            client.close()
+
+        self.assertEqual(m.call_count, 1)
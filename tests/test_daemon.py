@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_daemon
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.daemon.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import io
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+from unittest import (
+    skipUnless,
+    TestCase,
+)
+
+from mock import mock
+
+from pixela import (
+    cli,
+    Pixela,
+)
+from pixela.coalesce import Coalescer
+from pixela.daemon import (
+    PixelaDaemon,
+    send,
+)
+from pixela.transport import FakeTransport
+
+
+@skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix domain sockets')
+class PixelaDaemonTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'pixela.sock')
+        self.transport = FakeTransport(self.handle)
+        self.client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            coalescer=Coalescer(max_pending=1000, interval=60),
+        )
+        self.client.logger.disabled = True
+        self.addCleanup(setattr, self.client.logger, 'disabled', False)
+
+    def handle(self, method, url, headers, body):
+        if '/missing' in url:
+            return 404, {'message': 'Specified graph not found.', 'isSuccess': False}
+
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+    def start(self):
+        daemon = PixelaDaemon(self.client, self.path)
+        daemon.bind()
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        def stop():
+            daemon.shutdown()
+            thread.join()
+            daemon.close()
+
+        self.addCleanup(stop)
+
+        return daemon
+
+    def test_increments_are_coalesced(self):
+        daemon = self.start()
+        for _ in range(3):
+            self.assertEqual(send('increment py-pixela', self.path), 'ok')
+        self.assertEqual(send('decrement py-pixela', self.path), 'ok')
+        self.assertEqual(send('add py-pixela 5', self.path), 'ok')
+        self.assertEqual(self.transport.calls, [])
+        self.assertEqual(json.loads(send('stats', self.path)), {
+            'commands': 6,
+            'errors': 0,
+            'events': 5,
+            'flushes': 0,
+            'requests': 0,
+            'pending': 1,
+        })
+
+        self.assertEqual(send('flush', self.path), 'ok')
+        self.assertEqual(len(self.transport.calls), 1)
+        method, url, _, body = self.transport.calls[0]
+        self.assertEqual((method, url), ('put', 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/add'))
+        self.assertEqual(json.loads(body), {'quantity': '7'})
+        self.assertEqual(daemon.commands, 7)
+
+    def test_update(self):
+        self.start()
+        self.assertEqual(send('update py-pixela 3 20181021', self.path), 'ok')
+        method, url, _, body = self.transport.calls[0]
+        self.assertEqual((method, url), ('put', 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/20181021'))
+        self.assertEqual(json.loads(body), {'quantity': '3'})
+
+        reply = send('update missing 3', self.path)
+        self.assertTrue(reply.startswith('error 404'), reply)
+
+    def test_errors(self):
+        daemon = self.start()
+        self.assertEqual(send('jump py-pixela', self.path), 'error unknown command jump')
+        self.assertEqual(send('increment', self.path), 'error wrong number of arguments for increment')
+        self.assertTrue(send('add py-pixela many', self.path).startswith('error invalid literal'))
+        self.assertTrue(send('update py-pixela 1 2018-10-21', self.path).startswith('error time data'))
+        self.assertEqual(daemon.errors, 4)
+        self.assertEqual(self.transport.calls, [])
+
+    def test_several_commands_per_connection(self):
+        self.start()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(sock.close)
+        sock.connect(self.path)
+        stream = sock.makefile('rwb')
+        for line in (b'ping\n', b'increment py-pixela\n', b'nope\n'):
+            stream.write(line)
+            stream.flush()
+        self.assertEqual(stream.readline(), b'ok\n')
+        self.assertEqual(stream.readline(), b'ok\n')
+        self.assertEqual(stream.readline(), b'error unknown command nope\n')
+
+    def test_socket(self):
+        daemon = self.start()
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        with self.assertRaises(RuntimeError):
+            PixelaDaemon(self.client, self.path).bind()
+
+        daemon.shutdown()
+        daemon.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stale_socket_is_replaced(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        sock.close()
+        self.start()
+        self.assertEqual(send('ping', self.path), 'ok')
+
+    def test_close_flushes(self):
+        daemon = PixelaDaemon(self.client, self.path)
+        with daemon:
+            self.assertEqual(daemon.execute('increment py-pixela'), 'ok')
+            self.assertEqual(self.transport.calls, [])
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_cli_send(self):
+        self.start()
+        with mock.patch('sys.stdout', io.StringIO()) as stdout:
+            self.assertEqual(cli.main(['send', '--socket', self.path, 'increment', 'py-pixela']), 0)
+            self.assertEqual(cli.main(['send', '--socket', self.path, 'stats']), 0)
+        self.assertEqual(json.loads(stdout.getvalue())['events'], 1)
+
+        with mock.patch('sys.stderr', io.StringIO()) as stderr:
+            self.assertEqual(cli.main(['send', '--socket', self.path, 'jump']), 1)
+            self.assertEqual(cli.main(['send', '--socket', self.path + '.missing', 'ping']), 1)
+        self.assertIn('error unknown command jump', stderr.getvalue())
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_deadline
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.deadline and the timeouts of the clients.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+import time
+from datetime import datetime
+from unittest import TestCase
+
+from pixela import Pixela
+from pixela.deadline import (
+    cap,
+    current,
+    Deadline,
+    limits,
+)
+from pixela.exceptions import (
+    DeadlineExceeded,
+    PixelaError,
+    RequestTimeout,
+)
+from pixela.retry import RetryPolicy
+from pixela.transport import FakeTransport
+from .helpers import RecordingServer
+
+
+class DeadlineTestCase(TestCase):
+    def test_limits_nest(self):
+        self.assertEqual(current(), (None, None))
+        with limits(timeout=5, deadline=10) as outer:
+            with limits(deadline=60) as inner:
+                self.assertIs(inner, outer)
+                self.assertEqual(current()[0], 5)
+            with limits(timeout=(1, 2), deadline=1) as inner:
+                self.assertIsNot(inner, outer)
+                self.assertEqual(current(), ((1, 2), inner))
+            self.assertEqual(current(), (5, outer))
+        self.assertEqual(current(), (None, None))
+
+    def test_limits_are_per_thread(self):
+        seen = []
+        with limits(timeout=5):
+            thread = threading.Thread(target=lambda: seen.append(current()))
+            thread.start()
+            thread.join()
+        self.assertEqual(seen, [(None, None)])
+
+    def test_cap(self):
+        deadline = Deadline(1)
+        self.assertEqual(cap((3, 30), None), (3, 30))
+        self.assertLessEqual(cap(None, deadline), 1)
+        self.assertLessEqual(cap(30, deadline), 1)
+        self.assertEqual(cap(0.5, deadline), 0.5)
+        connect, read = cap((0.5, 30), deadline)
+        self.assertEqual(connect, 0.5)
+        self.assertLessEqual(read, 1)
+        with self.assertRaises(DeadlineExceeded):
+            cap(30, Deadline(0))
+
+
+class ClientTimeoutTestCase(TestCase):
+    def create_client(self, handler=None, **kwargs):
+        self.transport = FakeTransport(handler)
+        client = Pixela(username='heavenshell', token='token', transport=self.transport, **kwargs)
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+
+        return client
+
+    def test_timeouts_are_passed_to_the_transport(self):
+        client = self.create_client()
+        client.increment_pixel('py-pixela')
+        with limits(timeout=1):
+            client.increment_pixel('py-pixela')
+        with limits(deadline=5):
+            client.increment_pixel('py-pixela')
+        self.assertEqual(self.transport.timeouts[:2], [Pixela.DEFAULT_TIMEOUT, 1])
+        connect, read = self.transport.timeouts[2]
+        self.assertLessEqual(connect, 5)
+        self.assertLessEqual(read, 5)
+
+        client = self.create_client(timeout=None)
+        client.increment_pixel('py-pixela')
+        self.assertEqual(self.transport.timeouts, [None])
+
+    def test_timeout_error(self):
+        def handle(method, url, headers, body):
+            raise TimeoutError('timed out')
+
+        client = self.create_client(handle)
+        with self.assertRaises(RequestTimeout) as e:
+            client.increment_pixel('py-pixela')
+        self.assertIsInstance(e.exception, PixelaError)
+        self.assertIsInstance(e.exception.__cause__, TimeoutError)
+        self.assertEqual((client.timeouts, client.deadlines_exceeded), (1, 0))
+
+    def test_expired_deadline_is_not_sent(self):
+        client = self.create_client()
+        with limits(deadline=Deadline(0)):
+            with self.assertRaises(DeadlineExceeded):
+                client.increment_pixel('py-pixela')
+        self.assertEqual(self.transport.calls, [])
+        self.assertEqual((client.timeouts, client.deadlines_exceeded), (0, 1))
+
+    def test_retry_stops_at_deadline(self):
+        def handle(method, url, headers, body):
+            return 503, {'message': 'Service Unavailable.', 'isSuccess': False}
+
+        retry = RetryPolicy(max_retries=10, backoff=0.1, max_backoff=0.1)
+        client = self.create_client(handle, retry=retry)
+        start = time.monotonic()
+        with limits(deadline=0.3):
+            with self.assertRaises(DeadlineExceeded):
+                client.update_pixel('py-pixela', 5, datetime(2018, 10, 21))
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertLess(len(self.transport.calls), 10)
+        self.assertEqual(retry.giveups, 1)
+        self.assertEqual(client.deadlines_exceeded, 1)
+
+    def test_bulk_deadline(self):
+        def handle(method, url, headers, body):
+            time.sleep(0.02)
+            return 200, {'message': 'Success.', 'isSuccess': True}
+
+        client = self.create_client(handle)
+        pairs = iter([(datetime(2018, 1, 1), i) for i in range(1000)])
+        result = client.create_pixels('py-pixela', pairs, workers=2, deadline=0.2)
+        self.assertTrue(result.expired)
+        self.assertLess(result.successes + len(result.failures), 1000)
+        self.assertTrue(all(isinstance(res, DeadlineExceeded) for _, _, res in result.failures))
+        self.assertEqual(
+            result.successes + len(result.failures) + len(list(pairs)),
+            1000,
+        )
+
+        result = client.create_pixels('py-pixela', [(datetime(2018, 1, 1), 1)], deadline=5)
+        self.assertFalse(result.expired)
+
+    def test_workers_inherit_limits(self):
+        client = self.create_client()
+        with limits(timeout=2):
+            client.create_pixels('py-pixela', [(datetime(2018, 1, day), 1) for day in range(1, 11)], workers=4)
+            client.invoke_webhooks(['xxx', 'yyy'], workers=2)
+        self.assertEqual(self.transport.timeouts, [2] * 12)
+
+        with limits(deadline=Deadline(0)):
+            results = client.invoke_webhooks(['xxx', 'yyy'], workers=2)
+        self.assertTrue(all(isinstance(res, DeadlineExceeded) for _, res in results))
+        self.assertEqual(len(self.transport.calls), 12)
+
+    def test_iter_pixels_deadline(self):
+        client = self.create_client()
+        with self.assertRaises(DeadlineExceeded):
+            list(client.iter_pixels('py-pixela', datetime(2018, 1, 1), datetime(2018, 1, 2), deadline=Deadline(0)))
+        self.assertEqual(self.transport.calls, [])
+
+
+class TransportTimeoutTestCase(TestCase):
+    transport = 'requests'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RecordingServer(delay=1.0).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def create_client(self, **kwargs):
+        client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            retry=RetryPolicy(max_retries=2, backoff=0),
+            **kwargs,
+        )
+        client.API_ENDPOINT = self.server.endpoint
+        self.addCleanup(client.close)
+
+        return client
+
+    def test_read_timeout(self):
+        client = self.create_client(timeout=(1, 0.1))
+        start = time.monotonic()
+        with self.assertRaises(RequestTimeout):
+            client.update_pixel('py-pixela', 5, datetime(2018, 10, 21))
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(client.retry.retries, 2)
+        self.assertEqual(client.timeouts, 1)
+
+        # The server may have applied an increment which timed out.
+        with self.assertRaises(RequestTimeout):
+            client.increment_pixel('py-pixela')
+        self.assertEqual(client.retry.retries, 2)
+        self.assertEqual(client.timeouts, 2)
+
+    def test_deadline_caps_read_timeout(self):
+        client = self.create_client(timeout=None)
+        start = time.monotonic()
+        with limits(deadline=0.25):
+            with self.assertRaises(TimeoutError):
+                client.increment_pixel('py-pixela')
+        self.assertLess(time.monotonic() - start, 0.9)
+
+
+class Urllib3TransportTimeoutTestCase(TransportTimeoutTestCase):
+    transport = 'urllib3'
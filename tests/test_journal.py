@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_journal
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.journal.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+from pixela import Pixela
+from pixela.journal import Journal
+from pixela.retry import RetryPolicy
+from .helpers import (
+    RecordingServer,
+    wait_for,
+)
+
+
+class SwitchableServer(object):
+    """Stand-in Pixela server which can be switched off and on again."""
+
+    def __init__(self):
+        self.pixels = []
+        self.port = 0
+        self.server = None
+
+    def handle(self, method, path, headers, body):
+        graph_id, date = path.split('/')[-2:]
+        if graph_id == 'missing':
+            return 404, {'message': 'Specified graph not found.', 'isSuccess': False}
+
+        self.pixels.append((graph_id, date, json.loads(body)['quantity'] if method == 'PUT' else None))
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+    def on(self):
+        self.server = RecordingServer(self.handle, port=self.port).start()
+        self.port = self.server.server_address[1]
+
+    def off(self):
+        self.server.stop()
+
+    @property
+    def endpoint(self):
+        return 'http://127.0.0.1:{port}/v1'.format(port=self.port)
+
+
+class JournalTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'journal.db')
+        self.server = SwitchableServer()
+        self.server.on()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def tearDown(self):
+        if self.server.server is not None:
+            self.server.off()
+
+    def create_client(self, interval=0.05):
+        client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            retry=RetryPolicy(max_retries=0),
+            journal=Journal(self.path, interval=interval),
+        )
+        client.API_ENDPOINT = self.server.endpoint
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+
+        return client
+
+    def test_write_returns_at_once_and_is_flushed(self):
+        client = self.create_client()
+        date = datetime(2018, 10, 21)
+        self.assertIsNone(client.create_pixel(graph_id='py-pixela', quantity=5, date=date))
+        self.assertIsNone(client.update_pixel(graph_id='py-pixela', quantity=6, date=datetime(2018, 10, 22)))
+
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        self.assertEqual(sorted(self.server.pixels), [
+            ('py-pixela', '20181021', '5'),
+            ('py-pixela', '20181022', '6'),
+        ])
+        client.close()
+
+    def test_merge_same_pixel(self):
+        self.server.off()
+        client = self.create_client()
+        date = datetime(2018, 10, 21)
+        for quantity in range(10):
+            client.create_pixel(graph_id='py-pixela', quantity=quantity, date=date)
+        self.assertEqual(client.journal.pending(), 1)
+
+        self.server.on()
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        # A write the flusher picked up before it was merged may be sent
+        # first, the last write always arrives last.
+        self.assertEqual(self.server.pixels[-1], ('py-pixela', '20181021', '9'))
+        client.close()
+
+    def test_resume_after_restart(self):
+        self.server.off()
+        client = self.create_client(interval=60)
+        client.create_pixel(graph_id='py-pixela', quantity=5, date=datetime(2018, 10, 21))
+        client.close()
+        self.assertEqual(self.server.pixels, [])
+
+        self.server.on()
+        client = self.create_client()
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        self.assertEqual(self.server.pixels, [('py-pixela', '20181021', '5')])
+        client.close()
+
+    def test_delete(self):
+        self.server.off()
+        client = self.create_client()
+        date = datetime(2018, 10, 21)
+        client.create_pixel(graph_id='py-pixela', quantity=5, date=date)
+        self.server.on()
+        self.assertIsNone(client.delete_pixel(graph_id='py-pixela', date=date))
+
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        # The pending write was merged into the delete or sent before it.
+        self.assertEqual(self.server.pixels[-1], ('py-pixela', '20181021', None))
+        self.assertLessEqual(len(self.server.pixels), 2)
+        self.assertEqual(client.journal.failed, 0)
+
+        # Once sent, a write is deleted after it.
+        client.create_pixel(graph_id='py-pixela', quantity=6, date=date)
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        client.delete_pixel(graph_id='py-pixela', date=date)
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        self.assertEqual(self.server.pixels[-2:], [('py-pixela', '20181021', '6'), ('py-pixela', '20181021', None)])
+        client.close()
+
+    def test_rejected_write_is_moved_to_failed(self):
+        client = self.create_client()
+        client.create_pixel(graph_id='missing', quantity=5, date=datetime(2018, 10, 21))
+        client.create_pixel(graph_id='py-pixela', quantity=5, date=datetime(2018, 10, 21))
+
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        self.assertEqual(client.journal.failed, 1)
+        self.assertEqual(self.server.pixels, [('py-pixela', '20181021', '5')])
+        client.close()
+
+    def test_bulk_writes(self):
+        client = self.create_client()
+        pairs = [(datetime(2018, 10, day), day) for day in range(1, 11)]
+        result = client.create_pixels('py-pixela', pairs, workers=2)
+        self.assertEqual((result.successes, result.failures), (10, []))
+        result = client.update_pixels('py-pixela', pairs[:3], workers=2)
+        self.assertEqual((result.successes, result.failures), (3, []))
+
+        self.assertTrue(wait_for(lambda: client.journal.pending() == 0))
+        self.assertEqual(len(set(self.server.pixels)), 10)
+        client.close()
+
+    def test_synchronous(self):
+        journal = Journal(os.path.join(self.tmpdir, 'normal.db'), synchronous='NORMAL')
+        self.assertEqual(journal._conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+        journal._conn.close()
+        journal = Journal(os.path.join(self.tmpdir, 'full.db'))
+        self.assertEqual(journal._conn.execute('PRAGMA synchronous').fetchone()[0], 2)
+        journal._conn.close()
+        with self.assertRaises(ValueError):
+            Journal(self.path, synchronous='OFF; DROP TABLE pixels')
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_metrics
+    ~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.hooks and pixela.metrics.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+from datetime import datetime
+from unittest import TestCase
+
+from mock import mock
+from requests import (
+    ConnectionError,
+    Session,
+)
+
+from pixela import (
+    Pixela,
+    routes,
+)
+from pixela.hooks import Hook
+from pixela.metrics import Metrics
+from pixela.retry import RetryPolicy
+from .helpers import mock_response
+
+
+class TemplateTestCase(TestCase):
+    def test_template(self):
+        r = routes.Routes('heavenshell')
+        self.assertEqual(routes.template('users'), routes.USERS)
+        self.assertEqual(routes.template(r.user), routes.USER)
+        self.assertEqual(routes.template(r.graphs), routes.GRAPHS)
+        self.assertEqual(routes.template(r.webhooks), routes.WEBHOOKS)
+        self.assertEqual(routes.template(r.graph('py-pixela')), routes.GRAPH)
+        self.assertEqual(routes.template(r.webhook('xxx')), routes.WEBHOOK)
+        self.assertEqual(routes.template(r.pixel('py-pixela', '20181021')), routes.PIXEL)
+        self.assertEqual(routes.template(r.increment('py-pixela')), routes.INCREMENT)
+        self.assertEqual(routes.template(r.decrement('py-pixela')), routes.DECREMENT)
+        self.assertEqual(routes.template(r.add('py-pixela')), routes.ADD)
+        self.assertEqual(routes.template(r.subtract('py-pixela')), routes.SUBTRACT)
+        self.assertEqual(routes.template(r.pixels('py-pixela') + '?withBody=true'), routes.PIXELS)
+        self.assertEqual(routes.template(r.stats('py-pixela')), routes.STATS)
+
+
+class RecordingHook(Hook):
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, request):
+        self.events.append(('before', request.method, request.route))
+
+    def after_response(self, request, response, elapsed):
+        self.events.append(('after', response.status_code, request.retries))
+
+    def on_error(self, request, error, elapsed):
+        self.events.append(('error', type(error).__name__, request.retries))
+
+
+class HooksTestCase(TestCase):
+    def setUp(self):
+        self.hook = RecordingHook()
+        self.metrics = Metrics()
+        self.client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            retry=RetryPolicy(max_retries=1, backoff=0),
+            hooks=[self.hook, self.metrics],
+        )
+
+    def test_after_response(self):
+        rejected = mock_response(status_code=503, content={'isRejected': True})
+        success = mock_response(status_code=200, content={'message': 'Success.', 'isSuccess': True})
+        with mock.patch.object(Session, 'post', side_effect=[rejected, success]):
+            self.client.create_pixel(graph_id='py-pixela', quantity=5, date=datetime(2018, 10, 21))
+
+        self.assertEqual(self.hook.events, [
+            ('before', 'post', routes.GRAPH),
+            ('after', 200, 1),
+        ])
+
+        stats = self.metrics.snapshot()['POST ' + routes.GRAPH]
+        self.assertEqual(stats['statuses'], {200: 1})
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['retries'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['bytes_sent'], len('{"date": "20181021", "quantity": "5"}'))
+        self.assertEqual(stats['bytes_received'], len(success.content))
+        self.assertEqual(stats['buckets'][float('inf')], 1)
+
+    def test_on_error(self):
+        with mock.patch.object(Session, 'get', side_effect=ConnectionError('refused')):
+            with self.assertRaises(ConnectionError):
+                self.client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+
+        self.assertEqual(self.hook.events, [
+            ('before', 'get', routes.PIXEL),
+            ('error', 'ConnectionError', 1),
+        ])
+        stats = self.metrics.snapshot()['GET ' + routes.PIXEL]
+        self.assertEqual(stats['errors'], {'ConnectionError': 1})
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_prometheus(self):
+        success = mock_response(status_code=200, content={'message': 'Success.', 'isSuccess': True})
+        with mock.patch.object(Session, 'put', return_value=success):
+            self.client.increment_pixel(graph_id='py-pixela')
+            self.client.increment_pixel(graph_id='other')
+
+        text = self.metrics.prometheus()
+        labels = 'method="PUT",route="users/{username}/graphs/{graph_id}/increment"'
+        self.assertIn('# TYPE pixela_requests_total counter\n', text)
+        self.assertIn('pixela_requests_total{' + labels + ',status="200"} 2\n', text)
+        self.assertIn('pixela_request_duration_seconds_bucket{' + labels + ',le="+Inf"} 2\n', text)
+        self.assertIn('pixela_request_duration_seconds_count{' + labels + '} 2\n', text)
+        self.assertIn('pixela_requests_in_flight{' + labels + '} 0\n', text)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_mirror
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.mirror.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import os
+import shutil
+import tempfile
+from datetime import (
+    datetime,
+    timedelta,
+)
+from unittest import (
+    skipIf,
+    TestCase,
+)
+
+from mock import mock
+from requests import Session
+
+from pixela import (
+    mirror as mirror_module,
+    Pixela,
+)
+from pixela.mirror import GraphMirror
+from .helpers import mock_response
+
+TODAY = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day(offset):
+    return TODAY - timedelta(days=offset)
+
+
+class GraphMirrorTestCase(TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'py-pixela.mirror')
+        self.client = Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        # ymd => quantity, served by the pixels list endpoint.
+        self.pixels = {}
+        self.requests = []
+        patcher = mock.patch.object(Session, 'get', side_effect=self.get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url, **kwargs):
+        query = dict(pair.split('=') for pair in url.split('?')[1].split('&'))
+        self.requests.append((query['from'], query['to']))
+        pixels = [
+            {'date': date, 'quantity': quantity}
+            for date, quantity in sorted(self.pixels.items())
+            if query['from'] <= date <= query['to']
+        ]
+        return mock_response(status_code=200, content={'pixels': pixels})
+
+    def put(self, offset, quantity):
+        self.pixels[day(offset).strftime('%Y%m%d')] = str(quantity)
+
+    def create_mirror(self, **kwargs):
+        return GraphMirror(self.client, 'py-pixela', path=self.path, use_numpy=self.use_numpy, **kwargs)
+
+    def test_sync(self):
+        for offset in range(10):
+            self.put(offset, offset)
+        mirror = self.create_mirror(start=day(20))
+        self.assertEqual(mirror.sync(), 10)
+        self.assertEqual(self.requests, [(day(20).strftime('%Y%m%d'), TODAY.strftime('%Y%m%d'))])
+        self.assertEqual(mirror.get(day(3)), 3.0)
+        self.assertIsNone(mirror.get(day(15)))
+        self.assertIsNone(mirror.get(day(100)))
+        self.assertEqual(len(mirror.values()), 21)
+        self.assertEqual(mirror.count(), 10)
+        self.assertEqual(mirror.sum(), 45.0)
+        self.assertEqual(mirror.sum(day(2), day(0)), 3.0)
+        self.assertEqual(list(mirror.items(day(2), day(1))), [(day(2), 2.0), (day(1), 1.0)])
+
+    def test_incremental_sync(self):
+        self.put(5, 5)
+        mirror = self.create_mirror(start=day(10))
+        mirror.sync()
+        self.put(0, 7)
+        self.assertEqual(mirror.sync(), 1)
+        self.assertEqual(self.requests[-1][0], TODAY.strftime('%Y%m%d'))
+        self.assertEqual(mirror.sum(), 12.0)
+
+    def test_sync_clears_deleted_pixels(self):
+        self.put(1, 1)
+        self.put(2, 2)
+        mirror = self.create_mirror(start=day(5))
+        mirror.sync()
+        del self.pixels[day(1).strftime('%Y%m%d')]
+        mirror.sync(start=day(3))
+        self.assertIsNone(mirror.get(day(1)))
+        self.assertEqual(mirror.get(day(2)), 2.0)
+
+    def test_sync_grows_backwards(self):
+        self.put(30, 30)
+        self.put(1, 1)
+        mirror = self.create_mirror(start=day(5))
+        mirror.sync()
+        self.assertEqual(mirror.sync(start=day(40)), 2)
+        self.assertEqual(len(mirror.values()), 41)
+        self.assertEqual(mirror.get(day(30)), 30.0)
+
+    def test_persistence(self):
+        for offset in range(5):
+            self.put(offset, offset + 1)
+        mirror = self.create_mirror(start=day(5))
+        mirror.sync()
+
+        reopened = self.create_mirror()
+        self.assertEqual(reopened.origin, mirror.origin)
+        self.assertEqual(reopened.synced, TODAY)
+        self.assertEqual(list(reopened.items()), list(mirror.items()))
+        self.assertEqual(reopened.sum(), 15.0)
+        reopened.sync()
+        self.assertEqual(self.requests[-1][0], TODAY.strftime('%Y%m%d'))
+
+    def test_rolling_sum(self):
+        for offset in (0, 1, 3):
+            self.put(offset, 1)
+        mirror = self.create_mirror(start=day(4))
+        mirror.sync()
+        self.assertEqual(list(mirror.rolling_sum(2)), [1.0, 1.0, 1.0, 2.0])
+        self.assertEqual(list(mirror.rolling_sum(3, day(3), day(0))), [2.0, 2.0])
+        self.assertEqual(list(mirror.rolling_sum(10)), [])
+
+    def test_empty(self):
+        mirror = self.create_mirror()
+        self.assertIsNone(mirror.get(TODAY))
+        self.assertEqual(mirror.sum(), 0)
+        self.assertEqual(list(mirror.items()), [])
+
+    def test_not_a_mirror(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * mirror_module.HEADER.size)
+        with self.assertRaises(ValueError):
+            self.create_mirror()
+
+
+@skipIf(mirror_module.numpy is None, 'numpy is not installed')
+class NumpyGraphMirrorTestCase(GraphMirrorTestCase):
+    use_numpy = True
@@ -10,24 +10,19 @@
     :license: BSD, see LICENSE for more details.
 """
 import json
+import subprocess
+import sys
 from datetime import datetime
 from unittest import TestCase
 
 from mock import mock
-from requests import (
-    Response,
-    Session,
-)
-
-from pixela import Pixela
-
-
-def mock_response(status_code, content):
-    res = Response()
-    res.status_code = status_code
-    res._content = json.dumps(content)
+from requests import Session
 
-    return res
+from pixela import (
+    Pixela,
+    timezone,
+)
+from .helpers import mock_response
 
 
 class UserMethodsMixinTestCase(TestCase):
@@ -192,6 +187,26 @@ class GraphMethodsMixinTestCase(TestCase):
         url = self.client.graph_url(graph_id='py-pixela', date=date, mode='short')
         self.assertEqual(url, 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela?date=20181021&mode=short')
 
+    @mock.patch.object(
+        Session,
+        'get',
+        return_value=mock_response(
+            status_code=200,
+            content={
+                'totalPixelsCount': 2,
+                'maxQuantity': 5,
+                'minQuantity': 1,
+                'totalQuantity': 6,
+                'avgQuantity': 3,
+                'todaysQuantity': 0,
+            },
+        ),
+    )
+    def test_get_graph_stats(self, m):
+        res = self.client.get_graph_stats(graph_id='py-pixela')
+        self.assertEqual(res.json()['totalQuantity'], 6)
+        self.assertEqual(m.call_args[0][0], 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/stats')
+
     @mock.patch.object(
         Session,
         'delete',
@@ -240,6 +255,27 @@ class PixelMethodsMixinTestCase(TestCase):
         ret = json.loads(res.content)
         self.assertEqual(ret['quantity'], 5)
 
+    @mock.patch.object(
+        Session,
+        'get',
+        return_value=mock_response(
+            status_code=200,
+            content={'pixels': ['20181021', '20181022']},
+        ),
+    )
+    def test_get_pixels(self, m):
+        res = self.client.get_pixels(
+            graph_id='py-pixela',
+            start=datetime(2018, 10, 21),
+            end=datetime(2018, 10, 31),
+            with_body=False,
+        )
+        self.assertEqual(res.json()['pixels'], ['20181021', '20181022'])
+        self.assertEqual(
+            m.call_args[0][0],
+            'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/pixels?from=20181021&to=20181031',
+        )
+
     @mock.patch.object(
         Session,
         'put',
@@ -305,6 +341,34 @@ class PixelMethodsMixinTestCase(TestCase):
         self.assertEqual(ret['message'], 'Success.')
         self.assertEqual(ret['isSuccess'], True)
 
+    @mock.patch.object(
+        Session,
+        'put',
+        return_value=mock_response(
+            status_code=200,
+            content={'message': 'Success.', 'isSuccess': True},
+        ),
+    )
+    def test_add_pixel(self, m):
+        res = self.client.add_pixel(graph_id='py-pixela', quantity=3)
+        ret = json.loads(res.content)
+        self.assertEqual(ret['isSuccess'], True)
+        self.assertEqual(m.call_args[0][0], 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/add')
+
+    @mock.patch.object(
+        Session,
+        'put',
+        return_value=mock_response(
+            status_code=200,
+            content={'message': 'Success.', 'isSuccess': True},
+        ),
+    )
+    def test_subtract_pixel(self, m):
+        res = self.client.subtract_pixel(graph_id='py-pixela', quantity=3)
+        ret = json.loads(res.content)
+        self.assertEqual(ret['isSuccess'], True)
+        self.assertEqual(m.call_args[0][0], 'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/subtract')
+
 
 class WebhookMethodsTestCase(TestCase):
     @classmethod
@@ -372,3 +436,89 @@ class WebhookMethodsTestCase(TestCase):
         ret = json.loads(res.content)
         self.assertEqual(ret['message'], 'Success.')
         self.assertEqual(ret['isSuccess'], True)
+
+
+class PixelaSessionTestCase(TestCase):
+    def test_session_is_reused(self):
+        client = Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        session = client.session
+        with mock.patch.object(
+            Session,
+            'get',
+            return_value=mock_response(status_code=200, content={'quantity': 5}),
+        ) as m:
+            client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+            client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 22))
+
+        self.assertIs(client.session, session)
+        self.assertEqual(m.call_count, 2)
+        client.close()
+
+    def test_token_is_not_stored_in_session(self):
+        client = Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        with mock.patch.object(
+            Session,
+            'put',
+            return_value=mock_response(status_code=200, content={'isSuccess': True}),
+        ) as m:
+            client.increment_pixel(graph_id='py-pixela')
+
+        _, kwargs = m.call_args
+        self.assertEqual(kwargs['headers'], {'X-USER-TOKEN': 'ba0afe74-86a3-40fe-8bf7-0801027d087d'})
+        self.assertNotIn('X-USER-TOKEN', client.session.headers)
+        self.assertNotIn('X-USER-TOKEN', Pixela.headers)
+        client.close()
+
+    def test_pool_size(self):
+        client = Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            pool_connections=4,
+            pool_maxsize=32,
+        )
+        adapter = client.session.get_adapter('https://pixe.la/v1')
+        self.assertEqual(adapter._pool_connections, 4)
+        self.assertEqual(adapter._pool_maxsize, 32)
+        client.close()
+
+    def test_context_manager(self):
+        with mock.patch.object(Session, 'close') as m:
+            with Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d') as client:
+                self.assertIsInstance(client, Pixela)
+                client.session
+            m.assert_called_once_with()
+
+    def test_session_is_created_on_first_use(self):
+        client = Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        self.assertEqual(client._transport, 'requests')
+        with mock.patch.object(Session, 'close') as m:
+            client.close()
+        self.assertFalse(m.called)
+        self.assertIsInstance(client.session, Session)
+
+
+class LazyImportTestCase(TestCase):
+    def test_import_does_not_load_transport(self):
+        code = (
+            'import sys, pixela; '
+            'pixela.Pixela(username="heavenshell", token="token"); '
+            'sys.stdout.write(" ".join(m for m in ("requests", "pytz") if m in sys.modules))'
+        )
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out, b'')
+
+    def test_import_does_not_configure_logging(self):
+        code = (
+            'import logging, sys, pixela; '
+            'pixela.Pixela(username="heavenshell", token="token"); '
+            'sys.stdout.write(str(len(logging.root.handlers)))'
+        )
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out, b'0')
+
+    def test_timezone(self):
+        client = Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        self.assertEqual(client.tz.utcoffset(datetime(2018, 10, 21)).total_seconds(), 0)
+        tokyo = timezone('Asia/Tokyo')
+        self.assertEqual(tokyo.utcoffset(datetime(2018, 10, 21)).total_seconds(), 9 * 3600)
+        self.assertIs(client.tz, client.tz)
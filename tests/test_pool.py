@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_pool
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.pool.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+from datetime import datetime
+from unittest import TestCase
+
+from mock import mock
+from requests import Session
+
+from pixela.cache import PixelaCache
+from pixela.pool import PixelaPool
+from .helpers import (
+    mock_response,
+    success,
+)
+
+
+class PixelaPoolTestCase(TestCase):
+    def test_users_share_the_session(self):
+        with PixelaPool() as pool:
+            alice = pool.user('alice', 'alice-token')
+            bob = pool.user('bob', 'bob-token')
+            with mock.patch.object(Session, 'put', return_value=success()) as m:
+                alice.increment_pixel(graph_id='py-pixela')
+                bob.increment_pixel(graph_id='py-pixela')
+
+            self.assertEqual(len(pool.session.adapters), 2)
+            self.assertNotIn('X-USER-TOKEN', pool.session.headers)
+
+        self.assertEqual(m.call_args_list[0][0][0], 'https://pixe.la/v1/users/alice/graphs/py-pixela/increment')
+        self.assertEqual(m.call_args_list[0][1]['headers'], {'X-USER-TOKEN': 'alice-token'})
+        self.assertEqual(m.call_args_list[1][0][0], 'https://pixe.la/v1/users/bob/graphs/py-pixela/increment')
+        self.assertEqual(m.call_args_list[1][1]['headers'], {'X-USER-TOKEN': 'bob-token'})
+
+    def test_tokens_do_not_leak_between_threads(self):
+        pool = PixelaPool(pool_maxsize=8)
+        sent = []
+        lock = threading.Lock()
+
+        def post(url, data=None, headers=None, **kwargs):
+            with lock:
+                sent.append((url.split('/')[5], headers['X-USER-TOKEN']))
+            return success()
+
+        def worker(i):
+            user = pool.user('user{i}'.format(i=i), 'token{i}'.format(i=i))
+            for _ in range(20):
+                user.create_pixel(graph_id='py-pixela', quantity=1, date=datetime(2018, 10, 21))
+
+        with mock.patch.object(Session, 'post', side_effect=post):
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(sent), 160)
+        for username, token in sent:
+            self.assertEqual(username.replace('user', 'token'), token)
+        pool.close()
+
+    def test_user_is_lightweight(self):
+        user = PixelaPool().user('heavenshell', 'ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        self.assertFalse(hasattr(user, '__dict__'))
+        with self.assertRaises(AttributeError):
+            user.coalescer = object()
+
+    def test_user_follows_the_pool(self):
+        cache = PixelaCache()
+        pool = PixelaPool(tz='Asia/Tokyo', cache=cache)
+        pool.API_ENDPOINT = 'http://127.0.0.1:8080/v1'
+        user = pool.user('heavenshell', 'ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        self.assertIs(user.tz, pool.tz)
+        self.assertIs(user.retry, pool.retry)
+        self.assertEqual(user.graph_url('py-pixela'), 'http://127.0.0.1:8080/v1/users/heavenshell/graphs/py-pixela')
+
+        res = mock_response(status_code=200, content={'quantity': '5'})
+        with mock.patch.object(Session, 'get', return_value=res) as m:
+            user.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+            pool.user('heavenshell', 'ba0afe74-86a3-40fe-8bf7-0801027d087d').get_pixel(
+                graph_id='py-pixela',
+                date=datetime(2018, 10, 21),
+            )
+            pool.user('other', 'token').get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(cache.hits, 1)
+
+    def test_cache_is_per_token(self):
+        cache = PixelaCache()
+        pool = PixelaPool(cache=cache)
+        date = datetime(2018, 10, 21)
+        res = mock_response(status_code=200, content={'quantity': '5'})
+        with mock.patch.object(Session, 'get', return_value=res) as m:
+            pool.user('alice', 'alice-token').get_pixel(graph_id='py-pixela', date=date)
+            pool.user('alice', 'WRONG').get_pixel(graph_id='py-pixela', date=date)
+            pool.user('alice', 'alice-token').get_graphs()
+            pool.user('alice', 'WRONG').get_graphs()
+
+        self.assertEqual(m.call_count, 4)
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(m.call_args_list[1][1]['headers']['X-USER-TOKEN'], 'WRONG')
+
+        # A write of either handle drops the entries of both tokens.
+        with mock.patch.object(Session, 'delete', return_value=success()):
+            pool.user('alice', 'alice-token').delete_pixel(graph_id='py-pixela', date=date)
+            pool.user('alice', 'alice-token').delete_graph(graph_id='other')
+        self.assertEqual(len(cache), 0)
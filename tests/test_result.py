@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_result
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.result.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+from datetime import datetime
+from unittest import TestCase
+
+from pixela import Pixela
+from pixela.exceptions import (
+    APIError,
+    AuthenticationError,
+    NotFoundError,
+    PixelaConnectionError,
+    PixelaError,
+    RejectedError,
+    ServerError,
+)
+from pixela.result import (
+    error_for,
+    Result,
+)
+from pixela.retry import RetryPolicy
+from pixela.transport import FakeTransport
+
+
+def result(status_code, content):
+    return Result(status_code, json.dumps(content).encode('utf-8'))
+
+
+class ResultTestCase(TestCase):
+    def test_lazy_data(self):
+        res = result(200, {'message': 'Success.', 'isSuccess': True})
+        self.assertIsNone(res._data)
+        self.assertTrue(res.ok)
+        self.assertTrue(res)
+        self.assertEqual(res.is_success, True)
+        self.assertEqual(res.message, 'Success.')
+        self.assertIs(res.data, res.data)
+        self.assertEqual(res.json(), res.data)
+        self.assertIsNot(res.json(), res.data)
+        self.assertEqual(repr(res), '<Result [200]>')
+
+        res = Result(200, b'')
+        self.assertEqual(res.data, {})
+        self.assertIsNone(res.is_success)
+        with self.assertRaises(AttributeError):
+            res.headers = {}
+
+    def test_errors(self):
+        cases = [
+            (400, {'message': 'Bad request.'}, APIError),
+            (401, {'message': 'Wrong token.'}, AuthenticationError),
+            (404, {'message': 'Specified graph not found.'}, NotFoundError),
+            (429, {'message': 'Too many requests.'}, RejectedError),
+            (503, {'message': 'Please retry.', 'isRejected': True}, RejectedError),
+            (500, {'message': 'Internal Server Error.'}, ServerError),
+        ]
+        for status_code, content, error in cases:
+            res = result(status_code, content)
+            self.assertFalse(res)
+            with self.assertRaises(error) as e:
+                res.raise_for_status()
+            self.assertIs(type(e.exception), error)
+            self.assertIsInstance(e.exception, PixelaError)
+            self.assertIs(e.exception.result, res)
+            self.assertEqual(e.exception.status_code, status_code)
+            self.assertIn(content['message'], str(e.exception))
+
+        self.assertIsInstance(error_for(Result(502, b'<html>Bad Gateway</html>')), ServerError)
+        result(200, {}).raise_for_status()
+
+
+class ClientResultsTestCase(TestCase):
+    def handle(self, method, url, headers, body):
+        if '/missing' in url:
+            return 404, {'message': 'Specified graph not found.', 'isSuccess': False}
+        if '/broken' in url:
+            return 500, {'message': 'Internal Server Error.', 'isSuccess': False}
+        if method == 'get':
+            return 200, {'quantity': '5'}
+
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+    def create_client(self, handler=None):
+        self.transport = FakeTransport(handler or self.handle)
+
+        return Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            retry=RetryPolicy(max_retries=0),
+            results=True,
+        )
+
+    def test_results(self):
+        client = self.create_client()
+        res = client.get_pixel('py-pixela', datetime(2018, 10, 21))
+        self.assertIsInstance(res, Result)
+        self.assertEqual(res.data['quantity'], '5')
+
+        with self.assertLogs('pixela', level='ERROR'):
+            res = client.increment_pixel('missing')
+        self.assertIsInstance(res, Result)
+        with self.assertRaises(NotFoundError):
+            res.raise_for_status()
+
+    def test_bulk(self):
+        client = self.create_client()
+        pairs = [(datetime(2018, 10, day), day) for day in range(1, 11)]
+        result = client.create_pixels('py-pixela', pairs, workers=2)
+        self.assertEqual(result.successes, 10)
+        with self.assertLogs('pixela', level='ERROR'):
+            result = client.create_pixels('missing', pairs, workers=2)
+        self.assertTrue(all(isinstance(res, Result) for _, _, res in result.failures))
+
+        with self.assertRaises(ServerError):
+            list(client.iter_pixels('broken', datetime(2018, 10, 1), datetime(2018, 10, 2)))
+
+    def test_connection_error(self):
+        def handle(method, url, headers, body):
+            raise ConnectionRefusedError('refused')
+
+        client = self.create_client(handle)
+        self.transport.retry_on = (ConnectionRefusedError,)
+        with self.assertRaises(PixelaConnectionError) as e:
+            client.increment_pixel('py-pixela')
+        self.assertIsInstance(e.exception, ConnectionError)
+        self.assertIsInstance(e.exception.__cause__, ConnectionRefusedError)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_retry
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.retry.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import time
+from datetime import datetime
+from unittest import TestCase
+
+from mock import mock
+from requests import (
+    ConnectionError,
+    ConnectTimeout,
+    ReadTimeout,
+    Session,
+)
+from urllib3.exceptions import (
+    MaxRetryError,
+    NewConnectionError,
+    ProtocolError,
+)
+
+from pixela import Pixela
+from pixela.exceptions import RequestTimeout
+from pixela.retry import (
+    is_idempotent,
+    RateLimiter,
+    RetryPolicy,
+)
+from .helpers import (
+    mock_response,
+    rejected,
+    success,
+)
+
+
+class RateLimiterTestCase(TestCase):
+    def test_burst(self):
+        limiter = RateLimiter(rate=1000, burst=5)
+        waits = [limiter.acquire() for _ in range(5)]
+        self.assertEqual(waits, [0.0] * 5)
+
+    def test_throttle(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+        self.assertEqual(limiter.acquired, 6)
+        self.assertGreater(limiter.waited_seconds, 0.04)
+
+
+class RetryPolicyTestCase(TestCase):
+    def test_is_retryable(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(rejected()))
+        self.assertTrue(policy.is_retryable(mock_response(status_code=429, content={})))
+        self.assertTrue(policy.is_retryable(mock_response(status_code=502, content={})))
+        self.assertFalse(policy.is_retryable(success()))
+        self.assertFalse(policy.is_retryable(mock_response(
+            status_code=400,
+            content={'message': 'Specified quantity is invalid.', 'isSuccess': False},
+        )))
+
+    def test_delay(self):
+        policy = RetryPolicy(backoff=1, max_backoff=3)
+        for attempt in range(5):
+            self.assertLessEqual(policy.delay(attempt), min(3, 2 ** attempt))
+
+        res = mock_response(status_code=429, content={})
+        res.headers['Retry-After'] = '2'
+        self.assertEqual(policy.delay(0, res), 2)
+
+    def test_is_idempotent(self):
+        self.assertTrue(is_idempotent('get', 'users/heavenshell/graphs'))
+        self.assertTrue(is_idempotent('delete', 'users/heavenshell/graphs/py-pixela/20181021'))
+        self.assertTrue(is_idempotent('put', 'users/heavenshell/graphs/py-pixela/20181021'))
+        self.assertFalse(is_idempotent('put', 'users/heavenshell/graphs/py-pixela/increment'))
+        self.assertFalse(is_idempotent('put', 'users/heavenshell/graphs/py-pixela/add'))
+        self.assertFalse(is_idempotent('post', 'users/heavenshell/graphs/py-pixela'))
+        self.assertFalse(is_idempotent('post', 'users/heavenshell/webhooks/xxx'))
+
+        policy = RetryPolicy()
+        self.assertFalse(policy.is_retryable(mock_response(status_code=502, content={}), idempotent=False))
+        self.assertTrue(policy.is_retryable(mock_response(status_code=429, content={}), idempotent=False))
+        self.assertTrue(policy.is_retryable(rejected(), idempotent=False))
+
+    def test_giveup(self):
+        policy = RetryPolicy(max_retries=2, backoff=0)
+        responses = [rejected(), rejected(), rejected(), success()]
+        res = policy.call(lambda: responses.pop(0))
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(policy.retries, 2)
+        self.assertEqual(policy.giveups, 1)
+        self.assertEqual(policy.last_retries, 2)
+
+
+class SendRetryTestCase(TestCase):
+    def create_client(self, **kwargs):
+        return Pixela(
+            username='heavenshell',
+            token='ba0afe74-86a3-40fe-8bf7-0801027d087d',
+            retry=RetryPolicy(backoff=0),
+            **kwargs,
+        )
+
+    def test_retry_rejected(self):
+        client = self.create_client()
+        with mock.patch.object(Session, 'put', side_effect=[rejected(), rejected(), success()]) as m:
+            res = client.increment_pixel(graph_id='py-pixela')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(m.call_count, 3)
+        self.assertEqual(client.retry.retries, 2)
+
+    def test_no_retry_on_client_error(self):
+        client = self.create_client()
+        failure = mock_response(
+            status_code=404,
+            content={'message': 'Specified graph not found.', 'isSuccess': False},
+        )
+        with mock.patch.object(Session, 'put', return_value=failure) as m:
+            with self.assertLogs('pixela', level='ERROR'):
+                res = client.increment_pixel(graph_id='py-pixela')
+
+        self.assertIs(res, failure)
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(client.retry.retries, 0)
+
+    def test_retry_connection_error(self):
+        client = self.create_client()
+        with mock.patch.object(Session, 'get', side_effect=ConnectionError('refused')) as m:
+            with self.assertRaises(ConnectionError):
+                client.get_graphs()
+
+        self.assertEqual(m.call_count, 4)
+        self.assertEqual(client.retry.giveups, 1)
+
+    def test_non_idempotent_writes(self):
+        refused = ConnectionError(MaxRetryError(None, '/', NewConnectionError(None, 'refused')))
+        dropped = ConnectionError(ProtocolError('Connection aborted.'))
+        cases = [
+            # Provably not applied, retried.
+            ([rejected(), success()], 2),
+            ([mock_response(status_code=429, content={}), success()], 2),
+            ([ConnectTimeout('connect timed out'), success()], 2),
+            ([refused, success()], 2),
+            # May have been applied, not retried.
+            ([mock_response(status_code=502, content={}), success()], 1),
+            ([ReadTimeout('read timed out'), success()], 1),
+            ([dropped, success()], 1),
+        ]
+        for side_effect, calls in cases:
+            client = self.create_client()
+            client.logger.disabled = True
+            self.addCleanup(setattr, client.logger, 'disabled', False)
+            with mock.patch.object(Session, 'put', side_effect=side_effect) as m:
+                try:
+                    client.increment_pixel(graph_id='py-pixela')
+                except (ConnectionError, RequestTimeout):
+                    pass
+            self.assertEqual(m.call_count, calls, side_effect[0])
+
+        client = self.create_client()
+        with mock.patch.object(Session, 'post', side_effect=[ReadTimeout('read timed out'), success()]) as m:
+            with self.assertRaises(RequestTimeout):
+                client.invoke_webhook('xxx')
+        self.assertEqual(m.call_count, 1)
+
+    def test_idempotent_writes(self):
+        for error in (ReadTimeout('read timed out'), mock_response(status_code=502, content={})):
+            client = self.create_client()
+            with mock.patch.object(Session, 'put', side_effect=[error, success()]) as m:
+                res = client.update_pixel(graph_id='py-pixela', quantity=5, date=datetime(2018, 10, 21))
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(m.call_count, 2)
+
+            with mock.patch.object(Session, 'delete', side_effect=[error, success()]) as m:
+                res = client.delete_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+            self.assertEqual(m.call_count, 2)
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(rate=1000, burst=10)
+        client = self.create_client(rate_limiter=limiter)
+        with mock.patch.object(Session, 'put', side_effect=[rejected(), success()]):
+            client.increment_pixel(graph_id='py-pixela')
+
+        self.assertEqual(limiter.acquired, 2)
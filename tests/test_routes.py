@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_routes
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.routes.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+from datetime import datetime
+from unittest import TestCase
+
+from pixela import (
+    Pixela,
+    routes,
+)
+
+
+class RoutesTestCase(TestCase):
+    def test_routes_match_templates(self):
+        r = routes.Routes('heavenshell')
+        kwargs = {
+            'username': 'heavenshell',
+            'graph_id': 'py-pixela',
+            'date': '20181021',
+            'webhook_hash': 'xxx',
+        }
+        self.assertEqual(r.user, routes.USER.format(**kwargs))
+        self.assertEqual(r.graphs, routes.GRAPHS.format(**kwargs))
+        self.assertEqual(r.webhooks, routes.WEBHOOKS.format(**kwargs))
+        self.assertEqual(r.graph('py-pixela'), routes.GRAPH.format(**kwargs))
+        self.assertEqual(r.pixel('py-pixela', '20181021'), routes.PIXEL.format(**kwargs))
+        self.assertEqual(r.pixels('py-pixela'), routes.PIXELS.format(**kwargs))
+        self.assertEqual(r.stats('py-pixela'), routes.STATS.format(**kwargs))
+        self.assertEqual(r.increment('py-pixela'), routes.INCREMENT.format(**kwargs))
+        self.assertEqual(r.decrement('py-pixela'), routes.DECREMENT.format(**kwargs))
+        self.assertEqual(r.add('py-pixela'), routes.ADD.format(**kwargs))
+        self.assertEqual(r.subtract('py-pixela'), routes.SUBTRACT.format(**kwargs))
+        self.assertEqual(r.webhook('xxx'), routes.WEBHOOK.format(**kwargs))
+
+    def test_to_ymd(self):
+        client = Pixela(username='heavenshell', token='ba0afe74-86a3-40fe-8bf7-0801027d087d')
+        self.assertEqual(client.to_ymd(datetime(2018, 1, 2)), '20180102')
+        self.assertEqual(client.to_ymd(datetime(999, 12, 31)), '09991231')
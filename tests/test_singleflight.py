@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_singleflight
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.singleflight.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import asyncio
+import threading
+from datetime import datetime
+from unittest import TestCase
+
+from pixela import Pixela
+from pixela.deadline import limits
+from pixela.exceptions import (
+    DeadlineExceeded,
+    RequestTimeout,
+)
+from pixela.pool import PixelaPool
+from pixela.singleflight import (
+    AsyncSingleFlight,
+    SingleFlight,
+)
+from pixela.transport import FakeTransport
+from .helpers import wait_for
+
+DATE = datetime(2018, 10, 21)
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.error = None
+
+    def handle(self, method, url, headers, body):
+        if method == 'get':
+            self.release.wait(5)
+            if self.error is not None:
+                raise self.error
+            return 200, {'quantity': '5'}
+
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+    def create_client(self, single_flight, **kwargs):
+        self.transport = FakeTransport(self.handle)
+        client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            single_flight=single_flight,
+            **kwargs,
+        )
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+
+        return client
+
+    def run_threads(self, funcs):
+        results = [None] * len(funcs)
+
+        def run(i):
+            try:
+                results[i] = funcs[i]()
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(funcs))]
+        for thread in threads:
+            thread.start()
+
+        return threads, results
+
+    def join(self, threads):
+        for thread in threads:
+            thread.join()
+
+    def test_identical_reads_share_one_request(self):
+        single_flight = SingleFlight()
+        client = self.create_client(single_flight)
+        threads, results = self.run_threads([lambda: client.get_pixel('py-pixela', DATE)] * 10)
+        wait_for(lambda: single_flight.collapsed == 9)
+        self.release.set()
+        self.join(threads)
+
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertTrue(all(res is results[0] for res in results))
+        self.assertEqual(results[0].json(), {'quantity': '5'})
+        self.assertEqual((single_flight.flights, single_flight.collapsed, len(single_flight)), (1, 9, 0))
+
+    def test_different_keys_are_not_shared(self):
+        single_flight = SingleFlight()
+        client = self.create_client(single_flight)
+        self.release.set()
+        client.get_pixel('py-pixela', DATE)
+        client.get_pixel('py-pixela', DATE)
+        client.get_graphs()
+        self.assertEqual(len(self.transport.calls), 3)
+        self.assertEqual(single_flight.collapsed, 0)
+
+        pool = PixelaPool(transport=self.transport, single_flight=single_flight)
+        self.release.clear()
+        threads, results = self.run_threads([
+            lambda: pool.user('alice', 'alice-token').get_graphs(),
+            lambda: pool.user('alice', 'other-token').get_graphs(),
+            lambda: pool.user('bob', 'bob-token').get_graphs(),
+        ])
+        wait_for(lambda: len(single_flight) == 3)
+        self.release.set()
+        self.join(threads)
+        self.assertEqual(len(self.transport.calls), 6)
+
+    def test_errors_are_shared(self):
+        single_flight = SingleFlight()
+        client = self.create_client(single_flight)
+        self.error = TimeoutError('timed out')
+        threads, results = self.run_threads([client.get_graphs] * 3)
+        wait_for(lambda: single_flight.collapsed == 2)
+        self.release.set()
+        self.join(threads)
+        self.assertEqual(len(self.transport.calls), 1)
+        self.assertTrue(all(isinstance(res, RequestTimeout) for res in results))
+
+    def test_writes_start_a_new_flight(self):
+        single_flight = SingleFlight()
+        client = self.create_client(single_flight)
+        threads, results = self.run_threads([lambda: client.get_pixel('py-pixela', DATE)])
+        wait_for(lambda: len(single_flight) == 1)
+        client.update_pixel('py-pixela', 7, DATE)
+        self.assertEqual(len(single_flight), 0)
+        more, _ = self.run_threads([lambda: client.get_pixel('py-pixela', DATE)])
+        wait_for(lambda: single_flight.flights == 2)
+        self.release.set()
+        self.join(threads + more)
+        self.assertEqual(single_flight.collapsed, 0)
+
+        self.release.clear()
+        threads, results = self.run_threads([client.get_graphs])
+        wait_for(lambda: len(single_flight) == 1)
+        client.delete_graph('py-pixela')
+        self.assertEqual(len(single_flight), 0)
+        self.release.set()
+        self.join(threads)
+
+    def test_waiting_respects_deadline(self):
+        single_flight = SingleFlight()
+        client = self.create_client(single_flight)
+        threads, results = self.run_threads([client.get_graphs])
+        wait_for(lambda: len(single_flight) == 1)
+        with limits(deadline=0.05):
+            with self.assertRaises(DeadlineExceeded):
+                client.get_graphs()
+        self.release.set()
+        self.join(threads)
+        self.assertEqual(results[0].status_code, 200)
+
+
+class AsyncSingleFlightTestCase(TestCase):
+    def test_identical_reads_share_one_task(self):
+        single_flight = AsyncSingleFlight()
+        loads = []
+
+        async def load():
+            loads.append(1)
+            await asyncio.sleep(0.01)
+            return 'response'
+
+        async def run():
+            first = asyncio.ensure_future(single_flight.fetch(('get_graphs', 'heavenshell', 'token'), load))
+            others = [single_flight.fetch(('get_graphs', 'heavenshell', 'token'), load) for _ in range(4)]
+            await asyncio.sleep(0)
+            first.cancel()
+            return await asyncio.gather(*others)
+
+        self.assertEqual(asyncio.run(run()), ['response'] * 4)
+        self.assertEqual(len(loads), 1)
+        self.assertEqual((single_flight.flights, single_flight.collapsed, len(single_flight)), (1, 4, 0))
+
+    def test_errors_are_shared(self):
+        single_flight = AsyncSingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        async def run():
+            return await asyncio.gather(*[
+                single_flight.fetch(('get_graphs', 'heavenshell', 'token'), load) for _ in range(3)
+            ], return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(res, ValueError) for res in results))
+        self.assertEqual(single_flight.flights, 1)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_svg
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.svg.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from unittest import TestCase
+
+from mock import mock
+
+from pixela import Pixela
+from pixela.exceptions import (
+    NotFoundError,
+    ServerError,
+)
+from pixela.pool import PixelaPool
+from pixela.retry import RetryPolicy
+from pixela.svg import SvgCache
+from pixela.transport import (
+    FakeTransport,
+    Response,
+)
+
+
+class SvgTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.version = 1
+        self.status = None
+        self.release = None
+
+    def handle(self, method, url, headers, body):
+        if method != 'get':
+            return 200, {'message': 'Success.', 'isSuccess': True}
+        if self.release is not None:
+            self.release.wait(5)
+        if self.status is not None:
+            return self.status, {'message': 'Specified graph not found.', 'isSuccess': False}
+
+        etag = '"v{version}"'.format(version=self.version)
+        if (headers or {}).get('If-None-Match') == etag:
+            return Response(304, {'ETag': etag}, b'', url)
+
+        content = '<svg data-url="{url}" data-version="{version}"/>'.format(url=url, version=self.version)
+        return Response(200, {'Content-Type': 'image/svg+xml', 'ETag': etag}, content.encode('utf-8'), url)
+
+    def create_client(self, svg_cache=None):
+        self.transport = FakeTransport(self.handle)
+        client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            retry=RetryPolicy(max_retries=0),
+            svg_cache=svg_cache,
+        )
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+
+        return client
+
+    def gets(self):
+        return [call for call in self.transport.calls if call[0] == 'get']
+
+    def test_without_cache(self):
+        client = self.create_client()
+        svg = client.fetch_graph_svg('py-pixela', date=datetime(2018, 10, 21), mode='short')
+        self.assertIsInstance(svg, memoryview)
+        self.assertIn(b'/graphs/py-pixela?date=20181021&mode=short', bytes(svg))
+        self.assertIsNone(self.transport.calls[0][2])
+
+        self.status = 404
+        with self.assertRaises(NotFoundError):
+            client.fetch_graph_svg('py-pixela')
+
+    def test_memory_cache(self):
+        cache = SvgCache(ttl=60)
+        client = self.create_client(cache)
+        first = client.fetch_graph_svg('py-pixela', mode='short')
+        second = client.fetch_graph_svg('py-pixela', mode='short')
+        self.assertEqual(bytes(first), bytes(second))
+        self.assertTrue(second.readonly)
+        self.assertEqual(len(self.gets()), 1)
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+
+        # Another query is another SVG.
+        client.fetch_graph_svg('py-pixela')
+        self.assertEqual(len(self.gets()), 2)
+        self.assertEqual(len(cache), 2)
+
+        # Releasing a view leaves the cached SVG alone.
+        first.release()
+        self.assertEqual(bytes(client.fetch_graph_svg('py-pixela', mode='short')), bytes(second))
+
+    def test_revalidate(self):
+        cache = SvgCache(ttl=0)
+        client = self.create_client(cache)
+        first = bytes(client.fetch_graph_svg('py-pixela'))
+        self.assertEqual(bytes(client.fetch_graph_svg('py-pixela')), first)
+        self.assertEqual(self.gets()[-1][2], {'If-None-Match': '"v1"'})
+        self.assertEqual(cache.revalidated, 1)
+
+        self.version = 2
+        self.assertIn(b'data-version="2"', bytes(client.fetch_graph_svg('py-pixela')))
+        self.assertEqual(cache.refreshed, 1)
+
+    def test_writes_expire(self):
+        cache = SvgCache(ttl=60, directory=self.tmpdir)
+        client = self.create_client(cache)
+        client.fetch_graph_svg('py-pixela')
+        client.fetch_graph_svg('py-pixela', mode='short')
+        client.fetch_graph_svg('other')
+        client.increment_pixel('py-pixela')
+        self.version = 2
+
+        self.assertIn(b'data-version="2"', bytes(client.fetch_graph_svg('py-pixela')))
+        self.assertIn(b'data-version="2"', bytes(client.fetch_graph_svg('py-pixela', mode='short')))
+        self.assertIn(b'data-version="1"', bytes(client.fetch_graph_svg('other')))
+        self.assertEqual(cache.refreshed, 2)
+
+        # Expired on disk as well, without a scan of every cache file.
+        self.version = 3
+        with mock.patch.object(SvgCache, '_files', side_effect=AssertionError('scanned')):
+            client.update_pixel('py-pixela', 5, datetime(2018, 10, 21))
+        fresh = SvgCache(ttl=60, directory=self.tmpdir)
+        client.svg_cache = fresh
+        self.assertIn(b'data-version="3"', bytes(client.fetch_graph_svg('py-pixela')))
+        self.assertIn(b'data-version="1"', bytes(client.fetch_graph_svg('other')))
+        self.assertEqual((fresh.disk_hits, fresh.refreshed), (2, 1))
+
+    def test_disk_cache(self):
+        client = self.create_client(SvgCache(ttl=60, directory=self.tmpdir))
+        svg = client.fetch_graph_svg('py-pixela')
+        self.assertIsInstance(svg.obj, mmap.mmap)
+        self.assertTrue(svg.readonly)
+        files = os.listdir(self.tmpdir)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith('.svg'))
+
+        # Another process, or a restart, serves it without a request.
+        cache = SvgCache(ttl=60, directory=self.tmpdir)
+        client.svg_cache = cache
+        self.assertEqual(bytes(client.fetch_graph_svg('py-pixela')), bytes(svg))
+        self.assertEqual(len(self.gets()), 1)
+        self.assertEqual(cache.disk_hits, 1)
+        self.assertEqual(cache.disk_size, os.path.getsize(os.path.join(self.tmpdir, files[0])))
+
+        # A stale file is revalidated, a 304 refreshes its mtime.
+        path = os.path.join(self.tmpdir, files[0])
+        os.utime(path, (0, 0))
+        cache = SvgCache(ttl=60, directory=self.tmpdir)
+        client.svg_cache = cache
+        client.fetch_graph_svg('py-pixela')
+        self.assertEqual(cache.revalidated, 1)
+        self.assertGreater(os.path.getmtime(path), time.time() - 60)
+
+        cache.clear()
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        self.assertEqual((len(cache), cache.size, cache.disk_size), (0, 0, 0))
+
+    def test_stale_on_error(self):
+        cache = SvgCache(ttl=0)
+        client = self.create_client(cache)
+        svg = bytes(client.fetch_graph_svg('py-pixela'))
+
+        self.status = 503
+        self.assertEqual(bytes(client.fetch_graph_svg('py-pixela')), svg)
+
+        def refuse(method, url, headers, body):
+            raise ConnectionRefusedError('refused')
+
+        self.transport.handler = refuse
+        self.assertEqual(bytes(client.fetch_graph_svg('py-pixela')), svg)
+        self.assertEqual(cache.stale, 2)
+
+        # Without a cached SVG errors are raised.
+        self.transport.handler = self.handle
+        with self.assertRaises(ServerError):
+            client.fetch_graph_svg('other')
+
+        # A deleted graph is dropped.
+        self.status = 404
+        with self.assertRaises(NotFoundError):
+            client.fetch_graph_svg('py-pixela')
+        self.assertEqual(len(cache), 0)
+
+    def test_eviction(self):
+        cache = SvgCache(ttl=60, directory=self.tmpdir, max_bytes=200, max_disk_bytes=500)
+        client = self.create_client(cache)
+        for i in range(10):
+            client.fetch_graph_svg('graph-{i}'.format(i=i))
+
+        self.assertLessEqual(cache.size, 200)
+        self.assertGreater(cache.evictions, 0)
+        self.assertLessEqual(cache.disk_size, 500)
+        self.assertGreater(cache.disk_evictions, 0)
+        sizes = [os.path.getsize(os.path.join(self.tmpdir, name)) for name in os.listdir(self.tmpdir)]
+        self.assertEqual(cache.disk_size, sum(sizes))
+
+        # The latest SVG is still served without a request.
+        requests = len(self.gets())
+        client.fetch_graph_svg('graph-9')
+        self.assertEqual(len(self.gets()), requests)
+
+    def test_concurrent_misses(self):
+        cache = SvgCache(ttl=60, directory=self.tmpdir)
+        pool = PixelaPool(transport=FakeTransport(self.handle), svg_cache=cache)
+        self.transport = pool.transport
+        self.release = threading.Event()
+        results = []
+
+        def fetch():
+            results.append(bytes(pool.user('heavenshell', 'token').fetch_graph_svg('py-pixela')))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(self.gets()), 1)
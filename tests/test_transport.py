@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_transport
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.transport.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import json
+import socket
+import threading
+from datetime import datetime
+from unittest import TestCase
+
+from requests import HTTPError
+
+from pixela import Pixela
+from pixela.pool import PixelaPool
+from pixela.retry import RetryPolicy
+from pixela.transport import (
+    FakeTransport,
+    RequestsTransport,
+    Response,
+    Urllib3Transport,
+)
+from .helpers import RecordingServer
+
+
+def echo(method, path, headers, body):
+    status = 404 if '/missing/' in path else 200
+    content = {
+        'method': method,
+        'path': path,
+        'token': headers.get('X-USER-TOKEN'),
+        'agent': headers.get('User-Agent'),
+        'cookie': headers.get('Cookie'),
+        'body': body,
+    }
+
+    return status, content, {
+        'Retry-After': '1',
+        'Set-Cookie': 'session={user}; Path=/'.format(user=path.split('/')[3]),
+    }
+
+
+class RequestsTransportTestCase(TestCase):
+    transport = 'requests'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RecordingServer(echo).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def create_client(self, **kwargs):
+        client = Pixela(username='heavenshell', token='token', transport=self.transport, **kwargs)
+        client.API_ENDPOINT = self.server.endpoint
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+        self.addCleanup(client.close)
+
+        return client
+
+    def test_methods(self):
+        client = self.create_client()
+        date = datetime(2018, 10, 21)
+        before = self.server.connections
+
+        ret = client.create_pixel(graph_id='py-pixela', quantity=5, date=date).json()
+        self.assertEqual(ret['method'], 'POST')
+        self.assertEqual(ret['path'], '/v1/users/heavenshell/graphs/py-pixela')
+        self.assertEqual(ret['token'], 'token')
+        self.assertEqual(ret['agent'], Pixela.headers['User-Agent'])
+        self.assertEqual(json.loads(ret['body']), {'date': '20181021', 'quantity': '5'})
+
+        ret = client.get_pixel(graph_id='py-pixela', date=date).json()
+        self.assertEqual((ret['method'], ret['body']), ('GET', None))
+        ret = client.update_pixel(graph_id='py-pixela', quantity=7, date=date).json()
+        self.assertEqual(ret['method'], 'PUT')
+        ret = client.delete_pixel(graph_id='py-pixela', date=date).json()
+        self.assertEqual(ret['method'], 'DELETE')
+        ret = client.invoke_webhook('xxx').json()
+        self.assertIsNone(ret['token'])
+        # Keep-alive: every call went through one connection.
+        self.assertEqual(self.server.connections - before, 1)
+
+    def test_response(self):
+        res = self.create_client().get_graph_stats('missing')
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(res.ok)
+        self.assertEqual(res.headers.get('retry-after'), '1')
+        self.assertIn('"method": "GET"', res.text)
+        with self.assertRaises(HTTPError):
+            res.raise_for_status()
+
+    def test_threads(self):
+        pool = PixelaPool(transport=self.transport, pool_maxsize=8)
+        pool.API_ENDPOINT = self.create_client().API_ENDPOINT
+        self.addCleanup(pool.close)
+        mismatches = []
+
+        def run(i):
+            user = pool.user('user{i}'.format(i=i), 'token{i}'.format(i=i))
+            for day in range(1, 21):
+                ret = user.create_pixel('py-pixela', day, datetime(2018, 10, day)).json()
+                if (ret['path'].split('/')[3], ret['token'], ret['cookie']) != (user.username, user.token, None):
+                    mismatches.append(ret)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mismatches, [])
+        self.assertNotIn('X-USER-TOKEN', pool.headers)
+
+    def test_connection_error_is_retried(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+
+        retry = RetryPolicy(max_retries=2, backoff=0)
+        client = self.create_client(retry=retry)
+        client.API_ENDPOINT = 'http://127.0.0.1:{port}/v1'.format(port=port)
+        with self.assertRaises(client.transport.retry_on):
+            client.increment_pixel(graph_id='py-pixela')
+        self.assertEqual(retry.retries, 2)
+
+
+class Urllib3TransportTestCase(RequestsTransportTestCase):
+    transport = 'urllib3'
+
+    def test_transport(self):
+        self.assertIsInstance(self.create_client().transport, Urllib3Transport)
+
+
+class FakeTransportTestCase(TestCase):
+    def test_records_calls(self):
+        transport = FakeTransport()
+        client = Pixela(username='heavenshell', token='token', transport=transport)
+        res = client.increment_pixel(graph_id='py-pixela')
+        self.assertTrue(res.ok)
+        self.assertEqual(res.json(), {'message': 'Success.', 'isSuccess': True})
+        self.assertEqual(transport.calls, [(
+            'put',
+            'https://pixe.la/v1/users/heavenshell/graphs/py-pixela/increment',
+            {'X-USER-TOKEN': 'token'},
+            None,
+        )])
+
+    def test_handler(self):
+        responses = [
+            (503, {'message': 'Please retry this request.', 'isSuccess': False, 'isRejected': True}),
+            (200, {'quantity': '5'}),
+        ]
+        transport = FakeTransport(lambda method, url, headers, body: responses.pop(0))
+        retry = RetryPolicy(backoff=0)
+        client = Pixela(username='heavenshell', token='token', transport=transport, retry=retry)
+        res = client.get_pixel(graph_id='py-pixela', date=datetime(2018, 10, 21))
+        self.assertEqual(res.json(), {'quantity': '5'})
+        self.assertEqual(len(transport.calls), 2)
+        self.assertEqual(retry.retries, 1)
+
+    def test_handler_response(self):
+        response = Response(400, {}, b'{"isSuccess": false}', 'https://pixe.la/v1/users')
+        client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=FakeTransport(lambda method, url, headers, body: response),
+        )
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+        self.assertIs(client.delete_user(), response)
+        with self.assertRaises(HTTPError) as e:
+            response.raise_for_status()
+        self.assertEqual(str(e.exception), '400 Client Error for url: https://pixe.la/v1/users')
+
+    def test_threads(self):
+        local = threading.local()
+
+        def handle(method, url, headers, body):
+            # Every call is rejected once.
+            local.rejected = not getattr(local, 'rejected', False)
+            if local.rejected:
+                return 503, {'message': 'Please retry this request.', 'isSuccess': False, 'isRejected': True}
+            return 200, {'message': 'Success.', 'isSuccess': True}
+
+        retry = RetryPolicy(backoff=0)
+        client = Pixela(username='heavenshell', token='token', transport=FakeTransport(handle), retry=retry)
+
+        def run():
+            for _ in range(100):
+                client.increment_pixel('py-pixela')
+
+        threads = [threading.Thread(target=run) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(retry.retries, 1600)
+        self.assertEqual(len(client.transport.calls), 3200)
+
+    def test_headers(self):
+        client = Pixela(username='heavenshell', token='token')
+        with self.assertRaises(TypeError):
+            client.headers['X-USER-TOKEN'] = 'token'
+        with self.assertRaises(TypeError):
+            Pixela.headers['X-USER-TOKEN'] = 'token'
+        self.assertEqual(dict(client.headers), dict(Pixela.headers))
+
+    def test_default_transport(self):
+        client = Pixela(username='heavenshell', token='token')
+        self.assertIsInstance(client.transport, RequestsTransport)
+        self.assertIs(client.session, client.transport.session)
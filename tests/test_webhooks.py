@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+    pixela.tests.test_webhooks
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Tests for pixela.webhooks.
+
+
+    :copyright: (c) 2018 Shinya Ohyanagi, All rights reserved.
+    :license: BSD, see LICENSE for more details.
+"""
+import threading
+import time
+from unittest import TestCase
+
+from pixela import Pixela
+from pixela.pool import PixelaPool
+from pixela.transport import FakeTransport
+from pixela.webhooks import WebhookIndex
+
+
+class Webhooks(object):
+    """Webhooks endpoints of one user."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.webhooks = [
+            {'webhookHash': 'aaa', 'graphID': 'py-pixela', 'type': 'increment'},
+            {'webhookHash': 'bbb', 'graphID': 'py-pixela', 'type': 'decrement'},
+        ]
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, method, url, headers, body):
+        """Answer a request to the webhooks endpoints."""
+        if '/webhooks' not in url:
+            return 200, {'message': 'Success.', 'isSuccess': True}
+
+        path = url.split('/webhooks', 1)[1]
+        if method == 'get':
+            return 200, {'webhooks': list(self.webhooks)}
+        if method == 'post' and not path:
+            return 200, {'message': 'Success.', 'isSuccess': True, 'webhookHash': 'ccc'}
+        if method == 'delete':
+            return 200, {'message': 'Success.', 'isSuccess': True}
+
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if path == '/broken':
+            raise ValueError('broken')
+        if path == '/missing':
+            return 404, {'message': 'Specified webhook not found.', 'isSuccess': False}
+
+        return 200, {'message': 'Success.', 'isSuccess': True}
+
+
+class WebhookIndexTestCase(TestCase):
+    def create_client(self, index=None, delay=0):
+        self.webhooks = Webhooks(delay)
+        self.transport = FakeTransport(self.webhooks)
+        client = Pixela(
+            username='heavenshell',
+            token='token',
+            transport=self.transport,
+            webhook_index=index,
+        )
+        client.logger.disabled = True
+        self.addCleanup(setattr, client.logger, 'disabled', False)
+
+        return client
+
+    def gets(self):
+        return len([call for call in self.transport.calls if call[0] == 'get'])
+
+    def test_lookup_loads_once(self):
+        index = WebhookIndex()
+        client = self.create_client(index)
+        self.assertEqual(client.webhook_hash('py-pixela', 'increment'), 'aaa')
+        self.assertEqual(client.webhook_hash('py-pixela', 'decrement'), 'bbb')
+        self.assertIsNone(client.webhook_hash('other', 'increment'))
+        self.assertEqual(self.gets(), 1)
+        self.assertEqual((index.loads, index.hits), (1, 2))
+
+    def test_lookup_without_index(self):
+        client = self.create_client()
+        self.assertEqual(client.webhook_hash('py-pixela', 'increment'), 'aaa')
+        self.assertEqual(client.webhook_hash('py-pixela', 'decrement'), 'bbb')
+        self.assertEqual(self.gets(), 2)
+
+    def test_writes_keep_index_current(self):
+        index = WebhookIndex()
+        client = self.create_client(index)
+        client.get_webhook()
+        client.create_webhook('other', 'increment')
+        self.assertEqual(client.webhook_hash('other', 'increment'), 'ccc')
+        client.delete_webhook('aaa')
+        self.assertIsNone(client.webhook_hash('py-pixela', 'increment'))
+        client.delete_graph('py-pixela')
+        self.assertIsNone(client.webhook_hash('py-pixela', 'decrement'))
+        self.assertEqual(client.webhook_hash('other', 'increment'), 'ccc')
+        self.assertEqual(self.gets(), 1)
+
+    def test_stale_load_is_dropped(self):
+        index = WebhookIndex()
+        generation = index.generation
+        index.add('heavenshell', 'other', 'increment', 'ccc')
+        index.load('heavenshell', [], generation)
+        self.assertFalse(index.loaded('heavenshell'))
+
+    def test_pool_shares_index(self):
+        index = WebhookIndex()
+        self.webhooks = Webhooks()
+        transport = FakeTransport(self.webhooks)
+        with PixelaPool(transport=transport, webhook_index=index) as pool:
+            self.assertEqual(pool.user('heavenshell', 'token').webhook_hash('py-pixela', 'increment'), 'aaa')
+            self.assertEqual(pool.user('heavenshell', 'token').webhook_hash('py-pixela', 'decrement'), 'bbb')
+            self.assertEqual(index.loads, 1)
+            self.assertIs(pool.user('heavenshell', 'token').webhook_index, index)
+            self.assertFalse(index.loaded('other'))
+
+    def test_invoke_webhooks(self):
+        client = self.create_client(delay=0.02)
+        hashes = ['aaa', 'missing', 'broken', 'bbb', 'aaa'] * 4
+        results = client.invoke_webhooks(hashes, workers=4)
+        self.assertEqual([webhook_hash for webhook_hash, _ in results], hashes)
+        for webhook_hash, res in results:
+            if webhook_hash == 'broken':
+                self.assertIsInstance(res, ValueError)
+            elif webhook_hash == 'missing':
+                self.assertEqual(res.status_code, 404)
+            else:
+                self.assertTrue(res.ok)
+        self.assertLessEqual(self.webhooks.max_in_flight, 4)
+        self.assertGreater(self.webhooks.max_in_flight, 1)
+        # Invoking a webhook does not need the token.
+        self.assertTrue(all(call[2] is None for call in self.transport.calls))